@@ -1,6 +1,5 @@
 """Constants to be used."""
 # from typing import List, Tuple, Callable
-from machine import Pin
 
 # Physical constants
 SOUND_SPEED_CMPS = 34300 # Speed of sound in centimeters per second
@@ -25,8 +24,41 @@ LABYRINTH_SQUARES_VERTICAL = 16 # How many squares the labyrinth has vertically
 ROBOT_WIDTH_CM = 8
 ROBOT_LENGTH_CM = 11.5
 ROBOT_HEIGHT_CM = 7
+ROBOT_TRACK_WIDTH_CM = 8.29 # Effective distance between the wheels when turning in place
 
-ROBOT_SPEED_CMPS = 44 # How much centimeters robot travels at 50% power in 1 second
+ROBOT_SPEED_CMPS = 44 # How much centimeters robot travels at 50% power in 1 second before the velocity is calibrated
+ROBOT_MOTOR_TIME_CONSTANT_S = 0.03 # Time constant and braking time of the wheels before the velocity is calibrated
+# Calibration curves (deadband, forward gain, reverse gain) of the motors, duty percentage = deadband + gain * speed percentage
+LEFT_MOTOR_CALIBRATION = (0, 1, 1)
+RIGHT_MOTOR_CALIBRATION = (1, 1, 1) # Right motor loses a percent of duty to the left one
+
+# Control constants
+CONTROL_PERIOD_MS = 20 # Period of the fixed rate control loops in milliseconds
+HEADING_PERIOD_MS = 20 # Period of reading the heading in the runtime in milliseconds
+BUTTON_POLL_PERIOD_MS = 20 # Period of reading the buttons in the runtime in milliseconds
+CENTERING_PID_GAINS = (0.75, 0.0, 0.3) # Gains (kp, ki, kd) of the wall centering controller, speed percentage per centimeter
+CENTERING_MAX_CORRECTION = 15 # Largest speed percentage the wall centering controller may add to or take from a motor
+HEADING_HOLD_GAIN = 1 # Gain of steering back to the corridor's heading with a gyro sensor, speed percentage per degree
+TURN_PD_GAINS = (1.5, 0.06) # Gains (kp, kd) of the heading controller of closed loop turns, speed percentage per degree
+TURN_MAX_SPEED = 90 # Highest percentage of speed the motors turn at in closed loop turns
+TURN_MIN_SPEED = 15 # Lowest percentage of speed at which the robot still turns
+TURN_TOLERANCE_DEG = 2 # How close to the target heading a closed loop turn stops the motors
+TURN_TIMEOUT_MS = 1500 # Longest time a closed loop turn may take, in case the heading is never reached
+TURN_OFFSET_LEARNING_RATE = 0.5 # How much of the overshoot of a turn is added to the learned overshoot of its direction
+TIMED_TURN_SPEED = 40 # Percentage of speed the wheels spin at in opposite directions in timed 90 degree turns without a gyro sensor
+BRAKE_TIME_MS = 50 # How long braking waits for the robot to stop in milliseconds
+
+# Motion profile constants
+MOTION_MAX_VELOCITY_CMPS = 60 # Cruising velocity of motion profiles
+MOTION_ACCELERATION_CMPS2 = 120 # Acceleration of motion profiles
+MOTION_DECELERATION_CMPS2 = 120 # Deceleration of motion profiles
+MOTION_MIN_SPEED = 15 # Lowest percentage of speed at which the robot still moves
+
+# Solution run constants
+SOLUTION_DRIVE_SPEED = 70 # Percentage of speed to drive straight segments at in the solution run
+SPEED_RUN_ARC_SPEED = 40 # Percentage of speed to drive the arcs of the speed run at
+SPEED_RUN_MIN_CLEARANCE_CM = 1.5 # Least room to leave between the robot and the walls and posts on the arcs of the speed run
+SPEED_RUN_MIN_SETTLING_DRIVE_CM = 15 # Shortest straight on both sides of an arc of the speed run, a square of wall centering squares the robot after a timed arc
 
 # Type definitions
 # maze = List[List[int]] # type definition for the maze matrix
@@ -34,34 +66,61 @@ ROBOT_SPEED_CMPS = 44 # How much centimeters robot travels at 50% power in 1 sec
 
 # Technical constants
 PWM_FREQUENCY = 1000 # Frequency to set the PWM's to in Hz
+ULTRASONIC_MEASUREMENT_VARIANCE_CM2 = 1 # Variance of a single ultrasonic reading
+DISTANCE_PROCESS_VARIANCE_CM2 = 25 # How much the variance of a distance estimate grows per second of driving
+ULTRASONIC_PING_PERIOD_MS = 20 # Milliseconds between two background pings, sensors are pinged in turns
 MAX_U16_INT = 65535 # Maximum size of a 16bit integer (2 ^ 16 - 1)
+MAP_FILE_PATH = "maze.bin" # File on the flash filesystem the mapped maze and the solution plan are saved to
+TELEMETRY_FILE_PATH = "telemetry.bin" # File on the flash filesystem the telemetry of the last run is saved to
+TELEMETRY_CAPACITY = 1500 # How many records the telemetry buffer holds, the oldest are overwritten
+TELEMETRY_PERIOD_MS = 40 # Milliseconds between two telemetry records during a run
+PROFILING_ENABLED = False # Whether main.py times the hot paths and prints the report after every run, slows them down a little
+GYRO_I2C_ID = 0 # Hardware I2C bus of the magnetometer's pins, None to use software I2C
+GYRO_I2C_FREQUENCY = 400000 # Clock frequency of the magnetometer's I2C bus in Hz
+GYRO_OUTPUT_RATE_HZ = 75 # How often the magnetometer measures (0.75, 1.5, 3, 7.5, 15, 30 or 75)
+GYRO_SAMPLES_AVERAGED = 2 # How many samples the magnetometer averages per measurement (1, 2, 4 or 8)
+GYRO_CALIBRATION_FILE_PATH = "gyro.bin" # File on the flash filesystem the magnetometer calibration is saved to
+GYRO_CALIBRATION_SPEED = 20 # Percentage of speed to spin at while calibrating the magnetometer
+GYRO_CALIBRATION_TURNS = 2 # How many whole turns to spin while calibrating the magnetometer
+GYRO_CALIBRATION_MAX_SAMPLES = 500 # Most magnetometer readings collected while calibrating
+VELOCITY_MODEL_FILE_PATH = "velocity.bin" # File on the flash filesystem the calibrated velocity model is saved to
+VELOCITY_CALIBRATION_SPEEDS = (20, 35, 50, 70, 90) # Percentages of speed the velocity is measured at, in increasing order
+VELOCITY_CALIBRATION_DISTANCE_CM = 60 # Distance driven towards the wall and back at every speed while calibrating the velocity
+VELOCITY_CALIBRATION_MAX_SAMPLES = 100 # Most front ultrasonic readings collected in a run while calibrating the velocity
+VELOCITY_CALIBRATION_TIMEOUT_MS = 4000 # Longest time a run may take while calibrating the velocity, in case the robot doesn't move at a speed
+VELOCITY_CALIBRATION_SETTLE_MS = 500 # How long to wait for the robot to stand still and the filtered distance to catch up around a run
 
 # Derived constants
 ACTUAL_DISTANCE_MULTIPLIER_CM = SOUND_SPEED_CMPS / 2 / 1000000 # Speed of sound divided by 2 to get distance from wall
-ROBOT_SIDE_DISTANCES_SUM_CM = LABYRINTH_SQUARE_LENGTH_CM - ROBOT_WIDTH_CM # Sum of distances to the wall on the left and right side of the robot if in a closed square
+ROBOT_SIDE_DISTANCES_SUM_CM = LABYRINTH_SQUARE_LENGTH_CM - LABYRINTH_WALL_THICKNESS_CM - ROBOT_WIDTH_CM # Sum of distances to the wall on the left and right side of the robot if in a closed square
+SIDE_WALL_MAX_DISTANCE_CM = LABYRINTH_SQUARE_LENGTH_CM / 2 # Side readings further than this mean there is no wall next to the robot
+SPEED_RUN_ARC_RADIUS_CM = LABYRINTH_SQUARE_LENGTH_CM / 2 # Largest radius of the speed run's arcs, half a square
 
+# Pins, GPIO numbers, lib.hardware creates the pins from them on first use
 # Motor pins
-MOTOR_DRIVER_CARRIER_MODE_PIN = Pin(19, Pin.OUT)
-LEFT_MOTOR_ENABLE_PIN = Pin(26, Pin.OUT)
-LEFT_MOTOR_PHASE_PIN = Pin(21, Pin.OUT)
-RIGHT_MOTOR_ENABLE_PIN = Pin(28, Pin.OUT)
-RIGHT_MOTOR_PHASE_PIN = Pin(22, Pin.OUT)
+MOTOR_DRIVER_CARRIER_MODE_PIN = 19
+LEFT_MOTOR_ENABLE_PIN = 26
+LEFT_MOTOR_PHASE_PIN = 21
+RIGHT_MOTOR_ENABLE_PIN = 28
+RIGHT_MOTOR_PHASE_PIN = 22
 
 # Gyro pins
-GYRO_SCL_PIN = Pin(9)
-GYRO_SDA_PIN = Pin(8)
+GYRO_CONNECTED = False # Whether the robot drives with the gyro sensor, turns are timed without it
+GYRO_SCL_PIN = 9
+GYRO_SDA_PIN = 8
+GYRO_DRDY_PIN = None # Data ready pin of the magnetometer, None if it is not connected and readings are timed instead
 
 # Ultrasonic sensors pins
-LEFT_ULTRASONIC_TRIGGER_PIN = Pin(5, Pin.OUT)
-LEFT_ULTRASONIC_ECHO_PIN = Pin(6, Pin.IN)
-FRONT_ULTRASONIC_TRIGGER_PIN = Pin(14, Pin.OUT)
-FRONT_ULTRASONIC_ECHO_PIN = Pin(13, Pin.IN)
-RIGHT_ULTRASONIC_TRIGGER_PIN = Pin(3, Pin.OUT)
-RIGHT_ULTRASONIC_ECHO_PIN = Pin(4, Pin.IN)
-
-
-# Button pins
-MAPPING_BUTTON_OUT_PIN = Pin(17, Pin.OUT)
-MAPPING_BUTTON_IN_PIN = Pin(18, Pin.IN)
-SOLUTION_BUTTON_IN_PIN = Pin(12, Pin.OUT)
-SOLUTION_BUTTON_OUT_PIN = Pin(11, Pin.IN)
+LEFT_ULTRASONIC_TRIGGER_PIN = 5
+LEFT_ULTRASONIC_ECHO_PIN = 6
+FRONT_ULTRASONIC_TRIGGER_PIN = 14
+FRONT_ULTRASONIC_ECHO_PIN = 13
+RIGHT_ULTRASONIC_TRIGGER_PIN = 3
+RIGHT_ULTRASONIC_ECHO_PIN = 4
+
+
+# Button pins, the out pin is driven high and the in pin reads it through the pressed button
+MAPPING_BUTTON_OUT_PIN = 17
+MAPPING_BUTTON_IN_PIN = 18
+SOLUTION_BUTTON_IN_PIN = 12
+SOLUTION_BUTTON_OUT_PIN = 11
@@ -0,0 +1,128 @@
+"""Registry of the robot's hardware, pins and drivers are created from the pin numbers in constants.py on first use."""
+from machine import Pin
+
+from constants import MOTOR_DRIVER_CARRIER_MODE_PIN, LEFT_MOTOR_ENABLE_PIN, LEFT_MOTOR_PHASE_PIN, RIGHT_MOTOR_ENABLE_PIN, \
+                      RIGHT_MOTOR_PHASE_PIN, LEFT_MOTOR_CALIBRATION, RIGHT_MOTOR_CALIBRATION, GYRO_CONNECTED, GYRO_SCL_PIN, \
+                      GYRO_SDA_PIN, GYRO_DRDY_PIN, GYRO_I2C_ID, GYRO_I2C_FREQUENCY, GYRO_OUTPUT_RATE_HZ, GYRO_SAMPLES_AVERAGED, \
+                      GYRO_CALIBRATION_FILE_PATH, LEFT_ULTRASONIC_TRIGGER_PIN, LEFT_ULTRASONIC_ECHO_PIN, FRONT_ULTRASONIC_TRIGGER_PIN, \
+                      FRONT_ULTRASONIC_ECHO_PIN, RIGHT_ULTRASONIC_TRIGGER_PIN, RIGHT_ULTRASONIC_ECHO_PIN, ULTRASONIC_PING_PERIOD_MS, \
+                      MAPPING_BUTTON_OUT_PIN, MAPPING_BUTTON_IN_PIN, SOLUTION_BUTTON_OUT_PIN, SOLUTION_BUTTON_IN_PIN, \
+                      ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, ROBOT_HEIGHT_CM, VELOCITY_MODEL_FILE_PATH, VELOCITY_CALIBRATION_SPEEDS
+
+
+class Hardware(object):
+    def __init__(self) -> None:
+        """
+        Initialize Hardware class.
+
+        Nothing is created here. Every getter creates its pins and driver, importing the driver's module,
+        the first time it is called and returns the same ones after, so a program only sets up the hardware it uses.
+
+        :return: None
+        """
+        self.pins = {} # GPIO number -> Pin
+        self.motors = None
+        self.ultrasonic_sensors = None
+        self.ranger = None
+        self.gyro = None
+        self.buttons = None
+        self.robot = None
+
+    def get_pin(self, pin_id: int, mode: int=-1) -> Pin:
+        """
+        Get a pin, creating it in a mode the first time.
+
+        :param pin_id: GPIO number of the pin
+        :param mode: Pin.IN or Pin.OUT, -1 to leave the mode to the driver using the pin
+
+        :return: the pin
+        """
+        pin = self.pins.get(pin_id)
+        if pin is None:
+            pin = self.pins[pin_id] = Pin(pin_id, mode)
+        return pin
+
+    def get_motors(self):
+        """
+        Get the dual motor driver carrier with the calibrations in constants.py.
+
+        :return: DualMotorDriverCarrier of the motors
+        """
+        if self.motors is None:
+            from robot.motors.DualMotorDriverCarriers import DualMotorDriverCarrier
+            self.motors = DualMotorDriverCarrier(self.get_pin(LEFT_MOTOR_ENABLE_PIN, Pin.OUT), self.get_pin(LEFT_MOTOR_PHASE_PIN, Pin.OUT),
+                                                 self.get_pin(RIGHT_MOTOR_ENABLE_PIN, Pin.OUT), self.get_pin(RIGHT_MOTOR_PHASE_PIN, Pin.OUT),
+                                                 self.get_pin(MOTOR_DRIVER_CARRIER_MODE_PIN, Pin.OUT), LEFT_MOTOR_CALIBRATION,
+                                                 RIGHT_MOTOR_CALIBRATION)
+        return self.motors
+
+    def get_ultrasonic_sensors(self) -> tuple:
+        """
+        Get the ultrasonic sensors, they measure in the background once the ranger is started.
+
+        :return: tuple (left, front, right) of IRQUltraSonicSensor
+        """
+        if self.ultrasonic_sensors is None:
+            from robot.sensors.ultrasonic import IRQUltraSonicSensor
+            self.ultrasonic_sensors = (
+                IRQUltraSonicSensor(self.get_pin(LEFT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), self.get_pin(LEFT_ULTRASONIC_ECHO_PIN, Pin.IN)),
+                IRQUltraSonicSensor(self.get_pin(FRONT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), self.get_pin(FRONT_ULTRASONIC_ECHO_PIN, Pin.IN)),
+                IRQUltraSonicSensor(self.get_pin(RIGHT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), self.get_pin(RIGHT_ULTRASONIC_ECHO_PIN, Pin.IN)),
+            )
+        return self.ultrasonic_sensors
+
+    def get_ranger(self):
+        """
+        Get the background pinger of the ultrasonic sensors, started.
+
+        :return: UltraSonicRanger of the ultrasonic sensors
+        """
+        if self.ranger is None:
+            from robot.sensors.ultrasonic import UltraSonicRanger
+            self.ranger = UltraSonicRanger(self.get_ultrasonic_sensors(), ULTRASONIC_PING_PERIOD_MS)
+            self.ranger.start()
+        return self.ranger
+
+    def get_gyro(self, calibration_path: str=GYRO_CALIBRATION_FILE_PATH):
+        """
+        Get the gyro sensor.
+
+        :param calibration_path: file the calibration is loaded from the first time, None for the driver's default calibration
+
+        :return: GyroSensor of the magnetometer
+        """
+        if self.gyro is None:
+            from robot.sensors.gyro import GyroSensor
+            drdy = None if GYRO_DRDY_PIN is None else self.get_pin(GYRO_DRDY_PIN, Pin.IN)
+            self.gyro = GyroSensor(self.get_pin(GYRO_SCL_PIN), self.get_pin(GYRO_SDA_PIN), GYRO_I2C_ID, GYRO_I2C_FREQUENCY,
+                                   GYRO_OUTPUT_RATE_HZ, GYRO_SAMPLES_AVERAGED, drdy, calibration_path)
+        return self.gyro
+
+    def get_buttons(self) -> tuple:
+        """
+        Get the pins reading the buttons, driving the other side of the buttons high.
+
+        :return: tuple (mapping_button, solution_button) of pins that read 1 while their button is pressed
+        """
+        if self.buttons is None:
+            self.get_pin(MAPPING_BUTTON_OUT_PIN, Pin.OUT).value(1)
+            self.get_pin(SOLUTION_BUTTON_OUT_PIN, Pin.OUT).value(1)
+            self.buttons = (self.get_pin(MAPPING_BUTTON_IN_PIN, Pin.IN), self.get_pin(SOLUTION_BUTTON_IN_PIN, Pin.IN))
+        return self.buttons
+
+    def get_robot(self):
+        """
+        Get the robot with the motors, ultrasonic sensors, the gyro sensor if it is connected and the saved velocity model.
+
+        :return: Robot driving the hardware
+        """
+        if self.robot is None:
+            from robot.robot import Robot
+            from robot.velocity import load_velocity_model
+            left_ultrasonic, front_ultrasonic, right_ultrasonic = self.get_ultrasonic_sensors()
+            gyro = self.get_gyro() if GYRO_CONNECTED else None
+            # Velocity proportional to speed if the velocity has not been calibrated
+            velocity_model = load_velocity_model(VELOCITY_MODEL_FILE_PATH, VELOCITY_CALIBRATION_SPEEDS)
+            self.robot = Robot(self.get_motors(), gyro, left_ultrasonic, front_ultrasonic, right_ultrasonic,
+                               ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, ROBOT_HEIGHT_CM, self.get_ranger(), velocity_model)
+        return self.robot
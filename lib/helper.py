@@ -1,15 +1,11 @@
-"""General helper functions"""
-from machine import Pin
-
-from robot.robot import Robot
+"""General helper functions, the hardware's modules are only imported once they are used"""
 from mazesolver.maze import Maze
-from robot.motors.DualMotorDriverCarriers import DualMotorDriverCarrier
-#from robot.sensors.gyro import GyroSensor
-from robot.sensors.ultrasonic import UltraSonicSensor
-from constants import *
+from constants import LABYRINTH_SQUARES_HORIZONTAL, LABYRINTH_SQUARES_VERTICAL, LABYRINTH_SQUARE_LENGTH_CM
+
+hardware = None # Hardware registry of the program, created by the first get_hardware
 
 
-def set_pin_modes(mode: int, *pins: Pin) -> None:
+def set_pin_modes(mode: int, *pins) -> None:
     """
     Set given pins to a given value.
 
@@ -20,40 +16,33 @@ def set_pin_modes(mode: int, *pins: Pin) -> None:
         pin.value(mode)
 
 
-def get_robot() -> Robot:
+def get_hardware():
     """
-    Get a robot with values given in constants.py
+    Get the hardware registry shared by the whole program, so every user gets the same pins and drivers.
 
-    :return: a robot with parameters specifid in constants file
+    :return: Hardware of the pins in constants.py, the same one on every call
     """
-    dmdc = DualMotorDriverCarrier(LEFT_MOTOR_ENABLE_PIN, LEFT_MOTOR_PHASE_PIN, RIGHT_MOTOR_ENABLE_PIN, RIGHT_MOTOR_PHASE_PIN, MOTOR_DRIVER_CARRIER_MODE_PIN)
-    
-    #gyro = GyroSensor(GYRO_SCL_PIN, GYRO_SDA_PIN)
-    gyro = None
-    l_us = UltraSonicSensor(LEFT_ULTRASONIC_TRIGGER_PIN, LEFT_ULTRASONIC_ECHO_PIN)
-    f_us = UltraSonicSensor(FRONT_ULTRASONIC_TRIGGER_PIN, FRONT_ULTRASONIC_ECHO_PIN)
-    r_us = UltraSonicSensor(RIGHT_ULTRASONIC_TRIGGER_PIN, RIGHT_ULTRASONIC_ECHO_PIN)
+    global hardware
+    if hardware is None:
+        from lib.hardware import Hardware
+        hardware = Hardware()
+    return hardware
 
-    robot = Robot(dmdc, gyro, l_us, f_us, r_us, ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, ROBOT_HEIGHT_CM)
-    return robot
 
-
-def get_maze() -> Maze:
+def get_robot():
     """
-    Get a maze with values given in constants.py
+    Get a robot with values given in constants.py
 
-    :return: a maze with specified size and initial values set to 0
+    :return: a robot with parameters specifid in constants file, the same one on every call
     """
-    return Maze(LABYRINTH_SQUARES_HORIZONTAL, LABYRINTH_SQUARES_VERTICAL, LABYRINTH_SQUARE_LENGTH_CM, 0)
+    return get_hardware().get_robot()
 
 
-def execute_commands(commands) -> None:
+def get_maze() -> Maze:
     """
-    Execute given commands.
+    Get a maze with values given in constants.py
 
-    :param commands: list of commands
-    
-    :return: None
+    :return: a maze with specified size where only the outer walls are known
     """
-    for command, parameters in commands:
-        command(*parameters)
+    return Maze(LABYRINTH_SQUARES_HORIZONTAL, LABYRINTH_SQUARES_VERTICAL, LABYRINTH_SQUARE_LENGTH_CM)
+
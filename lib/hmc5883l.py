@@ -24,14 +24,38 @@
 # G-271 HMC5883L library to use magnetometer with Raspberry PI Pico (MicroPython)
 # Ported from gvalkov/micropython-esp8266-hmc5883l code (ESP8266) -> https://github.com/gvalkov/micropython-esp8266-hmc5883l
 # X and Y calibration offsets added
+# Hardware I2C, configurable output rate and averaging, and caching of readings within one sample period added
+# Heading in tenths of degrees from a precomputed arctangent table added
+# Hard and soft iron calibration set per instance instead of X and Y offsets
 
 import math
+import time
 import machine
 from machine import Pin
 
 from ustruct import pack
 from array import array
 
+# Arctangent of every ratio 0, 1 / ATAN_STEPS ... 1 in tenths of degrees, one octant is enough for a full circle
+ATAN_STEPS = 512
+ATAN_TABLE = array('H', [round(math.atan(i / ATAN_STEPS) * 1800 / math.pi) for i in range(ATAN_STEPS + 1)])
+
+def atan2_tenths(y, x):
+    # Angle of the vector (x, y) from the x axis towards the y axis in tenths of degrees (0 to 3599)
+    ax = -x if x < 0 else x
+    ay = -y if y < 0 else y
+    if ax >= ay:
+        if ax == 0:
+            return 0
+        angle = ATAN_TABLE[int(ay * ATAN_STEPS / ax + 0.5)]
+    else:
+        angle = 900 - ATAN_TABLE[int(ax * ATAN_STEPS / ay + 0.5)]
+    if x < 0:
+        angle = 1800 - angle
+    if y < 0:
+        angle = 3600 - angle
+    return angle % 3600
+
 class HMC5883L:
     __gain__ = {
         '0.88': (0 << 5, 0.73),
@@ -44,43 +68,103 @@ class HMC5883L:
         '8.1':  (7 << 5, 4.35)
     }
 
-    # Correction to be set after calibration
-    xs=1
-    ys=0.9137255
-    xb=-228.75
-    yb=-165.31
+    # Data output rates in Hz and their configuration register A bits
+    __rate__ = {
+        0.75: 0 << 2,
+        1.5:  1 << 2,
+        3:    2 << 2,
+        7.5:  3 << 2,
+        15:   4 << 2,
+        30:   5 << 2,
+        75:   6 << 2
+    }
+
+    # Samples averaged per measurement and their configuration register A bits
+    __samples__ = {
+        1: 0 << 5,
+        2: 1 << 5,
+        4: 2 << 5,
+        8: 3 << 5
+    }
 
-    def __init__(self, scl: Pin, sda: Pin, address=0x1e, gauss='1.9', declination=(9, 73)):
-        self.i2c = i2c = machine.SoftI2C(scl=scl, sda=sda, freq=15000)
+    # Correction used until a calibration is set: hard iron offsets of X and Y,
+    # then the soft iron matrix (xx, xy, yy) that turns the offset readings into a circle
+    default_calibration = (228.75, 180.92, 1, 0, 0.9137255)
 
-        # Initialize sensor.
-        i2c.start()
+    def __init__(self, scl: Pin, sda: Pin, address=0x1e, gauss='1.9', declination=(9, 73),
+                 i2c_id=None, freq=15000, rate=15, samples=8, drdy: Pin=None, calibration=None):
+        # Hardware I2C if a bus id is given, it runs at 400 kHz where software I2C is slow and blocks longer
+        if i2c_id is None:
+            self.i2c = i2c = machine.SoftI2C(scl=scl, sda=sda, freq=freq)
+        else:
+            self.i2c = i2c = machine.I2C(i2c_id, scl=scl, sda=sda, freq=freq)
+        self.address = address
 
         # Configuration register A:
-        #   0bx11xxxxx  -> 8 samples averaged per measurement
-        #   0bxxx100xx  -> 15 Hz, rate at which data is written to output registers
+        #   0bx??xxxxx  -> samples averaged per measurement
+        #   0bxxx???xx  -> rate at which data is written to output registers
         #   0bxxxxxx00  -> Normal measurement mode
-        i2c.writeto_mem(0x1e, 0x00, pack('B', 0b111000))
+        i2c.writeto_mem(address, 0x00, pack('B', self.__samples__[samples] | self.__rate__[rate]))
 
         # Configuration register B:
         reg_value, self.gain = self.__gain__[gauss]
-        i2c.writeto_mem(0x1e, 0x01, pack('B', reg_value))
+        i2c.writeto_mem(address, 0x01, pack('B', reg_value))
 
         # Set mode register to continuous mode.
-        i2c.writeto_mem(0x1e, 0x02, pack('B', 0x00))
-        i2c.stop()
+        i2c.writeto_mem(address, 0x02, pack('B', 0x00))
 
-        # Convert declination (tuple of degrees and minutes) to radians.
+        # Convert declination (tuple of degrees and minutes) to radians and to tenths of degrees.
         self.declination = (declination[0] + declination[1] / 60) * math.pi / 180
+        self.declination_tenths = round((declination[0] + declination[1] / 60) * 10)
 
         # Reserve some memory for the raw xyz measurements.
         self.data = array('B', [0] * 6)
+        self.set_calibration(self.default_calibration if calibration is None else calibration)
+
+        # Latest reading, returned until the sensor has a new one
+        self.x = self.y = self.z = 0
+        self.raw_x = self.raw_y = 0
+        self.sample_count = 0 # Increases with every new reading, so users can cache values computed from a reading
+        self.sample_period_us = int(1000000 / rate)
+        self.read_time = 0
+
+        # DRDY goes low for 250 us when new data is in the output registers, without it readings are timed
+        self.drdy = drdy
+        self.data_ready = True
+        if drdy is not None:
+            drdy.init(Pin.IN, Pin.PULL_UP)
+            drdy.irq(handler=self._on_data_ready, trigger=Pin.IRQ_FALLING)
+
+    def _on_data_ready(self, pin):
+        self.data_ready = True
+
+    def is_data_ready(self):
+        # Whether the sensor has a reading newer than the cached one
+        if self.drdy is not None:
+            return self.data_ready
+        return self.sample_count == 0 or time.ticks_diff(time.ticks_us(), self.read_time) >= self.sample_period_us
+
+    def set_calibration(self, calibration):
+        # calibration is (x offset, y offset, xx, xy, yy) as in default_calibration
+        self.calibration = tuple(calibration)
+        self.x_offset, self.y_offset, self.xx, self.xy, self.yy = self.calibration
+
+    def read_raw(self):
+        # Latest reading without the calibration applied, as x, y and z
+        self.read()
+        return self.raw_x, self.raw_y, self.z
 
     def read(self):
+        # Within one sample period the sensor has nothing new, so the cached reading is returned without using the bus
+        if not self.is_data_ready():
+            return self.x, self.y, self.z
+        self.data_ready = False
+        self.read_time = time.ticks_us()
+
         data = self.data
         gain = self.gain
 
-        self.i2c.readfrom_mem_into(0x1e, 0x03, data)
+        self.i2c.readfrom_mem_into(self.address, 0x03, data)
     
         x = (data[0] << 8) | data[1]
         y = (data[4] << 8) | data[5]
@@ -95,9 +179,13 @@ class HMC5883L:
         z = z * gain
         
         # Apply calibration corrections
-        x = x * self.xs + self.xb
-        y = y * self.ys + self.yb
+        self.raw_x, self.raw_y = x, y
+        x -= self.x_offset
+        y -= self.y_offset
+        x, y = self.xx * x + self.xy * y, self.xy * x + self.yy * y
 
+        self.x, self.y, self.z = x, y, z
+        self.sample_count += 1
         return x, y, z
 
     def heading(self, x, y):
@@ -118,6 +206,10 @@ class HMC5883L:
         minutes = round((heading - degrees) * 60)
         return degrees, minutes
 
+    def heading_tenths(self, x, y):
+        # Same heading as heading() in tenths of degrees (0 to 3599), without floating point trigonometry
+        return (atan2_tenths(y, x) + self.declination_tenths) % 3600
+
     def format_result(self, x, y, z):
         degrees, minutes = self.heading(x, y)
         return 'X: {:.4f}, Y: {:.4f}, Z: {:.4f}, Heading: {}° {}′ '.format(x, y, z, degrees, minutes)
\ No newline at end of file
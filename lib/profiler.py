@@ -0,0 +1,244 @@
+"""Opt-in timing of the robot's hot paths with call counts and latency histograms."""
+import time
+from array import array
+try:
+    from time import perf_counter_ns
+except ImportError: # MicroPython, its ticks_us is the processor's time
+    perf_counter_ns = None
+
+DEFAULT_BUCKET_LIMITS_US = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000) # Upper limits of the histogram buckets, the last bucket is everything above
+
+
+class Probe(object):
+    def __init__(self, name: str, bucket_limits_us: tuple) -> None:
+        """
+        Initialize Probe class.
+
+        :param name: name of the probe in the report
+        :param bucket_limits_us: increasing upper limits of the latency histogram's buckets in microseconds
+
+        :return: None
+        """
+        self.name = name
+        self.bucket_limits_us = bucket_limits_us
+        self.histogram = array('L', [0] * (len(bucket_limits_us) + 1))
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget all measured calls.
+
+        :return: None
+        """
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+
+    def add(self, duration_us: int) -> None:
+        """
+        Count a call.
+
+        :param duration_us: how long the call took in microseconds
+
+        :return: None
+        """
+        self.count += 1
+        self.total_us += duration_us
+        if duration_us > self.max_us:
+            self.max_us = duration_us
+        bucket = 0
+        for limit in self.bucket_limits_us:
+            if duration_us < limit:
+                break
+            bucket += 1
+        self.histogram[bucket] += 1
+
+
+class Profiler(object):
+    def __init__(self, bucket_limits_us: tuple=DEFAULT_BUCKET_LIMITS_US) -> None:
+        """
+        Initialize Profiler class.
+
+        Methods are timed by replacing them on their class with a wrapper reading ticks_us around the call.
+        Nothing is replaced until a method is wrapped, so a profiler that is not used costs nothing.
+        In the simulator ticks_us is the simulated time, so the probes measure the robot's time, not the processor's.
+        Methods that only compute take no simulated time, wrap_computation times them with the processor's clock instead.
+
+        :param bucket_limits_us: increasing upper limits of the latency histograms' buckets in microseconds
+
+        :return: None
+        """
+        self.bucket_limits_us = bucket_limits_us
+        self.probes = []
+        self.originals = [] # (owner, name, original function) of every wrapped method
+
+    def wrap(self, owner, name: str, probe_name: str=None) -> Probe:
+        """
+        Time every call of a method.
+
+        :param owner: class the method is on
+        :param name: name of the method
+        :param probe_name: name of the probe in the report, "Class.method" by default
+
+        :return: probe counting the calls
+        """
+        function = getattr(owner, name)
+        probe = Probe(probe_name or owner.__name__ + "." + name, self.bucket_limits_us)
+
+        def timed(*args, **kwargs):
+            start = time.ticks_us()
+            result = function(*args, **kwargs)
+            probe.add(time.ticks_diff(time.ticks_us(), start))
+            return result
+
+        self.install(owner, name, function, timed, probe)
+        return probe
+
+    def wrap_computation(self, owner, name: str, probe_name: str=None) -> Probe:
+        """
+        Time every call of a method that only computes, with the processor's clock.
+
+        Uses time.perf_counter_ns where there is one, on the host it is the host's processor that is timed.
+
+        :param owner: class the method is on
+        :param name: name of the method
+        :param probe_name: name of the probe in the report, "Class.method" by default
+
+        :return: probe counting the calls
+        """
+        if perf_counter_ns is None:
+            return self.wrap(owner, name, probe_name)
+        function = getattr(owner, name)
+        probe = Probe(probe_name or owner.__name__ + "." + name, self.bucket_limits_us)
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            result = function(*args, **kwargs)
+            probe.add((perf_counter_ns() - start) // 1000)
+            return result
+
+        self.install(owner, name, function, timed, probe)
+        return probe
+
+    def wrap_async(self, owner, name: str, probe_name: str=None) -> Probe:
+        """
+        Time every call of an async method, including the time other tasks run while it waits.
+
+        :param owner: class the method is on
+        :param name: name of the method
+        :param probe_name: name of the probe in the report, "Class.method" by default
+
+        :return: probe counting the calls
+        """
+        function = getattr(owner, name)
+        probe = Probe(probe_name or owner.__name__ + "." + name, self.bucket_limits_us)
+
+        async def timed(*args, **kwargs):
+            start = time.ticks_us()
+            result = await function(*args, **kwargs)
+            probe.add(time.ticks_diff(time.ticks_us(), start))
+            return result
+
+        self.install(owner, name, function, timed, probe)
+        return probe
+
+    def install(self, owner, name: str, function, wrapper, probe: Probe) -> None:
+        """
+        Replace a method with its wrapper.
+
+        :param owner: class the method is on
+        :param name: name of the method
+        :param function: original method
+        :param wrapper: function calling the original method
+        :param probe: probe of the wrapper
+
+        :return: None
+        """
+        setattr(owner, name, wrapper)
+        self.originals.append((owner, name, function))
+        self.probes.append(probe)
+
+    def unwrap(self) -> None:
+        """
+        Put back the original methods, the probes keep their counts.
+
+        :return: None
+        """
+        for owner, name, function in reversed(self.originals):
+            setattr(owner, name, function)
+        self.originals = []
+
+    def reset(self) -> None:
+        """
+        Forget the calls measured by all probes.
+
+        :return: None
+        """
+        for probe in self.probes:
+            probe.reset()
+
+    def report(self) -> None:
+        """
+        Print the calls, total and mean time, longest call and latency histogram of every probe that was called.
+
+        :return: None
+        """
+        limits = self.bucket_limits_us
+        buckets = ["<{}".format(format_us(limit)) for limit in limits] + [">={}".format(format_us(limits[-1]))]
+        print("{:<44}{:>8}{:>12}{:>12}{:>12}  {}".format("probe", "calls", "total ms", "mean us", "max us", " ".join(
+            "{:>7}".format(bucket) for bucket in buckets)))
+        for probe in self.probes:
+            if probe.count == 0:
+                continue
+            print("{:<44}{:>8}{:>12.1f}{:>12.0f}{:>12}  {}".format(probe.name, probe.count, probe.total_us / 1000,
+                  probe.total_us / probe.count, probe.max_us, " ".join("{:>7}".format(count) for count in probe.histogram)))
+
+
+def format_us(duration_us: int) -> str:
+    """
+    Format a duration for the report's histogram header.
+
+    :param duration_us: duration in microseconds
+
+    :return: duration in the largest unit it is a whole number of, for example "300us", "3ms" or "1s"
+    """
+    if duration_us % 1000000 == 0:
+        return "{}s".format(duration_us // 1000000)
+    if duration_us % 1000 == 0:
+        return "{}ms".format(duration_us // 1000)
+    return "{}us".format(duration_us)
+
+
+def profile_hot_paths(profiler: Profiler) -> None:
+    """
+    Time the sensing, turning, exploration and solving paths of the robot.
+
+    :param profiler: profiler to wrap the methods with
+
+    :return: None
+    """
+    from robot.robot import Robot
+    from robot.sensors.gyro import GyroSensor
+    from robot.sensors.ultrasonic import UltraSonicSensor, IRQUltraSonicSensor
+    from mazesolver.mazerunner import MazeRunner
+    from mazesolver.mazemapper import MazeMapper
+    from mazesolver.mazesolver import MazeSolver
+
+    profiler.wrap(UltraSonicSensor, "measure_distance")
+    profiler.wrap(IRQUltraSonicSensor, "measure_distance")
+    profiler.wrap(GyroSensor, "get_angle")
+    profiler.wrap(GyroSensor, "get_unwrapped_angle")
+    profiler.wrap(Robot, "estimate_distances")
+    profiler.wrap(Robot, "turn_until")
+    profiler.wrap(Robot, "turn_90_degrees")
+    profiler.wrap(Robot, "drive")
+    profiler.wrap(MazeRunner, "drive_to_next_square_center")
+    profiler.wrap_async(MazeRunner, "drive_to_next_square_center_async")
+    profiler.wrap_async(MazeRunner, "turn_to_angle_async")
+    profiler.wrap(MazeMapper, "explore_square")
+    profiler.wrap_computation(MazeMapper, "update_distances")
+    profiler.wrap_computation(MazeMapper, "flood_distances")
+    profiler.wrap_computation(MazeSolver, "find_fastest_path")
+    profiler.wrap_computation(MazeSolver, "construct_speed_run_plan")
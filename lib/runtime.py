@@ -0,0 +1,208 @@
+"""Asyncio runtime running sensing, control and I/O of the robot as separate tasks."""
+import time
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+from machine import Pin
+
+from robot.robot import Robot
+from robot.motion import MotionController
+from mazesolver.mazemapper import MazeMapper
+from lib.storage import save_map
+from lib.telemetry import Telemetry
+from lib.profiler import Profiler
+from constants import CONTROL_PERIOD_MS, HEADING_PERIOD_MS, BUTTON_POLL_PERIOD_MS
+
+
+class Runtime(object):
+    def __init__(self, robot: Robot, maze_mapper: MazeMapper, motion: MotionController, mapping_button: Pin, solution_button: Pin, telemetry_period_ms: int=0, plan=None, map_path: str=None,
+                 telemetry: Telemetry=None, telemetry_path: str=None, profiler: Profiler=None) -> None:
+        """
+        Initialize Runtime class.
+
+        :param robot: robot to run
+        :param maze_mapper: mapper of the maze the robot is in
+        :param motion: motion controller driving the solution
+        :param mapping_button: pin that reads 1 while the mapping button is pressed
+        :param solution_button: pin that reads 1 while the solution button is pressed
+        :param telemetry_period_ms: milliseconds between telemetry records, 0 to not record
+        :param plan: plan instructions of the solution run if the maze is already mapped, None to map it first
+        :param map_path: file to save the map and the plan to after mapping, None to not save them
+        :param telemetry: buffer to record the sensor values, motor speeds and position into, None to not record
+        :param telemetry_path: file to save the records of every run to after it, print them with scripts/dumptelemetry.py
+        :param profiler: profiler of the hot paths to print the report of after every run, None to not print it
+
+        :return: None
+        """
+        self.robot = robot
+        self.maze_mapper = maze_mapper
+        self.motion = motion
+        self.mapping_button = mapping_button
+        self.solution_button = solution_button
+        self.telemetry_period_ms = telemetry_period_ms
+        self.map_path = map_path
+        self.telemetry = telemetry
+        self.telemetry_path = telemetry_path
+        self.profiler = profiler
+
+        self.mapping_event = asyncio.Event()
+        self.solution_event = asyncio.Event()
+        self.plan = plan
+
+        # Latest sensor values, updated by the sensing tasks
+        self.distances = (0, 0, 0)
+        self.heading = 0
+
+    async def ranging_task(self) -> None:
+        """
+        Keep the distance estimates up to date.
+
+        :return: None
+        """
+        while True:
+            self.distances = self.robot.estimate_distances()
+            await asyncio.sleep_ms(CONTROL_PERIOD_MS)
+
+    async def heading_task(self) -> None:
+        """
+        Keep the heading up to date.
+
+        :return: None
+        """
+        gyro = self.robot.gyro
+        if gyro is None:
+            return
+        while True:
+            self.heading = gyro.get_angle()
+            await asyncio.sleep_ms(HEADING_PERIOD_MS)
+
+    async def button_task(self) -> None:
+        """
+        Turn button presses into events.
+
+        :return: None
+        """
+        mapping_pressed = solution_pressed = False
+        while True:
+            if self.mapping_button.value() == 1 and not mapping_pressed:
+                self.mapping_event.set()
+            if self.solution_button.value() == 1 and not solution_pressed:
+                self.solution_event.set()
+            mapping_pressed = self.mapping_button.value() == 1
+            solution_pressed = self.solution_button.value() == 1
+            await asyncio.sleep_ms(BUTTON_POLL_PERIOD_MS)
+
+    async def telemetry_task(self) -> None:
+        """
+        Record the latest sensor values, the motor speeds and the square the robot is in.
+
+        :return: None
+        """
+        telemetry = self.telemetry
+        if telemetry is None or self.telemetry_period_ms <= 0:
+            return
+        motors = self.robot.motors
+        maze_mapper = self.maze_mapper
+        while True:
+            left_distance, front_distance, right_distance = self.distances
+            x, y, angle = maze_mapper.position
+            telemetry.record(time.ticks_ms(), left_distance, front_distance, right_distance, self.heading,
+                             motors.left_motor_speed, motors.right_motor_speed, x, y, angle)
+            await asyncio.sleep_ms(self.telemetry_period_ms)
+
+    def start_run(self) -> None:
+        """
+        Clear the telemetry and the profiler, so they hold only the run that starts.
+
+        :return: None
+        """
+        if self.telemetry is not None:
+            self.telemetry.clear()
+        if self.profiler is not None:
+            self.profiler.reset()
+
+    def finish_run(self) -> None:
+        """
+        Save the telemetry and print the profiler's report of the run that just ended.
+
+        :return: None
+        """
+        if self.telemetry is not None and self.telemetry_path is not None:
+            self.telemetry.save(self.telemetry_path)
+        if self.profiler is not None:
+            self.profiler.report()
+
+    async def map_maze(self) -> float:
+        """
+        Map the maze, plan the solution run and save them.
+
+        :return: estimated time of the solution run in seconds
+        """
+        maze_mapper = self.maze_mapper
+        self.start_run()
+        if not await maze_mapper.map_maze_flood_fill_async(maze_mapper.start_x, maze_mapper.start_y, 0):
+            print("No known path back to the start from square {}, put the robot back at the start".format(maze_mapper.position[:2]))
+        plan, estimated_time = maze_mapper.get_maze_solver().find_and_construct_speed_run_plan()
+        self.finish_run()
+        print("Estimated solution time:", estimated_time)
+        self.plan = bytes(plan)
+        if self.map_path is not None:
+            save_map(self.map_path, maze_mapper, self.plan)
+        return estimated_time
+
+    async def run_solution(self) -> None:
+        """
+        Drive the planned solution run to the center.
+
+        :return: None
+        """
+        self.start_run()
+        await self.motion.execute_async(self.plan)
+        self.finish_run()
+
+    async def mapping_task(self) -> None:
+        """
+        Map the maze every time the mapping button is pressed.
+
+        :return: None
+        """
+        while True:
+            await self.mapping_event.wait()
+            await self.map_maze()
+            self.mapping_event.clear()
+            self.solution_event.clear() # Presses during mapping are ignored
+
+    async def solution_task(self) -> None:
+        """
+        Drive to the center every time the solution button is pressed after the maze has been mapped.
+
+        :return: None
+        """
+        while True:
+            await self.solution_event.wait()
+            if self.plan is not None:
+                await asyncio.sleep(1)
+                await self.run_solution()
+            self.solution_event.clear()
+
+    def start_sensing(self) -> None:
+        """
+        Start the tasks keeping the sensor values and the telemetry up to date.
+
+        :return: None
+        """
+        asyncio.create_task(self.ranging_task())
+        asyncio.create_task(self.heading_task())
+        asyncio.create_task(self.telemetry_task())
+
+    async def run(self) -> None:
+        """
+        Start all tasks and run forever.
+
+        :return: None
+        """
+        self.start_sensing()
+        asyncio.create_task(self.button_task())
+        asyncio.create_task(self.mapping_task())
+        await self.solution_task()
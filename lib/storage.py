@@ -0,0 +1,145 @@
+"""Saving the mapped maze, the planned route and calibrations to flash, so they survive a reset."""
+import os
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+from binascii import crc32
+
+MAP_FILE_MAGIC = b"MAZE"
+MAP_FILE_VERSION = 2 # Version 1 plans had a PLAN_SYNC opcode, the opcodes after it were numbered one higher
+# Magic, version, width, height, start x, start y, horizontal position found, plan length
+MAP_FILE_HEADER = "<4sBBBBBBH"
+MAP_FILE_HEADER_SIZE = struct.calcsize(MAP_FILE_HEADER)
+
+
+def write_checked_file(path: str, *parts) -> None:
+    """
+    Write data followed by its CRC-32 to a file.
+
+    The data is written to a temporary file first, so a reset while saving keeps the old file intact.
+
+    :param path: path of the file on the flash filesystem
+    :param parts: bytes-like objects to write one after another
+
+    :return: None
+    """
+    checksum = 0
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        for part in parts:
+            checksum = crc32(part, checksum)
+            file.write(part)
+        file.write(struct.pack("<I", checksum & 0xFFFFFFFF))
+    os.rename(temporary_path, path)
+
+
+def read_checked_file(path: str) -> bytes:
+    """
+    Read a file written with write_checked_file.
+
+    :param path: path of the file on the flash filesystem
+
+    :return: data without the CRC-32, None if the file is missing or corrupted
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    end = len(data) - 4
+    if end < 0 or crc32(memoryview(data)[:end]) & 0xFFFFFFFF != struct.unpack_from("<I", data, end)[0]:
+        return None
+    return data[:end]
+
+
+def save_floats(path: str, magic: bytes, values) -> None:
+    """
+    Save numbers, for example a calibration, to a file.
+
+    :param path: path of the file on the flash filesystem
+    :param magic: 4 bytes telling what the numbers are
+    :param values: numbers to save as 32 bit floats
+
+    :return: None
+    """
+    write_checked_file(path, magic, struct.pack("<{}f".format(len(values)), *values))
+
+
+def load_floats(path: str, magic: bytes, count: int) -> tuple:
+    """
+    Load numbers saved with save_floats.
+
+    :param path: path of the file on the flash filesystem
+    :param magic: 4 bytes the numbers were saved with
+    :param count: how many numbers there must be
+
+    :return: the numbers, None if the file is missing, corrupted or holds something else
+    """
+    data = read_checked_file(path)
+    if data is None or len(data) != 4 + 4 * count or data[:4] != magic:
+        return None
+    return struct.unpack_from("<{}f".format(count), data, 4)
+
+
+def save_map(path: str, maze_mapper, plan) -> None:
+    """
+    Save the mapped maze, visited squares, start corner and compiled plan to a file.
+
+    The file is a header, the maze's squares, the visited mask and the plan, followed by a CRC-32 of all of it.
+
+    :param path: path of the file on the flash filesystem
+    :param maze_mapper: MazeMapper that mapped the maze
+    :param plan: plan instructions of the solution run (see robot.plan)
+
+    :return: None
+    """
+    maze = maze_mapper.maze
+    header = struct.pack(MAP_FILE_HEADER, MAP_FILE_MAGIC, MAP_FILE_VERSION, maze.width, maze.height,
+                         maze_mapper.start_x, maze_mapper.start_y, int(maze_mapper.horizontal_pos_found), len(plan))
+    write_checked_file(path, header, maze.cells, maze_mapper.visited, plan)
+
+
+def load_map(path: str, maze_mapper) -> bytes:
+    """
+    Load a map saved with save_map into a mapper.
+
+    Nothing is loaded if the file is missing, was written by another version, is corrupted or is of another size of maze.
+
+    :param path: path of the file on the flash filesystem
+    :param maze_mapper: MazeMapper to load the maze, visited squares and start corner into
+
+    :return: plan instructions of the solution run, None if there is no valid map
+    """
+    data = read_checked_file(path)
+    if data is None or len(data) < MAP_FILE_HEADER_SIZE:
+        return None
+    magic, version, width, height, start_x, start_y, horizontal_pos_found, plan_length = struct.unpack_from(MAP_FILE_HEADER, data)
+    maze = maze_mapper.maze
+    size = width * height
+    if magic != MAP_FILE_MAGIC or version != MAP_FILE_VERSION or width != maze.width or height != maze.height or \
+       len(data) != MAP_FILE_HEADER_SIZE + 2 * size + plan_length:
+        return None
+
+    maze.cells[:] = data[MAP_FILE_HEADER_SIZE:MAP_FILE_HEADER_SIZE + size]
+    maze.update_index()
+    maze_mapper.visited[:] = data[MAP_FILE_HEADER_SIZE + size:MAP_FILE_HEADER_SIZE + 2 * size]
+    maze_mapper.start_x = start_x
+    maze_mapper.start_y = start_y
+    maze_mapper.horizontal_pos_found = bool(horizontal_pos_found)
+    return data[MAP_FILE_HEADER_SIZE + 2 * size:]
+
+
+def delete_file(path: str) -> None:
+    """
+    Delete a saved map or calibration, so the next boot starts without it.
+
+    :param path: path of the file on the flash filesystem
+
+    :return: None
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
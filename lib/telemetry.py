@@ -0,0 +1,123 @@
+"""Recording what the robot sensed and did during a run into a fixed size buffer, printed over USB serial after the run."""
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+from lib.storage import write_checked_file, read_checked_file
+
+TELEMETRY_FILE_MAGIC = b"TLMY"
+# Time in ticks_ms, left, front and right distances in centimeters, heading in degrees, left and right motor speeds, x, y, angle // 90
+TELEMETRY_RECORD = "<IffffbbBBB"
+TELEMETRY_RECORD_SIZE = struct.calcsize(TELEMETRY_RECORD)
+TELEMETRY_HEADER = "<4sH" # Magic, record count
+TELEMETRY_HEADER_SIZE = struct.calcsize(TELEMETRY_HEADER)
+TELEMETRY_COLUMNS = "time_ms,left_cm,front_cm,right_cm,heading_deg,left_speed,right_speed,x,y,direction"
+
+
+class Telemetry(object):
+    def __init__(self, capacity: int) -> None:
+        """
+        Initialize Telemetry class.
+
+        Records are packed into a buffer allocated here, the oldest records are overwritten once it is full.
+        Recording allocates nothing, so it can run next to the control loop, unlike printing.
+
+        :param capacity: how many records the buffer holds
+
+        :return: None
+        """
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * TELEMETRY_RECORD_SIZE)
+        self.position = 0 # Index of the record written next
+        self.count = 0 # How many records the buffer holds
+
+    def clear(self) -> None:
+        """
+        Forget all records.
+
+        :return: None
+        """
+        self.position = 0
+        self.count = 0
+
+    def record(self, timestamp: int, left_distance: float, front_distance: float, right_distance: float, heading: float,
+               left_motor_speed: int, right_motor_speed: int, x: int, y: int, angle: int) -> None:
+        """
+        Record the state of the robot.
+
+        :param timestamp: ticks_ms time of the record
+        :param left_distance: distance to the wall on the left in centimeters
+        :param front_distance: distance to the wall in front in centimeters
+        :param right_distance: distance to the wall on the right in centimeters
+        :param heading: heading of the robot in degrees
+        :param left_motor_speed: percentage of speed the left motor was set to (-100 to 100)
+        :param right_motor_speed: percentage of speed the right motor was set to (-100 to 100)
+        :param x: x coordinate of the square the robot is in
+        :param y: y coordinate of the square the robot is in
+        :param angle: angle the robot is at in the maze (0, 90, 180 or 270)
+
+        :return: None
+        """
+        position = self.position
+        struct.pack_into(TELEMETRY_RECORD, self.buffer, position * TELEMETRY_RECORD_SIZE, timestamp & 0xFFFFFFFF,
+                         left_distance, front_distance, right_distance, heading, left_motor_speed, right_motor_speed,
+                         x, y, angle // 90)
+        position += 1
+        self.position = 0 if position == self.capacity else position
+        if self.count < self.capacity:
+            self.count += 1
+
+    def get_parts(self) -> tuple:
+        """
+        Get the records oldest first without copying them.
+
+        :return: tuple of two memoryviews of the buffer, the records in them one after another
+        """
+        view = memoryview(self.buffer)
+        end = self.position * TELEMETRY_RECORD_SIZE
+        if self.count < self.capacity:
+            return view[:end], view[end:end]
+        return view[end:], view[:end]
+
+    def dump(self) -> None:
+        """
+        Print the records oldest first as comma separated values, over USB serial on the robot.
+
+        :return: None
+        """
+        print(TELEMETRY_COLUMNS)
+        for part in self.get_parts():
+            for offset in range(0, len(part), TELEMETRY_RECORD_SIZE):
+                print("{},{:.1f},{:.1f},{:.1f},{:.1f},{},{},{},{},{}".format(*struct.unpack_from(TELEMETRY_RECORD, part, offset)))
+
+    def save(self, path: str) -> None:
+        """
+        Save the records to a file, so they can be printed after the robot has been reset.
+
+        :param path: path of the file on the flash filesystem
+
+        :return: None
+        """
+        first, second = self.get_parts()
+        write_checked_file(path, struct.pack(TELEMETRY_HEADER, TELEMETRY_FILE_MAGIC, self.count), first, second)
+
+
+def load_telemetry(path: str) -> Telemetry:
+    """
+    Load records saved with Telemetry.save.
+
+    :param path: path of the file on the flash filesystem
+
+    :return: telemetry holding the records, None if the file is missing or corrupted
+    """
+    data = read_checked_file(path)
+    if data is None or len(data) < TELEMETRY_HEADER_SIZE:
+        return None
+    magic, count = struct.unpack_from(TELEMETRY_HEADER, data)
+    if magic != TELEMETRY_FILE_MAGIC or len(data) != TELEMETRY_HEADER_SIZE + count * TELEMETRY_RECORD_SIZE:
+        return None
+    telemetry = Telemetry(max(1, count))
+    telemetry.buffer[:len(data) - TELEMETRY_HEADER_SIZE] = data[TELEMETRY_HEADER_SIZE:]
+    telemetry.count = count
+    return telemetry
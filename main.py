@@ -1,34 +1,44 @@
 """Main code to run in the competition."""
-from lib.helper import get_robot, get_maze, execute_commands, set_pin_modes
-from mazesolver.mazemapper import MazeMapper
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 import time
-from constants import MAPPING_BUTTON_IN_PIN, MAPPING_BUTTON_OUT_PIN, SOLUTION_BUTTON_IN_PIN, SOLUTION_BUTTON_OUT_PIN
+
+from lib.helper import get_hardware, get_maze
+from lib.runtime import Runtime
+from lib.storage import load_map
+from lib.telemetry import Telemetry
+from lib.profiler import Profiler, profile_hot_paths
+from mazesolver.mazemapper import MazeMapper
+from robot.motion import MotionController
+from constants import MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED, \
+                      MAP_FILE_PATH, TELEMETRY_FILE_PATH, TELEMETRY_CAPACITY, TELEMETRY_PERIOD_MS, PROFILING_ENABLED
 
 def main():
-    # Initialize robot and maze
-    robot = get_robot()
+    # Initialize robot and maze, the hardware is set up here and not when constants.py is imported
+    hardware = get_hardware()
+    robot = hardware.get_robot()
+    mapping_button, solution_button = hardware.get_buttons()
     maze = get_maze()
-    set_pin_modes(1, MAPPING_BUTTON_OUT_PIN, SOLUTION_BUTTON_OUT_PIN)
     maze_mapper = MazeMapper(robot, maze, 30)
-    solution_found = False
-    # Wait for button press
-    while True:
-        if SOLUTION_BUTTON_IN_PIN.value() == 1:
-            print("b")
-        if MAPPING_BUTTON_IN_PIN.value() == 1:
-            print("a")
-            # Map the maze
-            time.sleep(1)
-            maze_mapper.map_maze_dfs(maze_mapper.start_x, maze_mapper.start_y, 0)
-            solution_found = True
-        if SOLUTION_BUTTON_IN_PIN.value() == 1:
-            print("b")
-        if SOLUTION_BUTTON_IN_PIN.value() == 1 and solution_found:
-            # Solve the maze
-            maze_solver = maze_mapper.get_maze_solver()
-            commands = maze_solver.find_and_construct_optimal_path()
-            time.sleep(1)
-            execute_commands(commands)
+    motion = MotionController(robot, MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED)
+    # A map saved before a reset is ready for the speed run right away
+    plan = load_map(MAP_FILE_PATH, maze_mapper)
+    if plan is not None:
+        print("Loaded the mapped maze, press the solution button to run")
+    # Map on mapping button press, solve on solution button press
+    # Every run is recorded and saved to flash after it, print it with scripts/dumptelemetry.py
+    telemetry = Telemetry(TELEMETRY_CAPACITY)
+    # Hot paths are only wrapped with timers when profiling, otherwise they run as they are
+    profiler = None
+    if PROFILING_ENABLED:
+        profiler = Profiler()
+        profile_hot_paths(profiler)
+    runtime = Runtime(robot, maze_mapper, motion, mapping_button, solution_button, TELEMETRY_PERIOD_MS, plan, MAP_FILE_PATH,
+                      telemetry, TELEMETRY_FILE_PATH, profiler)
+    print("Ready {} ms after power-up".format(time.ticks_ms()))
+    asyncio.run(runtime.run())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+"""Array backed breadth first search engine for the maze."""
+from array import array
+
+from mazesolver.maze import Maze, WALL_BITS
+
+
+class BFSEngine(object):
+    def __init__(self, max_squares: int) -> None:
+        """
+        Initialize BFSEngine class.
+
+        All buffers are allocated once here, so searching does not grow the heap.
+        A square is referred to by its index y * width + x.
+
+        :param max_squares: largest number of squares (width * height) a searched maze can have
+
+        :return: None
+        """
+        self.max_squares = max_squares
+
+        self.queue = array('H', [0] * max_squares) # Ring buffer of square indices, also holds the found path
+        self.visited = bytearray(max_squares) # 1 if square has been queued
+        self.parents = array('H', [0] * max_squares) # Index of the square each square was reached from
+
+    def search(self, maze: Maze, start_x: int, start_y: int, goal_mask: bytearray, optimistic: bool=False) -> memoryview:
+        """
+        Find the shortest path from a square to the closest goal square.
+
+        The returned path shares memory with the engine and is only valid until the next search.
+
+        :param maze: maze to search in
+        :param start_x: x coordinate to start from
+        :param start_y: y coordinate to start from
+        :param goal_mask: bytearray indexed by square index, non zero for goal squares
+        :param optimistic: whether walls that are not known yet are treated as open
+
+        :return: square indices of the path from start to goal (both included) or None if no goal can be reached
+        """
+        width = maze.width
+        size = width * maze.height
+        cells = maze.cells
+        queue = self.queue
+        visited = self.visited
+        parents = self.parents
+        capacity = self.max_squares
+
+        for i in range(size):
+            visited[i] = 0
+
+        start = start_y * width + start_x
+        visited[start] = 1
+        parents[start] = start
+        queue[0] = start
+        head, tail = 0, 1
+        goal = -1
+
+        while head != tail:
+            index = queue[head]
+            head = (head + 1) % capacity
+
+            if goal_mask[index]: # Goal reached
+                goal = index
+                break
+
+            cell = cells[index]
+            if optimistic:
+                open_directions = ~cell & WALL_BITS
+            else:
+                open_directions = cell >> 4 & ~cell
+            # Neighbours in the order north, east, south, west, outer walls keep them inside the maze
+            if open_directions & 1 and not visited[index - width]:
+                visited[index - width] = 1
+                parents[index - width] = index
+                queue[tail] = index - width
+                tail = (tail + 1) % capacity
+            if open_directions & 2 and not visited[index + 1]:
+                visited[index + 1] = 1
+                parents[index + 1] = index
+                queue[tail] = index + 1
+                tail = (tail + 1) % capacity
+            if open_directions & 4 and not visited[index + width]:
+                visited[index + width] = 1
+                parents[index + width] = index
+                queue[tail] = index + width
+                tail = (tail + 1) % capacity
+            if open_directions & 8 and not visited[index - 1]:
+                visited[index - 1] = 1
+                parents[index - 1] = index
+                queue[tail] = index - 1
+                tail = (tail + 1) % capacity
+
+        if goal < 0:
+            return None
+
+        # Count path length, then write the path into the queue buffer from start to goal
+        length = 1
+        index = goal
+        while index != start:
+            index = parents[index]
+            length += 1
+
+        index = goal
+        for i in range(length - 1, -1, -1):
+            queue[i] = index
+            index = parents[index]
+
+        return memoryview(queue)[:length]
@@ -1,15 +1,35 @@
 """Class for the maze."""
 
+# Directions are the robot's angle divided by 90
+NORTH = 0
+EAST = 1
+SOUTH = 2
+WEST = 3
+
+# Steps of the x and y coordinates when moving north, east, south and west
+DIRECTION_DX = (0, 1, 0, -1)
+DIRECTION_DY = (-1, 0, 1, 0)
+
+WALL_BITS = 0x0F # Low nibble of a square holds its walls, bit n for direction n
+KNOWN_BITS = 0xF0 # High nibble of a square holds which of its walls are known, bit n + 4 for direction n
+
 
 class Maze(object):
-    def __init__(self, width: int, height: int, side_length: int, default_val) -> None:
+    def __init__(self, width: int, height: int, side_length: int) -> None:
         """
         Initialize Maze.
 
+        Every square is stored in a single byte of a bytearray at index y * width + x.
+        The low 4 bits of the byte tell whether there is a wall in direction north, east, south and west,
+        the high 4 bits tell whether the wall in that direction is known. The outer walls are known from the start.
+
+        The maze also keeps an index of its topology: index offsets of the neighbours, a mask of the goal squares
+        and how many squares can be driven straight from every square in every direction. The run lengths are
+        updated whenever walls are set, so paths and commands can look them up instead of walking the maze.
+
         :param width: width of the maze
         :param height: height of the maze
         :param side_length: length of a side of a square of the maze in centimeters
-        :param default_val: default value to fill the maze with
 
         :return: None
         """
@@ -17,22 +37,196 @@ class Maze(object):
         self.height = height
         self.side_length = side_length
 
-        self.maze = [[default_val for i in range(width)] for j in range(height)]
-    
-    def __getitem__(self, index: int) -> list:
-        return self.maze[index]
-    
+        self.cells = bytearray(width * height)
+        for index in range(width * height):
+            self.cells[index] = self.get_outer_walls(index % width, index // width)
+
+        self.neighbour_offsets = (-width, 1, width, -1) # Index offsets north, east, south, west
+        # Middle squares, 1 for goal squares and 0 for others
+        self.goal_mask = bytearray(width * height)
+        for y in range((height - 1) // 2, height // 2 + 1):
+            for x in range((width - 1) // 2, width // 2 + 1):
+                self.goal_mask[y * width + x] = 1
+        # Number of squares known to be open ahead at index (y * width + x) * 4 + direction
+        self.runs = bytearray(width * height * 4)
+        self.update_index()
+
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, Maze):
-            return self.maze == __o.maze
+            return self.width == __o.width and self.height == __o.height and self.cells == __o.cells
         return False
 
-    def get_new_maze(self, default_val):
+    def get_outer_walls(self, x: int, y: int) -> int:
+        """
+        Get the cell byte of a square that only knows its outer walls.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+
+        :return: cell byte with the outer walls of the square set and known
+        """
+        walls = 0
+        if y == 0:
+            walls |= 1 << NORTH
+        if x == self.width - 1:
+            walls |= 1 << EAST
+        if y == self.height - 1:
+            walls |= 1 << SOUTH
+        if x == 0:
+            walls |= 1 << WEST
+        return walls | walls << 4
+
+    def get_neighbour(self, x: int, y: int, direction: int) -> tuple:
+        """
+        Get coordinates of the neighbouring square in a direction.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction of the neighbour (0 north, 1 east, 2 south, 3 west)
+
+        :return: coordinates of the neighbour in the format (x, y), might be outside of the maze
         """
-        Get a new Maze object with exact same properties but with a customly filled value
+        return x + DIRECTION_DX[direction], y + DIRECTION_DY[direction]
 
-        :param default_val: value to fill the maze with initially
+    def has_wall(self, x: int, y: int, direction: int) -> bool:
+        """
+        Check whether a square has a wall in a direction.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction of the wall (0 north, 1 east, 2 south, 3 west)
+
+        :return: True if there is a wall, False if there is no wall or it is not known
+        """
+        return self.cells[y * self.width + x] & (1 << direction) != 0
 
-        :return: Maze object with this maze's properties and a new default value.
+    def is_known(self, x: int, y: int, direction: int) -> bool:
+        """
+        Check whether it is known if a square has a wall in a direction.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction of the wall (0 north, 1 east, 2 south, 3 west)
+
+        :return: True if the wall is known
+        """
+        return self.cells[y * self.width + x] & (0x10 << direction) != 0
+
+    def is_open(self, x: int, y: int, direction: int) -> bool:
+        """
+        Check whether it is known that the robot can drive from a square to its neighbour in a direction.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction to drive in (0 north, 1 east, 2 south, 3 west)
+
+        :return: True if the wall is known and there is no wall
+        """
+        cell = self.cells[y * self.width + x]
+        return cell & (0x10 << direction) != 0 and cell & (1 << direction) == 0
+
+    def get_run_length(self, x: int, y: int, direction: int) -> int:
+        """
+        Get how many squares the robot can drive straight from a square before reaching a wall.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction to drive in (0 north, 1 east, 2 south, 3 west)
+
+        :return: number of squares known to be open ahead
+        """
+        return self.runs[(y * self.width + x) * 4 + direction]
+
+    def update_runs(self, index: int, direction: int) -> None:
+        """
+        Update the run lengths in a direction after the wall of a square in that direction changed.
+
+        Only the square and the squares behind it, which drive through it, are updated.
+
+        :param index: index of the square whose wall changed
+        :param direction: direction of the wall (0 north, 1 east, 2 south, 3 west)
+
+        :return: None
+        """
+        cells, runs = self.cells, self.runs
+        offset = self.neighbour_offsets[direction]
+        mask, known_open = 0x11 << direction, 0x10 << direction
+        size = len(cells)
+
+        run = runs[(index + offset) * 4 + direction] + 1 if cells[index] & mask == known_open else 0
+        while True:
+            runs[index * 4 + direction] = run
+            # Outer walls end the runs, so the square behind is only inside the maze if it is open
+            index -= offset
+            if not 0 <= index < size or cells[index] & mask != known_open:
+                break
+            run += 1
+
+    def update_index(self) -> None:
+        """
+        Recompute all run lengths, needed after the squares were changed without set_wall or clear_walls.
+
+        :return: None
+        """
+        cells, runs = self.cells, self.runs
+        size = len(cells)
+        for direction in range(4):
+            offset = self.neighbour_offsets[direction]
+            mask, known_open = 0x11 << direction, 0x10 << direction
+            # The square ahead is computed first
+            for index in (range(size) if offset < 0 else range(size - 1, -1, -1)):
+                if cells[index] & mask == known_open:
+                    runs[index * 4 + direction] = runs[(index + offset) * 4 + direction] + 1
+                else:
+                    runs[index * 4 + direction] = 0
+
+    def set_wall(self, x: int, y: int, direction: int, wall: bool=True) -> None:
+        """
+        Set whether there is a wall in a direction of a square and mark it known.
+
+        The wall is shared, so the neighbouring square is updated as well.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+        :param direction: direction of the wall (0 north, 1 east, 2 south, 3 west)
+        :param wall: True if there is a wall, False if there is not
+
+        :return: None
+        """
+        cells = self.cells
+        index = y * self.width + x
+        if wall:
+            cells[index] |= 0x11 << direction
+        else:
+            cells[index] = (cells[index] | 0x10 << direction) & ~(1 << direction)
+        self.update_runs(index, direction)
+
+        new_x, new_y = self.get_neighbour(x, y, direction)
+        if 0 <= new_x < self.width and 0 <= new_y < self.height:
+            index = new_y * self.width + new_x
+            direction = (direction + 2) % 4
+            if wall:
+                cells[index] |= 0x11 << direction
+            else:
+                cells[index] = (cells[index] | 0x10 << direction) & ~(1 << direction)
+            self.update_runs(index, direction)
+
+    def clear_walls(self, x: int, y: int) -> None:
+        """
+        Forget all inner walls of a square.
+
+        :param x: x coordinate of the square
+        :param y: y coordinate of the square
+
+        :return: None
         """
-        return Maze(self.width, self.height, self.side_length, default_val)
+        cells = self.cells
+        index = y * self.width + x
+        cells[index] = self.get_outer_walls(x, y)
+        for direction in range(4):
+            self.update_runs(index, direction)
+            new_x, new_y = self.get_neighbour(x, y, direction)
+            if 0 <= new_x < self.width and 0 <= new_y < self.height:
+                new_index = new_y * self.width + new_x
+                cells[new_index] &= ~(0x11 << (direction + 2) % 4)
+                self.update_runs(new_index, (direction + 2) % 4)
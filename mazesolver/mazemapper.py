@@ -3,8 +3,14 @@ from mazesolver.mazerunner import MazeRunner
 from mazesolver.mazesolver import MazeSolver
 from robot.robot import Robot
 from mazesolver.helper import get_relative_coords
-from mazesolver.maze import Maze
+from mazesolver.maze import Maze, WALL_BITS
+from mazesolver.bfs import BFSEngine
+from array import array
 import time
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 
 
 class MazeMapper(MazeRunner):
@@ -21,13 +27,101 @@ class MazeMapper(MazeRunner):
         :return: None
         """
         super().__init__(robot, maze)
-        # Maze matrix
-        self.visited = self.maze.get_new_maze(False) # Matrix for keeping track of visited squares
+        # Visited squares, indexed by y * width + x
+        self.visited = bytearray(self.maze.width * self.maze.height)
 
         # How fast to explore the maze.
         self.exploration_speed = exploration_speed
 
         self.horizontal_pos_found = False
+        self.position = (self.start_x, self.start_y, 0) # Square flood fill exploration is in or ended in, in the format (x, y, angle)
+
+        size = self.maze.width * self.maze.height
+        self.goal_mask = self.maze.goal_mask
+        self.start_mask = bytearray(size)
+        self.frontier = bytearray(size) # Squares seen through an open wall but not visited yet
+        self.bfs = BFSEngine(size)
+        # Flood fill distances from every square to the current target, unknown walls are treated as open
+        self.distances = array('H', [0] * size)
+        self.flood_queue = array('H', [0] * size) # Queue of flood_distances, ring buffer of update_distances
+        self.flood_queued = bytearray(size) # 1 if a square is in the ring buffer of update_distances
+        self.neighbour_offsets = self.maze.neighbour_offsets
+
+    def record_walls(self, x: int, y: int, angle: int, left_possible: bool, straight_possible: bool, right_possible: bool) -> None:
+        """
+        Record walls seen from a square into the maze.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+        :param left_possible: whether there is no wall on the left
+        :param straight_possible: whether there is no wall ahead
+        :param right_possible: whether there is no wall on the right
+
+        :return: None
+        """
+        direction = angle // 90
+        self.maze.set_wall(x, y, (direction + 3) % 4, not left_possible)
+        self.maze.set_wall(x, y, direction, not straight_possible)
+        self.maze.set_wall(x, y, (direction + 1) % 4, not right_possible)
+
+    def find_horizontal_position(self, x: int, y: int, left_possible: bool, right_possible: bool) -> int:
+        """
+        Find out in which bottom corner the robot started when the first side opening is seen.
+
+        Until then the robot has only driven north with walls on both sides, which looks the same from both corners.
+        If the opening is on the left, the robot started in the right corner and the mapped squares are moved there.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param left_possible: whether there is no wall on the left
+        :param right_possible: whether there is no wall on the right
+
+        :return: corrected x coordinate
+        """
+        if self.horizontal_pos_found or not (left_possible or right_possible):
+            return x
+
+        self.horizontal_pos_found = True
+        if not left_possible: # Robot started in the left side of the maze
+            return x
+
+        width = self.maze.width
+        x = width - 1
+        self.start_x = x
+
+        tmp_y = y
+        while tmp_y < self.maze.height: # Correct the maze mapping
+            self.visited[tmp_y * width] = False
+            self.maze.clear_walls(0, tmp_y)
+
+            self.visited[tmp_y * width + x] = True
+            self.maze.set_wall(x, tmp_y, 1)
+            self.maze.set_wall(x, tmp_y, 3)
+            if tmp_y > y:
+                self.maze.set_wall(x, tmp_y, 0, False)
+
+            tmp_y += 1
+
+        return x
+
+    def explore_square(self, x: int, y: int, angle: int) -> int:
+        """
+        Measure the walls of the square the robot is in and mark it visited.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: x coordinate, corrected if the starting corner was found
+        """
+        left_possible, straight_possible, right_possible = self.get_possible_directions()
+
+        x = self.find_horizontal_position(x, y, left_possible, right_possible)
+        self.record_walls(x, y, angle, left_possible, straight_possible, right_possible)
+        self.visited[y * self.maze.width + x] = True
+
+        return x
 
     def map_maze_dfs(self, x: int, y: int, angle: int) -> None:
         """
@@ -42,31 +136,19 @@ class MazeMapper(MazeRunner):
         :return: None
         """
         time.sleep(1)
-        self.visited[y][x] = True
+        width = self.maze.width
+        self.visited[y * width + x] = True
 
         left_possible, straight_possible, right_possible = self.get_possible_directions()
 
-        if not self.horizontal_pos_found and (left_possible or right_possible): # Horizontal position found
-            self.horizontal_pos_found = True
-            if left_possible: # Robot started in the right side of the maze
-                x = self.maze.width - 1
-
-                tmp_y = y
-                while tmp_y < self.maze.height: # Correct the maze mapping
-                    self.visited[tmp_y][0] = False
-                    self.maze[tmp_y][0] = 0
-
-                    self.visited[tmp_y][x] = True
-                    self.maze[tmp_y][x] = 1
-
-                    tmp_y += 1
+        x = self.find_horizontal_position(x, y, left_possible, right_possible)
+        self.record_walls(x, y, angle, left_possible, straight_possible, right_possible)
 
         if left_possible:
             new_angle = 270 if angle == 0 else angle - 90
             new_x, new_y = get_relative_coords(x, y, new_angle)
-            self.maze[new_y][new_x] = 1
 
-            if not self.visited[new_y][new_x]:
+            if not self.visited[new_y * width + new_x]:
                 # Head to next square
                 self.robot.turn_90_degrees("left")
                 self.drive_to_next_square_center(self.exploration_speed)
@@ -78,9 +160,8 @@ class MazeMapper(MazeRunner):
 
         if straight_possible:
             new_x, new_y = get_relative_coords(x, y, angle)
-            self.maze[new_y][new_x] = 1
 
-            if not self.visited[new_y][new_x]:
+            if not self.visited[new_y * width + new_x]:
                 # Head to next square
                 self.drive_to_next_square_center(self.exploration_speed)
                 # Map maze
@@ -91,9 +172,8 @@ class MazeMapper(MazeRunner):
         if right_possible:
             new_angle = 0 if angle == 270 else angle + 90
             new_x, new_y = get_relative_coords(x, y, new_angle)
-            self.maze[new_y][new_x] = 1
 
-            if not self.visited[new_y][new_x]:
+            if not self.visited[new_y * width + new_x]:
                 # Head to next square
                 self.robot.turn_90_degrees("right")
                 self.drive_to_next_square_center(self.exploration_speed)
@@ -104,6 +184,339 @@ class MazeMapper(MazeRunner):
                 self.robot.turn_90_degrees("left")
 
 
+    def flood_distances(self, target_mask: bytearray) -> None:
+        """
+        Compute the distance field from scratch.
+
+        :param target_mask: bytearray indexed by square index, non zero for the squares to reach
+
+        :return: None
+        """
+        cells, distances, queue = self.maze.cells, self.distances, self.flood_queue
+        offsets = self.neighbour_offsets
+        size = self.maze.width * self.maze.height
+        head = tail = 0
+
+        for index in range(size):
+            if target_mask[index]:
+                distances[index] = 0
+                queue[tail] = index
+                tail += 1
+            else:
+                distances[index] = size # Larger than any real distance
+
+        while head != tail:
+            index = queue[head]
+            head += 1
+            distance = distances[index] + 1
+            open_directions = ~cells[index] & WALL_BITS
+            for direction in range(4):
+                if open_directions & (1 << direction):
+                    new_index = index + offsets[direction]
+                    if distances[new_index] > distance:
+                        distances[new_index] = distance
+                        queue[tail] = new_index
+                        tail += 1
+
+    def update_distances(self, x: int, y: int, target_mask: bytearray) -> None:
+        """
+        Update the distance field after walls of a square were found.
+
+        Only squares whose distance changes are visited.
+
+        :param x: x coordinate of the square whose walls were found
+        :param y: y coordinate of the square whose walls were found
+        :param target_mask: bytearray indexed by square index, non zero for the squares to reach
+
+        :return: None
+        """
+        cells, distances, queue, queued = self.maze.cells, self.distances, self.flood_queue, self.flood_queued
+        offsets = self.neighbour_offsets
+        size = self.maze.width * self.maze.height
+
+        # Ring buffer of the squares to check, a square is queued at most once at a time so it never holds more than size
+        index = y * self.maze.width + x
+        queue[0] = index
+        queued[index] = 1
+        head, count = 0, 1
+        outer_walls = self.maze.get_outer_walls(x, y)
+        for direction in range(4):
+            if not outer_walls & (1 << direction):
+                new_index = index + offsets[direction]
+                queue[count] = new_index
+                queued[new_index] = 1
+                count += 1
+
+        while count:
+            index = queue[head]
+            head = (head + 1) % size
+            count -= 1
+            queued[index] = 0
+            if target_mask[index]:
+                continue
+
+            open_directions = ~cells[index] & WALL_BITS
+            lowest = size - 1
+            for direction in range(4):
+                if open_directions & (1 << direction):
+                    lowest = min(lowest, distances[index + offsets[direction]])
+
+            if distances[index] != lowest + 1:
+                distances[index] = lowest + 1
+                for direction in range(4):
+                    if open_directions & (1 << direction):
+                        new_index = index + offsets[direction]
+                        if not queued[new_index]:
+                            queue[(head + count) % size] = new_index
+                            queued[new_index] = 1
+                            count += 1
+
+    def is_shortest_path_proven(self) -> bool:
+        """
+        Check whether the shortest path from start to center only goes through known walls.
+
+        That is the case when assuming unknown walls are open gives no shorter path than the known open walls do.
+
+        :return: True if the shortest path is proven
+        """
+        maze = self.maze
+        known_path = self.bfs.search(maze, self.start_x, self.start_y, self.goal_mask)
+        if known_path is None:
+            return False
+        known_length = len(known_path)
+
+        optimistic_path = self.bfs.search(maze, self.start_x, self.start_y, self.goal_mask, optimistic=True)
+        return len(optimistic_path) == known_length
+
+    def get_path_to_start(self, x: int, y: int) -> memoryview:
+        """
+        Get the shortest known path back to the start square.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+
+        :return: square indices of the path from the robot's square to the start square
+        """
+        self.start_mask[self.start_y * self.maze.width + self.start_x] = 1
+        path = self.bfs.search(self.maze, x, y, self.start_mask)
+        self.start_mask[self.start_y * self.maze.width + self.start_x] = 0
+        return path
+
+    def return_to_start(self, x: int, y: int, angle: int) -> bool:
+        """
+        Drive back to the start square along the shortest known path and face north.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: True if the robot is back at the start, False if no known path leads there and the robot stopped where it is
+        """
+        path = self.get_path_to_start(x, y)
+        if path is None: # The map doesn't connect the robot's square to the start, the robot got lost
+            self.robot.brake()
+            return False
+        angle = self.drive_path(path, angle, self.exploration_speed)
+        self.turn_to_angle(angle, 0)
+        return True
+
+    async def return_to_start_async(self, x: int, y: int, angle: int) -> bool:
+        """
+        Drive back to the start square along the shortest known path and face north, letting other tasks run while moving.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: True if the robot is back at the start, False if no known path leads there and the robot stopped where it is
+        """
+        path = self.get_path_to_start(x, y)
+        if path is None:
+            await self.robot.brake_async()
+            return False
+        angle = await self.drive_path_async(path, angle, self.exploration_speed)
+        await self.turn_to_angle_async(angle, 0)
+        return True
+
+    def flood_fill_moves(self, x: int, y: int, angle: int):
+        """
+        Generator of the flood fill exploration.
+
+        Every time it is resumed, the walls of the robot's square are measured and the angle of the neighbour
+        to drive to next is yielded. The robot must then turn to that angle and drive to the neighbour's center.
+        The robot always heads to the neighbour closest to its target, assuming walls it has not seen are open.
+        After reaching the center it heads back to the start and so on, until no unknown wall could make the path shorter.
+        The robot's position is kept in self.position as (x, y, angle), when the generator ends it is the final one.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: generator of angles to drive to the next square at
+        """
+        width = self.maze.width
+        target_mask = self.goal_mask
+        center_reached = False
+        self.flood_distances(target_mask)
+
+        while True:
+            horizontal_pos_found = self.horizontal_pos_found
+            x = self.explore_square(x, y, angle)
+            index = y * width + x
+
+            if self.horizontal_pos_found != horizontal_pos_found: # Mapped squares were moved to the other corner
+                self.flood_distances(target_mask)
+            else:
+                self.update_distances(x, y, target_mask)
+
+            if self.goal_mask[index]:
+                center_reached = True
+            if center_reached and self.is_shortest_path_proven():
+                break
+
+            if target_mask[index]: # Target reached, head to the other end
+                if target_mask is self.goal_mask:
+                    target_mask = self.start_mask
+                    target_mask[self.start_y * width + self.start_x] = 1
+                else:
+                    target_mask[self.start_y * width + self.start_x] = 0
+                    target_mask = self.goal_mask
+                self.flood_distances(target_mask)
+
+            if self.distances[index] >= width * self.maze.height: # Target can't be reached
+                break
+
+            # Pick the neighbour closest to the target, preferring straight, then left, right and back
+            direction = angle // 90
+            best_direction = -1
+            for new_direction in (direction, (direction + 3) % 4, (direction + 1) % 4, (direction + 2) % 4):
+                if not self.maze.has_wall(x, y, new_direction):
+                    new_index = index + self.neighbour_offsets[new_direction]
+                    if best_direction < 0 or self.distances[new_index] < self.distances[best_index]:
+                        best_direction, best_index = new_direction, new_index
+
+            angle = best_direction * 90
+            yield angle
+            x, y = get_relative_coords(x, y, angle)
+            self.position = (x, y, angle)
+
+        self.start_mask[self.start_y * width + self.start_x] = 0
+        self.position = (x, y, angle)
+
+    def map_maze_flood_fill(self, x: int, y: int, angle: int) -> bool:
+        """
+        Map the maze with flood fill until the shortest path to the center is proven.
+
+        In the end the robot is back at the start, facing north.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: True if the robot is back at the start, False if the map has no path back and the robot stopped
+        """
+        time.sleep(1)
+        for new_angle in self.flood_fill_moves(x, y, angle):
+            angle = self.turn_to_angle(angle, new_angle)
+            self.drive_to_next_square_center(self.exploration_speed)
+            time.sleep(1)
+
+        x, y, angle = self.position
+        return self.return_to_start(x, y, angle)
+
+    async def map_maze_flood_fill_async(self, x: int, y: int, angle: int) -> bool:
+        """
+        Map the maze with flood fill until the shortest path to the center is proven, letting other tasks run while moving.
+
+        In the end the robot is back at the start, facing north.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: True if the robot is back at the start, False if the map has no path back and the robot stopped
+        """
+        await asyncio.sleep(1)
+        for new_angle in self.flood_fill_moves(x, y, angle):
+            angle = await self.turn_to_angle_async(angle, new_angle)
+            await self.drive_to_next_square_center_async(self.exploration_speed)
+            await asyncio.sleep(1)
+
+        x, y, angle = self.position
+        return await self.return_to_start_async(x, y, angle)
+
+    def find_frontier(self) -> None:
+        """
+        Mark every square that is not visited but can be reached from a visited square as frontier.
+
+        :return: None
+        """
+        maze, visited, frontier = self.maze, self.visited, self.frontier
+        width = maze.width
+
+        for index in range(width * maze.height):
+            frontier[index] = 0
+            if visited[index]:
+                continue
+            y, x = divmod(index, width)
+            for direction in range(4):
+                if maze.is_open(x, y, direction) and visited[index + self.neighbour_offsets[direction]]:
+                    frontier[index] = 1
+                    break
+
+    def map_maze_frontier(self, x: int, y: int, angle: int) -> bool:
+        """
+        Map the whole maze without recursion, keeping the squares still to visit in a frontier.
+
+        The robot drives to an unvisited neighbour while there is one. At a dead end it drives the
+        shortest known path to the closest frontier square in straight runs, instead of backtracking square by square.
+        In the end the robot is back at the start, facing north.
+
+        :param x: current x coordinate
+        :param y: current y coordinate
+        :param angle: angle at which the robot is at
+
+        :return: True if the robot is back at the start, False if the map has no path back and the robot stopped
+        """
+        maze, visited, frontier = self.maze, self.visited, self.frontier
+        width = maze.width
+
+        while True:
+            time.sleep(1)
+            horizontal_pos_found = self.horizontal_pos_found
+            x = self.explore_square(x, y, angle)
+            index = y * width + x
+
+            if self.horizontal_pos_found != horizontal_pos_found: # Mapped squares were moved to the other corner
+                self.find_frontier()
+            frontier[index] = 0
+
+            # Add open neighbours to the frontier and pick the one to drive to, preferring straight, then left and right
+            direction = angle // 90
+            next_direction = -1
+            for new_direction in (direction, (direction + 3) % 4, (direction + 1) % 4):
+                new_index = index + self.neighbour_offsets[new_direction]
+                if maze.is_open(x, y, new_direction) and not visited[new_index]:
+                    frontier[new_index] = 1
+                    if next_direction < 0:
+                        next_direction = new_direction
+
+            if next_direction >= 0:
+                angle = self.turn_to_angle(angle, next_direction * 90)
+                self.drive_to_next_square_center(self.exploration_speed)
+                x, y = get_relative_coords(x, y, angle)
+                continue
+
+            # Dead end, drive to the closest frontier square
+            path = self.bfs.search(maze, x, y, frontier)
+            if path is None: # Whole maze is mapped
+                break
+            index = path[len(path) - 1]
+            angle = self.drive_path(path, angle, self.exploration_speed)
+            y, x = divmod(index, width)
+
+        return self.return_to_start(x, y, angle)
+
     def get_maze_solver(self) -> MazeSolver:
         """
         Get a maze solver based on mapped maze.
@@ -1,10 +1,14 @@
 """Class for the robot solving the maze."""
 from robot.robot import Robot
 
-from mazesolver.helper import get_distance_to_next_square_center
+from mazesolver.helper import get_distance_to_next_square_center, get_direction_to_turn, get_path_runs
 from mazesolver.maze import Maze
-from constants import LABYRINTH_SQUARE_LENGTH_CM
+from constants import LABYRINTH_WALL_THICKNESS_CM
 import time
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 
 
 class MazeRunner(object):
@@ -30,7 +34,7 @@ class MazeRunner(object):
         :return: Tuple of bools showing if its possible to drive in a certain direction in the order (left, straight, right)
         """
         left = straight = right = False
-        left_dist, front_dist, right_dist = self.robot.measure_distances()
+        left_dist, front_dist, right_dist = self.robot.estimate_distances()
 
         if left_dist >= self.maze.side_length:
             left = True
@@ -41,6 +45,23 @@ class MazeRunner(object):
 
         return left, straight, right
     
+    def get_distance_to_next_square_center(self, speed: int) -> float:
+        """
+        Get the distance the robot must drive to reach the center of the next square.
+
+        :param speed: speed at which the robot will drive at (-100 to 100), negative if driving backwards
+
+        :return: distance to drive in centimeters
+        """
+        dist_to_wall = self.robot.f_est.update(self.robot.get_velocity())
+        if speed > 0:
+        #     # dist = dist_to_wall - get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=True) - self.robot.length / 2
+            dist = get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, True, LABYRINTH_WALL_THICKNESS_CM) + self.robot.length / 2
+        else:
+        #     # dist = dist_to_wall + get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=False) + self.robot.length / 2
+            dist = get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, False, LABYRINTH_WALL_THICKNESS_CM) - self.robot.length / 2
+        return dist
+
     def drive_to_next_square_center(self, speed: int, brake: bool=True) -> None:
         """
         Drive to the center of the next square.
@@ -50,13 +71,95 @@ class MazeRunner(object):
 
         :return: None
         """
-        dist_to_wall = self.robot.f_us.measure_distance()
-        if speed > 0:
-        #     # dist = dist_to_wall - get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=True) - self.robot.length / 2
-            dist = get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=True) + self.robot.length / 2
-        else:
-        #     # dist = dist_to_wall + get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=False) + self.robot.length / 2
-            dist = get_distance_to_next_square_center(dist_to_wall, self.maze.side_length, forward=False) - self.robot.length / 2
+        dist = self.get_distance_to_next_square_center(speed)
         # self.robot.drive_until_dist_from_wall(dist, speed, self.maze.side_length, brake)
         self.robot.drive(dist, speed, 0)
         time.sleep(0.3)
+
+    async def drive_to_next_square_center_async(self, speed: int) -> None:
+        """
+        Drive to the center of the next square, letting other tasks run while driving.
+
+        :param speed: speed at which to drive at (-100 to 100)
+
+        :return: None
+        """
+        await self.robot.drive_async(self.get_distance_to_next_square_center(speed), speed, 0)
+        await asyncio.sleep_ms(300)
+
+    def turn_to_angle(self, cur_angle: int, new_angle: int) -> int:
+        """
+        Turn from one multiple of 90 degrees to another with 90 degree turns.
+
+        :param cur_angle: angle the robot is at
+        :param new_angle: angle to turn to
+
+        :return: angle the robot is at after turning
+        """
+        if cur_angle == new_angle:
+            return new_angle
+
+        if (cur_angle - new_angle) % 360 == 180: # Turn around
+            self.robot.turn_90_degrees("right")
+            self.robot.turn_90_degrees("right")
+        else:
+            self.robot.turn_90_degrees(get_direction_to_turn(cur_angle, new_angle))
+
+        return new_angle
+
+    def drive_path(self, path, angle: int, speed: int) -> int:
+        """
+        Drive along a path of squares, merging squares in the same direction into a single straight run.
+
+        Every run is measured from the wall ahead like a single square is, so the error of the square
+        the run starts in is not carried into the turn at its end.
+
+        :param path: square indices of the path from the robot's square to the target square
+        :param angle: angle the robot is at
+        :param speed: speed at which to drive at (1 to 100)
+
+        :return: angle the robot is at after driving the path
+        """
+        for new_angle, square_count in get_path_runs(path, self.maze.width):
+            angle = self.turn_to_angle(angle, new_angle)
+            distance = self.get_distance_to_next_square_center(speed) + (square_count - 1) * self.maze.side_length
+            self.robot.drive(distance, speed, 0)
+
+        return angle
+
+    async def turn_to_angle_async(self, cur_angle: int, new_angle: int) -> int:
+        """
+        Turn from one multiple of 90 degrees to another, letting other tasks run while turning.
+
+        :param cur_angle: angle the robot is at
+        :param new_angle: angle to turn to
+
+        :return: angle the robot is at after turning
+        """
+        if cur_angle == new_angle:
+            return new_angle
+
+        if (cur_angle - new_angle) % 360 == 180: # Turn around
+            await self.robot.turn_90_degrees_async("right")
+            await self.robot.turn_90_degrees_async("right")
+        else:
+            await self.robot.turn_90_degrees_async(get_direction_to_turn(cur_angle, new_angle))
+
+        return new_angle
+
+    async def drive_path_async(self, path, angle: int, speed: int) -> int:
+        """
+        Drive along a path of squares in straight runs, letting other tasks run while driving.
+
+        :param path: square indices of the path from the robot's square to the target square
+        :param angle: angle the robot is at
+        :param speed: speed at which to drive at (1 to 100)
+
+        :return: angle the robot is at after driving the path
+        """
+        for new_angle, square_count in get_path_runs(path, self.maze.width):
+            angle = await self.turn_to_angle_async(angle, new_angle)
+            distance = self.get_distance_to_next_square_center(speed) + (square_count - 1) * self.maze.side_length
+            await self.robot.drive_async(distance, speed, 0)
+
+        return angle
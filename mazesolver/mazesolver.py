@@ -1,113 +1,164 @@
 """Class for solving the maze."""
 from robot.robot import Robot
-from mazesolver.helper import Node, is_middle_square, get_possible_next_moves, get_angle_robot_must_be_at_to_reach_next_square, get_distance_to_wall_from_square_center, reverse_linked_list, get_direction_to_turn, get_number_of_squares_to_move
+from mazesolver.helper import get_path_runs, get_direction_to_turn
 from mazesolver.mazerunner import MazeRunner
 from mazesolver.maze import Maze
+from mazesolver.bfs import BFSEngine
+from mazesolver.planner import TimeOptimalPlanner
+from mazesolver.speedrun import SpeedRunPlanner
+from robot.plan import PlanBuilder
+from constants import SOLUTION_DRIVE_SPEED, ROBOT_WIDTH_CM, \
+                      ROBOT_LENGTH_CM, LABYRINTH_WALL_THICKNESS_CM, SPEED_RUN_ARC_SPEED, SPEED_RUN_ARC_RADIUS_CM, \
+                      SPEED_RUN_MIN_CLEARANCE_CM, SPEED_RUN_MIN_SETTLING_DRIVE_CM, MOTION_MAX_VELOCITY_CMPS, \
+                      MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, BRAKE_TIME_MS
 
 
 class MazeSolver(MazeRunner):
-    def __init__(self, robot: Robot, maze: Maze) -> None:
+    def __init__(self, robot: Robot, maze: Maze, drive_speed: int=SOLUTION_DRIVE_SPEED, turn_time: float=None) -> None:
         """
         Initialize MazeSolver class.
 
         MazeSolver class is used for reaching the maze's center point as efficiently (fast) as possible.
 
         :param robot: Robot that will solve the maze.
-        :param maze: Maze in the form List[y][x], where a value of 1 means that square is accessible, 0 means it is not accessible
+        :param maze: mapped Maze, walls that are not known are treated as walls
+        :param drive_speed: speed at which to drive straight segments (1 to 100)
+        :param turn_time: how long a single 90 degree turn takes in seconds, None for the robot's turn without settling
 
         :return: None
         """
         super().__init__(robot, maze)
+        self.drive_speed = drive_speed
+        # Search buffers are allocated once and reused on every replan
+        self.bfs = BFSEngine(self.maze.width * self.maze.height)
+        self.goal_mask = self.maze.goal_mask
+
+        if turn_time is None:
+            turn_time = robot.get_turn_90_degrees_time()
+        self.turn_time = turn_time
+        # Costs of the plans MotionController drives: straights cruise at the profile's velocity, every one of them
+        # loses the time of speeding up and slowing down and brakes before the next turn
+        drive_velocity = min(MOTION_MAX_VELOCITY_CMPS, robot.velocity_model.get_velocity(drive_speed))
+        square_time = self.maze.side_length / drive_velocity
+        segment_time = drive_velocity / (2 * MOTION_ACCELERATION_CMPS2) + drive_velocity / (2 * MOTION_DECELERATION_CMPS2) + BRAKE_TIME_MS / 1000
+        self.segment_time = segment_time
+        self.planner = TimeOptimalPlanner(self.maze.width * self.maze.height, square_time, turn_time, segment_time)
+        self.speed_run_planner = SpeedRunPlanner(self.maze.width * self.maze.height, self.maze.side_length, LABYRINTH_WALL_THICKNESS_CM,
+                                                 ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, SPEED_RUN_ARC_RADIUS_CM, SPEED_RUN_MIN_CLEARANCE_CM,
+                                                 SPEED_RUN_MIN_SETTLING_DRIVE_CM)
+        # Longest plan: heading reset, then every square turned around in (2 turns) and driven in
+        self.plan_builder = PlanBuilder(3 + 8 * self.maze.width * self.maze.height)
     
-    def find_optimal_path_bfs(self, start_x: int, start_y: int) -> Node:
+    def find_optimal_path_bfs(self, start_x: int, start_y: int) -> memoryview:
         """
         Find the optimal path to the center of the grid using breadth first search.
         
         :param start_x: x position the robot starts in
         :param start_y: y position the robot starts in
 
-        :return: A maze with a single possible path to the center - the shortest path found
+        :return: square indices (y * width + x) of the shortest path found from start to center, None if center can't be reached
         """
-        visited = self.maze.get_new_maze(0)
-        visited[start_y][start_x] = 1
+        return self.bfs.search(self.maze, start_x, start_y, self.goal_mask)
 
-        start_node = Node(start_x, start_y)
-        queue = [start_node]
-        final_node = None
+    def construct_motion_plan(self, path, start_angle: int=0) -> memoryview:
+        """
+        Construct a plan of the path for MotionController.
 
-        while len(queue) > 0:
-            tmp_node = queue.pop()
-            x, y = tmp_node.x, tmp_node.y
+        :param path: square indices of the path to drive from start to goal
+        :param start_angle: angle the robot is at in the start square
 
-            if is_middle_square(tmp_node, self.maze.width, self.maze.height): # Goal reached
-                final_node = tmp_node
-                break
+        :return: plan instructions without stops (see robot.plan), valid until the next plan is constructed
+        """
+        plan = self.plan_builder
+        plan.clear()
+        plan.reset_heading(start_angle)
+        cur_angle = start_angle
 
-            moves = get_possible_next_moves(x, y, self.maze)
-            for new_x, new_y in moves:
-                if visited[new_y][new_x] == 0: # Node is not visited
-                    new_node = Node(new_x, new_y, tmp_node)
-                    queue.insert(0, new_node)
-                    visited[new_y][new_x] = 1
+        for new_angle, square_count in get_path_runs(path, self.maze.width):
+            if cur_angle != new_angle: # Turn must be made
+                if (cur_angle - new_angle) % 360 == 180: # Turn around
+                    plan.turn("right")
+                    plan.turn("right")
+                else:
+                    plan.turn(get_direction_to_turn(cur_angle, new_angle))
+                cur_angle = new_angle
 
-        if final_node is None:
-            return None
+            plan.drive(square_count * self.maze.side_length, self.drive_speed)
 
-        return final_node
+        return plan.get_plan()
 
-    def construct_optimal_path(self, start_node: Node):
+    def construct_speed_run_plan(self, path, start_angle: int=0) -> tuple:
         """
-        Finish the maze in the most optimal path.
+        Construct a plan of the path driving arcs instead of stopping to turn, for MotionController.
 
-        :param start_x: x coordinate to start from
-        :param start_y: y coordinate to start from
+        :param path: square indices of the path to drive from start to goal
+        :param start_angle: angle the robot is at in the start square
 
-        :return: List of commands to execute to drive the optimal path in the format [(function, (param1, param2, ...)), ...]
+        :return: tuple (plan, time) of the plan instructions and the predicted time in seconds,
+                 (None, 0) if the robot doesn't fit through the arcs or no corner has settling straights around its arc
+        """
+        velocity_model = self.robot.velocity_model
+        drive_velocity = min(MOTION_MAX_VELOCITY_CMPS, velocity_model.get_velocity(self.drive_speed))
+        arc_velocity = velocity_model.get_velocity(SPEED_RUN_ARC_SPEED)
+        estimated_time = self.speed_run_planner.construct(self.plan_builder, path, self.maze.width, start_angle, self.drive_speed,
+                                                          SPEED_RUN_ARC_SPEED, drive_velocity, arc_velocity, self.turn_time,
+                                                          self.segment_time)
+        if estimated_time is None:
+            return None, 0
+        return self.plan_builder.get_plan(), estimated_time
+
+    def find_and_construct_optimal_path(self, start_angle: int=0) -> memoryview:
         """
-        commands = []
+        Find the path to center with the fewest squares and construct a plan of it for MotionController.
 
-        cur_angle = get_angle_robot_must_be_at_to_reach_next_square(start_node, start_node.parent)
+        :param start_angle: angle the robot is at in the start square
 
-        # Initialize gyro sensor
-        cmd = (self.robot.gyro.reset_angle, (cur_angle,))
-        commands.append(cmd)
+        :return: plan instructions to execute to reach the center, empty if the center can't be reached
+        """
+        path = self.find_optimal_path_bfs(self.start_x, self.start_y)
+        if path is None:
+            return b""
+        return self.construct_motion_plan(path, start_angle)
 
-        cur_node = start_node
+    def find_fastest_path(self, start_x: int, start_y: int, start_angle: int=0) -> tuple:
+        """
+        Find the path to the center of the grid that takes the least time to drive, turns included.
 
-        while cur_node.parent != None:
-            next_node = cur_node.parent
-            new_angle = get_angle_robot_must_be_at_to_reach_next_square(cur_node, next_node)
+        :param start_x: x position the robot starts in
+        :param start_y: y position the robot starts in
+        :param start_angle: angle the robot is at in the start square
 
-            if cur_angle != new_angle: # Turn must be made
-                # Drive to the current point
-                # dist_from_wall = get_distance_to_wall_from_square_center(cur_node, cur_angle, self.maze)
-                square_count = get_number_of_squares_to_move(cur_node, cur_angle, self.maze)
-                # cmd = (self.robot.drive_until_dist_from_wall, (dist_from_wall, 100, self.maze.side_length))
-                cmd = (self.robot.drive, (square_count * self.maze.side_length, 70, 0))
-                commands.append(cmd)
-
-                direction = get_direction_to_turn(cur_angle, new_angle)
-                cmd = (self.robot.turn_90_degrees, (direction)) # Turn to angle
-                commands.append(cmd)
-                cur_angle = new_angle
-        # Final drive
-        # dist_from_wall = get_distance_to_wall_from_square_center(cur_node, cur_angle, self.maze)
-        square_count = get_number_of_squares_to_move(cur_node, cur_angle, self.maze)
-        # cmd = (self.robot.drive_until_dist_from_wall, (dist_from_wall, 100, self.maze.side_length))
-        cmd = (self.robot.drive, (square_count * self.maze.side_length, 70, 0))
-        commands.append(cmd)
+        :return: tuple (path, time) of the square indices from start to center and the predicted driving time in seconds
+        """
+        return self.planner.search(self.maze, start_x, start_y, start_angle, self.goal_mask)
+
+    def find_and_construct_motion_plan(self, start_angle: int=0) -> tuple:
+        """
+        Find the path to center with the lowest predicted driving time and construct a plan for MotionController.
+
+        :param start_angle: angle the robot is at in the start square
 
-        return commands
+        :return: tuple (plan, time) of the plan instructions to reach the center and the predicted time in seconds
+        """
+        path, estimated_time = self.find_fastest_path(self.start_x, self.start_y, start_angle)
+        if path is None:
+            return b"", 0
+        return self.construct_motion_plan(path, start_angle), estimated_time
 
-    def find_and_construct_optimal_path(self):
+    def find_and_construct_speed_run_plan(self, start_angle: int=0) -> tuple:
         """
-        Find and construct the most optimal path to center.
+        Find the path to center with the lowest predicted driving time and construct a speed run plan of it.
+
+        Falls back to the motion plan of the path if the speed run plan has no arcs.
 
-        :param start_x: x coordinate where the robot starts
-        :param start_y: y coordinate where the robot starts
+        :param start_angle: angle the robot is at in the start square
 
-        :return: list of commands to execute to reach the center
+        :return: tuple (plan, time) of the plan instructions to reach the center and the predicted time in seconds
         """
-        optimal_path_last_node = self.find_optimal_path_bfs(self.start_x, self.start_y)
-        first_node = reverse_linked_list(optimal_path_last_node)
-        return self.construct_optimal_path(first_node)
+        path, estimated_time = self.find_fastest_path(self.start_x, self.start_y, start_angle)
+        if path is None:
+            return b"", 0
+        plan, speed_run_time = self.construct_speed_run_plan(path, start_angle)
+        if plan is not None:
+            return plan, speed_run_time
+        return self.construct_motion_plan(path, start_angle), estimated_time
@@ -0,0 +1,184 @@
+"""Time optimal path planner over (square, heading) states."""
+from array import array
+
+from mazesolver.maze import Maze, DIRECTION_DX, DIRECTION_DY
+
+
+class TimeOptimalPlanner(object):
+    def __init__(self, max_squares: int, square_time: float, turn_time: float, segment_time: float=0) -> None:
+        """
+        Initialize TimeOptimalPlanner class.
+
+        Plans with A* over states (square, heading), so turns cost time just like driving does.
+        A state is referred to by its index (y * width + x) * 4 + heading // 90.
+        All buffers are allocated once here, so planning does not grow the heap.
+
+        :param max_squares: largest number of squares (width * height) a planned maze can have
+        :param square_time: seconds it takes to drive straight through a single square
+        :param turn_time: seconds a single 90 degree turn takes
+        :param segment_time: seconds every straight segment costs on top of driving (braking, starting)
+
+        :return: None
+        """
+        self.max_squares = max_squares
+        self.square_time = square_time
+        self.turn_time = turn_time
+        self.segment_time = segment_time
+
+        state_count = max_squares * 4
+        self.costs = array('f', [0] * state_count) # Best known time from start to each state
+        self.parents = array('H', [0] * state_count) # State each state was reached from
+        self.closed = bytearray(state_count) # 1 if the state's time is final
+        # Indexed binary heap of open states ordered by time + heuristic
+        self.heap = array('H', [0] * state_count)
+        self.heap_keys = array('f', [0] * state_count)
+        self.heap_positions = array('H', [0] * state_count) # Position + 1 of each state in the heap, 0 if not in heap
+        self.heap_size = 0
+
+    def _sift_up(self, position: int) -> None:
+        heap, keys, positions = self.heap, self.heap_keys, self.heap_positions
+        state = heap[position]
+        key = keys[state]
+        while position > 0:
+            parent = (position - 1) >> 1
+            parent_state = heap[parent]
+            if keys[parent_state] <= key:
+                break
+            heap[position] = parent_state
+            positions[parent_state] = position + 1
+            position = parent
+        heap[position] = state
+        positions[state] = position + 1
+
+    def _sift_down(self, position: int) -> None:
+        heap, keys, positions = self.heap, self.heap_keys, self.heap_positions
+        size = self.heap_size
+        state = heap[position]
+        key = keys[state]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[heap[child + 1]] < keys[heap[child]]:
+                child += 1
+            child_state = heap[child]
+            if keys[child_state] >= key:
+                break
+            heap[position] = child_state
+            positions[child_state] = position + 1
+            position = child
+        heap[position] = state
+        positions[state] = position + 1
+
+    def _push(self, state: int, key: float) -> None:
+        self.heap_keys[state] = key
+        position = self.heap_positions[state]
+        if position == 0: # Not yet in heap
+            position = self.heap_size + 1
+            self.heap[position - 1] = state
+            self.heap_size += 1
+        self._sift_up(position - 1)
+
+    def _pop(self) -> int:
+        heap = self.heap
+        state = heap[0]
+        self.heap_positions[state] = 0
+        self.heap_size -= 1
+        if self.heap_size > 0:
+            heap[0] = heap[self.heap_size]
+            self._sift_down(0)
+        return state
+
+    def _relax(self, state: int, parent: int, cost: float, heuristic: float) -> None:
+        if self.closed[state] or (self.parents[state] != state and self.costs[state] <= cost):
+            return
+        self.costs[state] = cost
+        self.parents[state] = parent
+        self._push(state, cost + heuristic)
+
+    def search(self, maze: Maze, start_x: int, start_y: int, start_angle: int, goal_mask: bytearray) -> tuple:
+        """
+        Find the path to a goal square that takes the least time to drive.
+
+        The returned path shares memory with the planner and is only valid until the next search.
+
+        :param maze: maze to plan in
+        :param start_x: x coordinate to start from
+        :param start_y: y coordinate to start from
+        :param start_angle: angle the robot is at in the start square, a multiple of 90 degrees
+        :param goal_mask: bytearray indexed by square index, non zero for goal squares
+
+        :return: tuple (path, time) of the square indices from start to goal and the predicted time in seconds, (None, 0) if no goal can be reached
+        """
+        width, height = maze.width, maze.height
+        size = width * height
+        cells, offsets = maze.cells, maze.neighbour_offsets
+        costs, parents, closed = self.costs, self.parents, self.closed
+        square_time, turn_time = self.square_time, self.turn_time
+
+        # Bounding box of the goal squares for the heuristic
+        goal_x_min, goal_y_min, goal_x_max, goal_y_max = width, height, -1, -1
+        for index in range(size):
+            if goal_mask[index]:
+                y, x = divmod(index, width)
+                goal_x_min, goal_x_max = min(goal_x_min, x), max(goal_x_max, x)
+                goal_y_min, goal_y_max = min(goal_y_min, y), max(goal_y_max, y)
+
+        for state in range(size * 4):
+            closed[state] = 0
+            parents[state] = state # A state that is its own parent has not been reached
+            self.heap_positions[state] = 0
+        self.heap_size = 0
+
+        start = (start_y * width + start_x) * 4 + start_angle % 360 // 90
+        costs[start] = 0
+        self._push(start, 0)
+        parents[start] = start
+        goal = -1
+
+        while self.heap_size > 0:
+            state = self._pop()
+            closed[state] = 1
+            index, heading = state >> 2, state & 3
+
+            if goal_mask[index]: # Goal reached
+                goal = state
+                break
+
+            cost = costs[state]
+            y, x = divmod(index, width)
+
+            # Turning in place, the heuristic stays the same
+            heuristic = (max(0, goal_x_min - x, x - goal_x_max) + max(0, goal_y_min - y, y - goal_y_max)) * square_time
+            self._relax(index * 4 + (heading + 1) % 4, state, cost + turn_time, heuristic)
+            self._relax(index * 4 + (heading + 3) % 4, state, cost + turn_time, heuristic)
+
+            # Driving forward to the next square
+            cell = cells[index]
+            if cell & (0x10 << heading) and not cell & (1 << heading): # Known that there is no wall ahead
+                new_x, new_y = x + DIRECTION_DX[heading], y + DIRECTION_DY[heading]
+                heuristic = (max(0, goal_x_min - new_x, new_x - goal_x_max) + max(0, goal_y_min - new_y, new_y - goal_y_max)) * square_time
+                new_cost = cost + square_time
+                if parents[state] == state or parents[state] >> 2 == index: # Driving after a turn starts a new straight segment
+                    new_cost += self.segment_time
+                self._relax((index + offsets[heading]) * 4 + heading, state, new_cost, heuristic)
+
+        if goal < 0:
+            return None, 0
+
+        # Write the squares of the path into the heap buffer from start to goal, skipping turns in place
+        path = self.heap
+        length = 0
+        state = goal
+        while True:
+            if length == 0 or path[length - 1] != state >> 2:
+                path[length] = state >> 2
+                length += 1
+            if state == start:
+                break
+            state = parents[state]
+
+        for i in range(length // 2):
+            path[i], path[length - 1 - i] = path[length - 1 - i], path[i]
+
+        return memoryview(path)[:length], costs[goal]
@@ -0,0 +1,212 @@
+"""Speed run planner driving arcs instead of stop-and-pivot turns."""
+import math
+from array import array
+
+from robot.plan import PlanBuilder
+from mazesolver.helper import get_direction_to_turn
+
+
+def get_square_arc_clearance(radius: float, side_length: float, wall_thickness: float, robot_width: float, robot_length: float) -> float:
+    """
+    Get the room between the robot and the walls on a 90 degree arc around the center of a square.
+
+    The arc's center lies between the center of the square and the post on the inside of the turn,
+    the inner side of the robot passes the post and its outer front corner sweeps towards the outer walls.
+
+    :param radius: radius of the arc in centimeters, at most half of a square's side
+    :param side_length: length of a square's side in centimeters
+    :param wall_thickness: thickness of the walls and posts in centimeters
+    :param robot_width: width of the robot in centimeters
+    :param robot_length: length of the robot in centimeters
+
+    :return: distance from the robot to the closest wall or post in centimeters
+    """
+    inner = radius - robot_width / 2 + math.sqrt(2) * (side_length / 2 - radius) - wall_thickness / math.sqrt(2)
+    outer = radius + side_length / 2 - wall_thickness / 2 - math.sqrt((radius + robot_width / 2) ** 2 + (robot_length / 2) ** 2)
+    return min(inner, outer)
+
+
+def get_step_direction(step: int, width: int) -> int:
+    """
+    Get the direction of a step between two neighbouring squares.
+
+    :param step: difference of the square indices
+    :param width: width of the maze
+
+    :return: direction of the step (0 north, 1 east, 2 south, 3 west)
+    """
+    if step == -width:
+        return 0
+    if step == 1:
+        return 1
+    if step == width:
+        return 2
+    return 3
+
+
+class SpeedRunPlanner(object):
+    def __init__(self, max_squares: int, side_length: float, wall_thickness: float, robot_width: float, robot_length: float,
+                 arc_radius: float, min_clearance: float, min_settling_length: float) -> None:
+        """
+        Initialize SpeedRunPlanner class.
+
+        Turns a path of squares into a plan that drives through its corners on arcs instead of stopping to turn.
+        The path is a polyline with a 90 degree corner in the center of every square it turns in.
+        A corner is only rounded by an arc if the straights before and after the arc are long enough for the
+        wall centering to settle the robot, an arc started off the center or at an angle carries the error
+        into the next one. The other corners are turned in place.
+        Arcs are only used if the robot clears the walls and posts by min_clearance.
+
+        All buffers are allocated once here, so planning does not grow the heap.
+
+        :param max_squares: largest number of squares (width * height) a planned maze can have
+        :param side_length: length of a square's side in centimeters
+        :param wall_thickness: thickness of the walls and posts in centimeters
+        :param robot_width: width of the robot in centimeters
+        :param robot_length: length of the robot in centimeters
+        :param arc_radius: radius of the arcs in centimeters, at most half of a square's side
+        :param min_clearance: least room between the robot and the walls in centimeters
+        :param min_settling_length: shortest straight before and after an arc in centimeters
+
+        :return: None
+        """
+        self.side_length = side_length
+        self.arc_radius = min(arc_radius, side_length / 2)
+        self.min_settling_length = min_settling_length
+        self.arcs_allowed = self.arc_radius >= robot_width / 2 and \
+                            get_square_arc_clearance(self.arc_radius, side_length, wall_thickness, robot_width, robot_length) >= min_clearance
+
+        # Corners of the path, a path has fewer corners than squares
+        self.corner_x = array('f', [0] * max_squares)
+        self.corner_y = array('f', [0] * max_squares)
+        self.corner_angles = array('h', [0] * max_squares) # Degrees turned at the corner, positive to the right
+        self.corner_arcs = bytearray(max_squares) # 1 if the corner is rounded by an arc, 0 if turned in place
+        self.corner_count = 0
+
+    def _find_corners(self, path, width: int) -> None:
+        """
+        Find the corners of the polyline of a path, a 90 degree corner in the center of every square the path turns in.
+
+        :param path: square indices of the path
+        :param width: width of the maze
+
+        :return: None
+        """
+        count = 0
+        for k in range(1, len(path) - 1):
+            turn = self._get_turn(path, k, width)
+            if turn != 0:
+                self.corner_x[count], self.corner_y[count] = self._get_square_center(path[k], width)
+                self.corner_angles[count] = 90 * turn
+                count += 1
+        self.corner_count = count
+
+    def _get_turn(self, path, k: int, width: int) -> int:
+        """
+        Get the turn made in a square of a path.
+
+        :param path: square indices of the path
+        :param k: index in the path of the square, 1 to len(path) - 2
+        :param width: width of the maze
+
+        :return: 1 if the path turns right, -1 if left and 0 if it goes straight
+        """
+        turn = (get_step_direction(path[k + 1] - path[k], width) - get_step_direction(path[k] - path[k - 1], width)) % 4
+        return 1 if turn == 1 else -1 if turn == 3 else 0
+
+    def _get_square_center(self, index: int, width: int) -> tuple:
+        return (index % width + 0.5) * self.side_length, (index // width + 0.5) * self.side_length
+
+    def _choose_arcs(self, start_x: float, start_y: float, end_x: float, end_y: float) -> int:
+        """
+        Choose the corners to round by arcs, from the start on, the ones with settling straights on both sides of their arc.
+
+        :param start_x: x coordinate of the start of the path in centimeters
+        :param start_y: y coordinate of the start of the path in centimeters
+        :param end_x: x coordinate of the end of the path in centimeters
+        :param end_y: y coordinate of the end of the path in centimeters
+
+        :return: how many corners are rounded by arcs
+        """
+        xs, ys, arcs = self.corner_x, self.corner_y, self.corner_arcs
+        count = self.corner_count
+        radius, min_length = self.arc_radius, self.min_settling_length
+        arc_count = 0
+        x, y = start_x, start_y
+        previous_tangent = 0 # A 90 degree arc starts its radius before the corner and ends its radius after it
+        for i in range(count):
+            next_x, next_y = (xs[i + 1], ys[i + 1]) if i + 1 < count else (end_x, end_y)
+            before = abs(xs[i] - x) + abs(ys[i] - y) - previous_tangent - radius
+            after = abs(next_x - xs[i]) + abs(next_y - ys[i]) - radius # The next corner is turned in place unless chosen later
+            arcs[i] = before >= min_length and after >= min_length
+            previous_tangent = radius if arcs[i] else 0
+            arc_count += arcs[i]
+            x, y = xs[i], ys[i]
+        return arc_count
+
+    def construct(self, plan: PlanBuilder, path, width: int, start_angle: int, drive_speed: int, arc_speed: int,
+                  drive_velocity: float, arc_velocity: float, turn_time: float, segment_time: float) -> float:
+        """
+        Construct the speed run plan of a path.
+
+        :param plan: plan builder to construct the plan into, cleared first
+        :param path: square indices of the path to drive from start to goal
+        :param width: width of the maze
+        :param start_angle: angle the robot is at in the start square
+        :param drive_speed: percentage of speed to drive straights at
+        :param arc_speed: percentage of speed to drive arcs at
+        :param drive_velocity: velocity of drive_speed in centimeters per second
+        :param arc_velocity: velocity of arc_speed in centimeters per second
+        :param turn_time: how long a single 90 degree turn in place takes in seconds
+        :param segment_time: seconds a straight ending standing still costs on top of driving (braking, starting)
+
+        :return: predicted driving time in seconds, None if the path has no corner to drive with an arc
+        """
+        if not self.arcs_allowed:
+            return None
+        start_x, start_y = self._get_square_center(path[0], width)
+        end_x, end_y = self._get_square_center(path[-1], width)
+        self._find_corners(path, width)
+        if self._choose_arcs(start_x, start_y, end_x, end_y) == 0:
+            return None
+
+        plan.clear()
+        plan.reset_heading(start_angle)
+        estimated_time = 0
+        # Turn in place towards the first square
+        heading = get_step_direction(path[1] - path[0], width) * 90
+        if (start_angle - heading) % 360 == 180:
+            plan.turn("right")
+            plan.turn("right")
+            estimated_time += 2 * turn_time
+        elif start_angle != heading:
+            plan.turn(get_direction_to_turn(start_angle, heading))
+            estimated_time += turn_time
+
+        xs, ys, angles, arcs = self.corner_x, self.corner_y, self.corner_angles, self.corner_arcs
+        count = self.corner_count
+        radius = self.arc_radius
+        x, y = start_x, start_y
+        previous_tangent = 0
+        for i in range(count + 1):
+            if i < count:
+                next_x, next_y = xs[i], ys[i]
+                tangent = radius if arcs[i] else 0
+            else:
+                next_x, next_y = end_x, end_y
+                tangent = 0
+            length = abs(next_x - x) + abs(next_y - y) - previous_tangent - tangent
+            plan.drive(length, drive_speed)
+            estimated_time += length / drive_velocity
+            if i == count:
+                estimated_time += segment_time
+            elif arcs[i]:
+                plan.arc(angles[i], radius, arc_speed)
+                estimated_time += math.radians(abs(angles[i])) * radius / arc_velocity
+            else:
+                plan.turn("right" if angles[i] > 0 else "left")
+                estimated_time += segment_time + turn_time
+            previous_tangent = tangent
+            x, y = next_x, next_y
+
+        return estimated_time
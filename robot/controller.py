@@ -0,0 +1,68 @@
+"""Feedback controllers for the robot."""
+
+
+class PIDController(object):
+    def __init__(self, kp: float, ki: float, kd: float, output_limit: float) -> None:
+        """
+        Initialize PIDController class.
+
+        Gains can be changed at runtime with set_gains.
+
+        :param kp: proportional gain
+        :param ki: integral gain
+        :param kd: derivative gain
+        :param output_limit: largest absolute output of the controller
+
+        :return: None
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+
+        self.integral = 0
+        self.previous_error = None
+
+    def set_gains(self, kp: float, ki: float, kd: float) -> None:
+        """
+        Change the gains of the controller.
+
+        :param kp: proportional gain
+        :param ki: integral gain
+        :param kd: derivative gain
+
+        :return: None
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+
+    def reset(self) -> None:
+        """
+        Forget the integral and previous error, for example before a new straight segment.
+
+        :return: None
+        """
+        self.integral = 0
+        self.previous_error = None
+
+    def update(self, error: float, dt: float) -> float:
+        """
+        Get the controller output for a new error.
+
+        :param error: difference between the target and the measured value
+        :param dt: seconds since the last update
+
+        :return: output of the controller, limited to +-output_limit
+        """
+        if self.previous_error is None or dt <= 0:
+            derivative = 0
+        else:
+            derivative = (error - self.previous_error) / dt
+        self.previous_error = error
+
+        output = self.kp * error + self.ki * (self.integral + error * dt) + self.kd * derivative
+        if -self.output_limit < output < self.output_limit: # Only integrate when not saturated
+            self.integral += error * dt
+
+        return max(-self.output_limit, min(self.output_limit, output))
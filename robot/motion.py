@@ -0,0 +1,368 @@
+"""Motion profiles for driving whole plans without stopping between segments."""
+import math
+import time
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from robot.robot import Robot
+from robot.plan import PLAN_DRIVE, PLAN_TURN, PLAN_RESET_HEADING, PLAN_ARC, INSTRUCTION_LENGTHS, TURN_DIRECTIONS, \
+                       get_drive_distance, get_drive_speed, get_heading_angle, get_arc_angle, get_arc_radius, \
+                       get_arc_speed
+from constants import CONTROL_PERIOD_MS, BRAKE_TIME_MS, LABYRINTH_SQUARE_LENGTH_CM, LABYRINTH_WALL_THICKNESS_CM
+
+
+class TrapezoidalProfile(object):
+    def __init__(self, distance: float, max_velocity: float, acceleration: float, deceleration: float, start_velocity: float=0, end_velocity: float=0) -> None:
+        """
+        Initialize TrapezoidalProfile class.
+
+        Velocity first rises with constant acceleration, then cruises and finally falls with constant deceleration.
+        If the distance is too short to reach max_velocity, the cruise phase is left out.
+
+        :param distance: distance to drive in centimeters
+        :param max_velocity: cruising velocity in centimeters per second
+        :param acceleration: acceleration in centimeters per second squared
+        :param deceleration: deceleration in centimeters per second squared
+        :param start_velocity: velocity at the start in centimeters per second
+        :param end_velocity: velocity at the end in centimeters per second
+
+        :return: None
+        """
+        # End velocity must be reachable within the distance
+        end_velocity = min(end_velocity, math.sqrt(start_velocity * start_velocity + 2 * acceleration * distance))
+        end_velocity = max(end_velocity, math.sqrt(max(0, start_velocity * start_velocity - 2 * deceleration * distance)))
+
+        peak_velocity = math.sqrt((2 * acceleration * deceleration * distance + deceleration * start_velocity * start_velocity
+                                   + acceleration * end_velocity * end_velocity) / (acceleration + deceleration))
+        peak_velocity = max(start_velocity, end_velocity, min(max_velocity, peak_velocity))
+
+        acceleration_distance = (peak_velocity * peak_velocity - start_velocity * start_velocity) / (2 * acceleration)
+        deceleration_distance = (peak_velocity * peak_velocity - end_velocity * end_velocity) / (2 * deceleration)
+        cruise_distance = max(0, distance - acceleration_distance - deceleration_distance)
+
+        self.distance = distance
+        self.start_velocity = start_velocity
+        self.peak_velocity = peak_velocity
+        self.end_velocity = end_velocity
+        self.acceleration = acceleration
+        self.deceleration = deceleration
+
+        self.acceleration_time = (peak_velocity - start_velocity) / acceleration
+        self.cruise_time = cruise_distance / peak_velocity if peak_velocity > 0 else 0
+        self.deceleration_time = (peak_velocity - end_velocity) / deceleration
+        self.duration = self.acceleration_time + self.cruise_time + self.deceleration_time
+
+    def velocity_at(self, t: float) -> float:
+        """
+        Get the velocity of the profile at a point in time.
+
+        :param t: seconds since the start of the profile
+
+        :return: velocity in centimeters per second
+        """
+        if t < self.acceleration_time:
+            return self.start_velocity + self.acceleration * t
+        t -= self.acceleration_time
+        if t < self.cruise_time:
+            return self.peak_velocity
+        t -= self.cruise_time
+        return max(self.end_velocity, self.peak_velocity - self.deceleration * t)
+
+
+class MotionController(object):
+    def __init__(self, robot: Robot, max_velocity: float, acceleration: float, deceleration: float, min_speed: int) -> None:
+        """
+        Initialize MotionController class.
+
+        Drives whole plans: consecutive drives are merged into one profile that stops once its distance is covered,
+        turns follow the deceleration right away without extra pauses and arcs are entered and left at their own speed.
+
+        :param robot: robot to drive
+        :param max_velocity: cruising velocity in centimeters per second
+        :param acceleration: acceleration in centimeters per second squared
+        :param deceleration: deceleration in centimeters per second squared
+        :param min_speed: lowest percentage of speed at which the robot still moves
+
+        :return: None
+        """
+        self.robot = robot
+        self.max_velocity = max_velocity
+        self.acceleration = acceleration
+        self.deceleration = deceleration
+        self.min_speed = min_speed
+        # Distance from the front of the robot to the wall ahead when the robot is in the center of its square
+        self.wall_stop_distance = LABYRINTH_SQUARE_LENGTH_CM / 2 - LABYRINTH_WALL_THICKNESS_CM / 2 - robot.length / 2
+
+    def velocity_to_speed(self, velocity: float) -> int:
+        """
+        Convert a velocity to a motor speed.
+
+        :param velocity: velocity in centimeters per second, negative when driving backwards
+
+        :return: percentage of speed to drive at (min_speed to 100, -100 to -min_speed backwards)
+        """
+        speed = self.robot.velocity_model.get_speed(velocity)
+        if velocity < 0:
+            return -max(self.min_speed, min(100, -speed))
+        return max(self.min_speed, min(100, speed))
+
+    def get_wall_offset(self, remaining: float, velocity: float, reading: float, reading_time: int) -> float:
+        """
+        Get how much further an echo of the front sensor says the robot has to drive than its driven distance does.
+
+        The robot is to stop in the center of its square, the distance of the wall behind the square is read
+        from the echo and moved on by how far the robot got since the ping reached the wall.
+
+        :param remaining: distance left to drive by the driven distance in centimeters
+        :param velocity: estimated velocity of the robot in centimeters per second
+        :param reading: distance of the echo in centimeters, 0 if there was none
+        :param reading_time: ticks_ms time the ping reached the wall
+
+        :return: difference in centimeters, None if there is no wall right behind the square the robot stops in
+        """
+        if reading <= 0:
+            return None
+        wall_remaining = reading - velocity * time.ticks_diff(time.ticks_ms(), reading_time) / 1000 - self.wall_stop_distance
+        offset = wall_remaining - remaining
+        if abs(offset) >= LABYRINTH_SQUARE_LENGTH_CM / 2:
+            return None
+        return offset
+
+    def follow_profile(self, profile: TrapezoidalProfile, centered: bool=True) -> None:
+        """
+        Drive forward along a profile until its distance is covered, braking in the end only if the profile ends standing still.
+
+        :param profile: profile to follow
+        :param centered: whether to keep to the center of the corridor
+
+        :return: None
+        """
+        for wait_ms in self.follow_profile_steps(profile, centered):
+            time.sleep_ms(wait_ms)
+
+    def follow_profile_steps(self, profile: TrapezoidalProfile, centered: bool):
+        """
+        Steps of following a profile, shared by follow_profile and follow_profile_async.
+
+        The speed follows the profile in time, but the robot stops once the distance it is estimated to have driven
+        covers the profile's distance. The lowest speed is faster than the end of the profile, stopping on the
+        profile's time would overshoot every straight. The distance is integrated from the velocities of the
+        commanded speeds, lagging behind them by the velocity model's time constant, and the robot stops
+        before it by the distance it goes after braking.
+
+        :param profile: profile to follow
+        :param centered: whether to keep to the center of the corridor
+
+        :return: generator of milliseconds to wait
+        """
+        robot = self.robot
+        model = robot.velocity_model
+        robot.centering_controller.reset()
+
+        velocity = profile.start_velocity # Estimated velocity of the robot
+        driven = 0 # Estimated distance driven
+        start_time = last_time = next_time = time.ticks_ms()
+        # Echoes of the wall ahead correct where a standing stop ends, only the interrupt driven sensor keeps them
+        sensor = robot.f_us
+        echoes = profile.end_velocity == 0 and hasattr(sensor, "get_raw_reading")
+        last_echo_time = start_time # Echoes from before are from another heading
+        wall_offset = None # Filtered get_wall_offset of the echoes
+        while True:
+            now = time.ticks_ms()
+            dt = time.ticks_diff(now, last_time) / 1000
+            last_time = now
+            target_velocity = robot.get_velocity()
+            blend = min(1, dt / model.time_constant) if model.time_constant > 0 else 1
+            driven += (velocity + (target_velocity - velocity) * blend / 2) * dt
+            velocity += (target_velocity - velocity) * blend
+
+            remaining = profile.distance - driven
+            if echoes:
+                reading, reading_time = sensor.get_raw_reading()
+                if time.ticks_diff(reading_time, last_echo_time) > 0:
+                    last_echo_time = reading_time
+                    offset = self.get_wall_offset(remaining, velocity, reading, reading_time)
+                    if offset is not None:
+                        # Halfway to every new echo, the older ones are off by how much the driven distance drifted since
+                        wall_offset = offset if wall_offset is None else (wall_offset + offset) / 2
+                if wall_offset is not None:
+                    remaining += wall_offset
+            if profile.end_velocity == 0:
+                remaining -= velocity * model.braking_time
+            if remaining <= 0:
+                break
+
+            speed = self.velocity_to_speed(profile.velocity_at(time.ticks_diff(now, start_time) / 1000))
+            if centered:
+                robot.steer_centered(speed, CONTROL_PERIOD_MS / 1000)
+            else:
+                robot.dual_drive(speed, speed)
+
+            next_time = time.ticks_add(next_time, CONTROL_PERIOD_MS)
+            wait_time = time.ticks_diff(next_time, time.ticks_ms())
+            if velocity > 0: # Wake up in time to stop when the distance is covered
+                wait_time = min(wait_time, int(remaining / velocity * 1000) + 1)
+            yield max(0, wait_time)
+
+        if profile.end_velocity == 0:
+            robot.motors.set_speeds(0, 0) # Brake
+            yield BRAKE_TIME_MS
+
+    def get_arc_velocity(self, plan, i: int) -> float:
+        """
+        Get the velocity of a PLAN_ARC instruction.
+
+        :param plan: plan instructions
+        :param i: index of the PLAN_ARC instruction
+
+        :return: velocity of the center of the robot in centimeters per second
+        """
+        return self.robot.velocity_model.get_velocity(get_arc_speed(plan, i))
+
+    def get_arc_heading(self, angle: int) -> float:
+        """
+        Get the heading an arc of a plan ends at.
+
+        Plans turn between headings on a 90 degree grid, so the heading is the grid's one nearest to turning the angle
+        and the arc takes out the heading error the robot started it with.
+
+        :param angle: degrees the arc turns, positive to the right
+
+        :return: unwrapped angle of the gyro sensor, None without one
+        """
+        if self.robot.gyro is None:
+            return None
+        return round((self.robot.gyro.get_unwrapped_angle() + angle) / 90) * 90
+
+    def reset_heading(self, angle: int) -> None:
+        """
+        Reset the gyro sensor to the heading on the 90 degree grid a plan starts at.
+
+        The robot is rarely square to the grid when the plan starts, resetting its angle to the heading would hide
+        the error from the turns and arcs that end on the grid, so how far it is off the grid is kept.
+
+        :param angle: heading of the grid the robot stands closest to, a multiple of 90 degrees
+
+        :return: None
+        """
+        gyro = self.robot.gyro
+        if gyro is None:
+            return
+        current = gyro.get_unwrapped_angle()
+        gyro.reset_angle(angle + current - round(current / 90) * 90)
+
+    def get_drive_profile(self, plan, i: int, start_velocity: float=0) -> tuple:
+        """
+        Get the profile of consecutive forward drive instructions merged into one.
+
+        The merged drives are one straight at the speed of the first one, the robot only stops once their
+        distances together are covered. The profile ends at the velocity of the arc following the drives,
+        standing still before anything else. The wheels reach the speeds of an arc a time constant late,
+        so drives ending in an arc are shortened and ones starting from an arc lengthened by how far the robot goes in that time.
+
+        :param plan: plan instructions
+        :param i: index of the first PLAN_DRIVE instruction, driven forward
+        :param start_velocity: velocity the robot is driving at when the profile starts
+
+        :return: tuple (profile, i) of the merged profile and the index of the instruction after the drives
+        """
+        length = len(plan)
+        max_velocity = min(self.max_velocity, self.robot.velocity_model.get_velocity(get_drive_speed(plan, i)))
+        distance = 0
+        while i < length and plan[i] == PLAN_DRIVE and get_drive_speed(plan, i) > 0:
+            distance += get_drive_distance(plan, i)
+            i += INSTRUCTION_LENGTHS[PLAN_DRIVE]
+        end_velocity = self.get_arc_velocity(plan, i) if i < length and plan[i] == PLAN_ARC else 0
+        distance += (start_velocity - end_velocity) * self.robot.velocity_model.time_constant
+        return TrapezoidalProfile(distance, max_velocity, self.acceleration, self.deceleration, start_velocity, end_velocity), i
+
+    def execute(self, plan) -> None:
+        """
+        Execute a plan, consecutive forward drives are driven as a single profile at the speed of the first one.
+
+        Arcs are driven without braking, the drives around them slow down to and speed up from the arc's speed.
+        Drives backwards are driven at their speed by Robot.drive and stop.
+
+        :param plan: plan instructions, see robot.plan
+
+        :return: None
+        """
+        robot = self.robot
+        velocity = 0 # Velocity the last instruction ended at
+        i = 0
+        while i < len(plan):
+            opcode = plan[i]
+            if opcode == PLAN_DRIVE:
+                if get_drive_speed(plan, i) < 0:
+                    robot.drive(get_drive_distance(plan, i), get_drive_speed(plan, i), 0)
+                    velocity = 0
+                    i += INSTRUCTION_LENGTHS[opcode]
+                else:
+                    profile, i = self.get_drive_profile(plan, i, velocity)
+                    self.follow_profile(profile)
+                    velocity = profile.end_velocity
+                continue
+
+            velocity = 0
+            if opcode == PLAN_ARC:
+                velocity = self.get_arc_velocity(plan, i)
+                angle = get_arc_angle(plan, i)
+                robot.arc(angle, get_arc_radius(plan, i), get_arc_speed(plan, i), False, self.get_arc_heading(angle))
+            elif opcode == PLAN_TURN:
+                robot.turn_90_degrees(TURN_DIRECTIONS[plan[i + 1]], False)
+            elif opcode == PLAN_RESET_HEADING:
+                self.reset_heading(get_heading_angle(plan, i))
+            i += INSTRUCTION_LENGTHS[opcode]
+
+        robot.brake()
+
+    async def follow_profile_async(self, profile: TrapezoidalProfile, centered: bool=True) -> None:
+        """
+        Drive forward along a profile, letting other tasks run between control steps.
+
+        :param profile: profile to follow
+        :param centered: whether to keep to the center of the corridor
+
+        :return: None
+        """
+        for wait_ms in self.follow_profile_steps(profile, centered):
+            await asyncio.sleep_ms(wait_ms)
+
+    async def execute_async(self, plan) -> None:
+        """
+        Execute a plan, letting other tasks run while driving, see execute.
+
+        :param plan: plan instructions, see robot.plan
+
+        :return: None
+        """
+        robot = self.robot
+        velocity = 0 # Velocity the last instruction ended at
+        i = 0
+        while i < len(plan):
+            opcode = plan[i]
+            if opcode == PLAN_DRIVE:
+                if get_drive_speed(plan, i) < 0:
+                    await robot.drive_async(get_drive_distance(plan, i), get_drive_speed(plan, i), 0)
+                    velocity = 0
+                    i += INSTRUCTION_LENGTHS[opcode]
+                else:
+                    profile, i = self.get_drive_profile(plan, i, velocity)
+                    await self.follow_profile_async(profile)
+                    velocity = profile.end_velocity
+                continue
+
+            velocity = 0
+            if opcode == PLAN_ARC:
+                velocity = self.get_arc_velocity(plan, i)
+                angle = get_arc_angle(plan, i)
+                await robot.arc_async(angle, get_arc_radius(plan, i), get_arc_speed(plan, i), False, self.get_arc_heading(angle))
+            elif opcode == PLAN_TURN:
+                await robot.turn_90_degrees_async(TURN_DIRECTIONS[plan[i + 1]], False)
+            elif opcode == PLAN_RESET_HEADING:
+                self.reset_heading(get_heading_angle(plan, i))
+            i += INSTRUCTION_LENGTHS[opcode]
+
+        await robot.brake_async()
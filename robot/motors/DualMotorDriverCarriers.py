@@ -1,18 +1,78 @@
 """Dual motor driver carrier class. Model DRV8835"""
-from machine import Pin
-from robot.helper import initialize_PWM_pin
+from array import array
+from machine import Pin, PWM
 from constants import PWM_FREQUENCY, MAX_U16_INT
 
+DEFAULT_MOTOR_CALIBRATION = (0, 1, 1) # Duty cycle equal to the speed in both directions
+
+
+def initialize_PWM_pin(pwm_pin: Pin, frequency: int, duty: int) -> PWM:
+    """
+    Initialize a pin to be a PWM.
+
+    :param pwm_pin: pin to initialize to PWM
+    :param frequency: frequency to initialize the PWM to in Hz
+    :param duty: u16 int to set duty cycle to
+
+    :return: initialized PWM pin
+    """
+    pwm = PWM(pwm_pin)
+    pwm.freq(frequency)
+    pwm.duty_u16(duty)
+
+    return pwm
+
+
+def get_duty_table(calibration: tuple) -> array:
+    """
+    Compile the calibration curve of a motor into a table of duty cycles.
+
+    A motor starts turning only above its deadband, so every speed other than 0 gets the deadband
+    added to it after being scaled by the gain of its direction.
+
+    :param calibration: tuple (deadband, forward_gain, reverse_gain) of the percentage of duty the motor does
+                        not move at and how much duty a percent of speed forward and backward takes
+
+    :return: u16 duty cycles indexed by speed + 100 for speeds from -100 to 100
+    """
+    deadband, forward_gain, reverse_gain = calibration
+    table = array('H', [0] * 201)
+    for speed in range(1, 101):
+        table[100 + speed] = int(min(100, deadband + forward_gain * speed) / 100 * MAX_U16_INT)
+        table[100 - speed] = int(min(100, deadband + reverse_gain * speed) / 100 * MAX_U16_INT)
+    return table
+
+
+def get_table_speed(speed: float, deadband: int) -> int:
+    """
+    Round a speed to the whole percentage of duty it gets, the deadband is added before rounding and not after.
+
+    :param speed: percentage of speed, may be fractional (-100 to 100)
+    :param deadband: percentage of duty the motor does not move at, in whole percents
+
+    :return: whole percentage of speed to look the duty cycle up at, limited to -100 to 100
+    """
+    if speed > 0:
+        speed = round(speed + deadband) - deadband
+    elif speed < 0:
+        speed = round(speed - deadband) + deadband
+    return max(-100, min(100, int(speed)))
+
 
 class DualMotorDriverCarrier(object):
-    def __init__(self, left_motor_enable_pin: Pin, left_motor_phase_pin: Pin, right_motor_enable_pin: Pin, right_motor_phase_pin: Pin, mode_pin: Pin) -> None:
+    def __init__(self, left_motor_enable_pin: Pin, left_motor_phase_pin: Pin, right_motor_enable_pin: Pin, right_motor_phase_pin: Pin, mode_pin: Pin,
+                 left_calibration: tuple=DEFAULT_MOTOR_CALIBRATION, right_calibration: tuple=DEFAULT_MOTOR_CALIBRATION) -> None:
         """
         Initialize DualMotorDriverCarrier class. Model DRV8835.
 
+        The calibration curves are compiled into duty cycle tables here, so setting a speed is a table lookup.
+
         :param left_motor_enable_pin: Pin for left motor enable
         :param left_motor_phase_pin: Pin for left motor phase regulator
         :param right_motor_enable_pin: Pin for right motor enable
         :param right_motor_phase_pin: Pin for right motor phase regulator
+        :param left_calibration: tuple (deadband, forward_gain, reverse_gain) of the left motor, see get_duty_table
+        :param right_calibration: tuple (deadband, forward_gain, reverse_gain) of the right motor, see get_duty_table
 
         :return: None
         """
@@ -22,40 +82,70 @@ class DualMotorDriverCarrier(object):
         # Left motor
         self.lm_pwm = initialize_PWM_pin(left_motor_enable_pin, PWM_FREQUENCY, 0)
         self.lm_phase = left_motor_phase_pin
+        self.lm_duties = get_duty_table(left_calibration)
+        self.lm_deadband = round(left_calibration[0])
         self.left_motor_speed = 0
         # Right motor
         self.rm_pwm = initialize_PWM_pin(right_motor_enable_pin, PWM_FREQUENCY, 0)
         self.rm_phase = right_motor_phase_pin
+        self.rm_duties = get_duty_table(right_calibration)
+        self.rm_deadband = round(right_calibration[0])
         self.right_motor_speed = 0
 
-    def set_left_motor_speed(self, speed: int) -> None:
+    def set_calibration(self, left_calibration: tuple, right_calibration: tuple) -> None:
+        """
+        Change the calibration curves of the motors, takes effect from the next speed set.
+
+        :param left_calibration: tuple (deadband, forward_gain, reverse_gain) of the left motor
+        :param right_calibration: tuple (deadband, forward_gain, reverse_gain) of the right motor
+
+        :return: None
+        """
+        self.lm_duties = get_duty_table(left_calibration)
+        self.lm_deadband = round(left_calibration[0])
+        self.rm_duties = get_duty_table(right_calibration)
+        self.rm_deadband = round(right_calibration[0])
+
+    def set_speeds(self, left_speed: float, right_speed: float) -> None:
+        """
+        Set the speeds of both motors back to back.
+
+        :param left_speed: speed to set the left motor in percentage of full speed (-100 to 100), rounded and limited to the range
+        :param right_speed: speed to set the right motor in percentage of full speed (-100 to 100), rounded and limited to the range
+
+        :return: None
+        """
+        left_speed = get_table_speed(left_speed, self.lm_deadband)
+        right_speed = get_table_speed(right_speed, self.rm_deadband)
+        self.left_motor_speed = left_speed
+        self.right_motor_speed = right_speed
+        self.lm_phase.value(left_speed < 0)
+        self.rm_phase.value(right_speed < 0)
+        self.lm_pwm.duty_u16(self.lm_duties[left_speed + 100])
+        self.rm_pwm.duty_u16(self.rm_duties[right_speed + 100])
+
+    def set_left_motor_speed(self, speed: float) -> None:
         """
         Set speed of left motor.
 
-        :param speed: speed to set the left motor in percentage of full speed (-100 to 100)
+        :param speed: speed to set the left motor in percentage of full speed (-100 to 100), rounded and limited to the range
 
         :return: None
         """
+        speed = get_table_speed(speed, self.lm_deadband)
         self.left_motor_speed = speed
-        if speed >= 0:
-            self.lm_phase.value(0)
-            self.lm_pwm.duty_u16(int((speed / 100) * MAX_U16_INT))
-        else:
-            self.lm_phase.value(1)
-            self.lm_pwm.duty_u16(int((-speed / 100) * MAX_U16_INT))
+        self.lm_phase.value(speed < 0)
+        self.lm_pwm.duty_u16(self.lm_duties[speed + 100])
 
-    def set_right_motor_speed(self, speed: int) -> None:
+    def set_right_motor_speed(self, speed: float) -> None:
         """
         Set speed of right motor.
 
-        :param speed: speed to set the left motor in percentage of full speed (-100 to 100)
+        :param speed: speed to set the right motor in percentage of full speed (-100 to 100), rounded and limited to the range
 
         :return: None
         """
+        speed = get_table_speed(speed, self.rm_deadband)
         self.right_motor_speed = speed
-        if speed >= 0:
-            self.rm_phase.value(0)
-            self.rm_pwm.duty_u16(int((speed / 100) * MAX_U16_INT))
-        else:
-            self.rm_phase.value(1)
-            self.rm_pwm.duty_u16(int((-speed / 100) * MAX_U16_INT))
+        self.rm_phase.value(speed < 0)
+        self.rm_pwm.duty_u16(self.rm_duties[speed + 100])
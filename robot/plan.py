@@ -0,0 +1,177 @@
+"""Compact bytecode format of motion plans, driven by robot.motion.MotionController."""
+
+# Opcodes of the plan instructions, each is followed by its arguments
+PLAN_DRIVE = 0 # distance in millimeters (2 bytes, little endian) and percentage of speed (1 byte, signed)
+PLAN_TURN = 1 # direction to turn 90 degrees in (1 byte, index of TURN_DIRECTIONS)
+PLAN_RESET_HEADING = 2 # heading of the grid the robot stands at in degrees (2 bytes, little endian)
+PLAN_ARC = 3 # angle to turn in degrees (1 byte, signed, positive to the right), radius in millimeters (1 byte) and percentage of speed (1 byte)
+
+INSTRUCTION_LENGTHS = bytes((4, 2, 3, 4)) # Length of every instruction in bytes, opcode included
+TURN_DIRECTIONS = ("left", "right")
+
+
+class PlanBuilder(object):
+    def __init__(self, capacity: int) -> None:
+        """
+        Initialize PlanBuilder class.
+
+        Writes plan instructions into a buffer allocated once, so building a plan does not allocate.
+
+        :param capacity: size of the plan buffer in bytes
+
+        :return: None
+        """
+        self.buffer = bytearray(capacity)
+        self.length = 0
+
+    def clear(self) -> None:
+        """
+        Start a new plan, plans returned before are overwritten.
+
+        :return: None
+        """
+        self.length = 0
+
+    def drive(self, distance: float, speed: int) -> None:
+        """
+        Add driving straight to the plan.
+
+        :param distance: distance to drive in centimeters (0 to 6553.5)
+        :param speed: percentage of speed to drive at (-100 to 100)
+
+        :return: None
+        """
+        buffer, i = self.buffer, self.length
+        millimeters = int(distance * 10 + 0.5)
+        buffer[i] = PLAN_DRIVE
+        buffer[i + 1] = millimeters & 0xFF
+        buffer[i + 2] = millimeters >> 8
+        buffer[i + 3] = speed & 0xFF
+        self.length = i + 4
+
+    def turn(self, direction: str) -> None:
+        """
+        Add a 90 degree turn to the plan.
+
+        :param direction: "left" or "right"
+
+        :return: None
+        """
+        buffer, i = self.buffer, self.length
+        buffer[i] = PLAN_TURN
+        buffer[i + 1] = 1 if direction == "right" else 0
+        self.length = i + 2
+
+    def arc(self, angle: int, radius: float, speed: int) -> None:
+        """
+        Add driving along an arc to the plan, the robot turns without stopping.
+
+        :param angle: degrees to turn (-128 to 127), positive to the right
+        :param radius: radius of the arc the center of the robot follows in centimeters (0 to 25.5)
+        :param speed: percentage of speed the center of the robot drives at (1 to 100)
+
+        :return: None
+        """
+        buffer, i = self.buffer, self.length
+        buffer[i] = PLAN_ARC
+        buffer[i + 1] = angle & 0xFF
+        buffer[i + 2] = int(radius * 10 + 0.5)
+        buffer[i + 3] = speed
+        self.length = i + 4
+
+    def reset_heading(self, angle: int) -> None:
+        """
+        Add resetting the gyro sensor's angle to the plan, the robot's offset from the 90 degree grid is kept.
+
+        :param angle: heading of the grid the robot stands at (0, 90, 180 or 270)
+
+        :return: None
+        """
+        buffer, i = self.buffer, self.length
+        buffer[i] = PLAN_RESET_HEADING
+        buffer[i + 1] = angle & 0xFF
+        buffer[i + 2] = angle >> 8
+        self.length = i + 3
+
+    def get_plan(self) -> memoryview:
+        """
+        Get the plan built since the last clear.
+
+        :return: plan instructions, valid until the next clear, copy with bytes() to keep the plan
+        """
+        return memoryview(self.buffer)[:self.length]
+
+
+def get_drive_distance(plan, i: int) -> float:
+    """
+    Get the distance of a PLAN_DRIVE instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: distance to drive in centimeters
+    """
+    return (plan[i + 1] | plan[i + 2] << 8) / 10
+
+
+def get_drive_speed(plan, i: int) -> int:
+    """
+    Get the speed of a PLAN_DRIVE instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: percentage of speed to drive at (-100 to 100)
+    """
+    speed = plan[i + 3]
+    return speed - 256 if speed > 127 else speed
+
+
+def get_arc_angle(plan, i: int) -> int:
+    """
+    Get the angle of a PLAN_ARC instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: degrees to turn, positive to the right
+    """
+    angle = plan[i + 1]
+    return angle - 256 if angle > 127 else angle
+
+
+def get_arc_radius(plan, i: int) -> float:
+    """
+    Get the radius of a PLAN_ARC instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: radius of the arc in centimeters
+    """
+    return plan[i + 2] / 10
+
+
+def get_arc_speed(plan, i: int) -> int:
+    """
+    Get the speed of a PLAN_ARC instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: percentage of speed to drive the arc at
+    """
+    return plan[i + 3]
+
+
+def get_heading_angle(plan, i: int) -> int:
+    """
+    Get the angle of a PLAN_RESET_HEADING instruction.
+
+    :param plan: plan instructions
+    :param i: index of the instruction's opcode
+
+    :return: heading of the grid the robot stands at
+    """
+    return plan[i + 1] | plan[i + 2] << 8
+
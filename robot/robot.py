@@ -1,16 +1,24 @@
 """Robot class."""
 import time, math
-# Sensors
-from robot.sensors.gyro import GyroSensor
-from robot.sensors.ultrasonic import UltraSonicSensor
-# Motors
-from robot.motors.DualMotorDriverCarriers import DualMotorDriverCarrier
+from array import array
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+# Sensors and motors are only passed in, their drivers are imported by lib.hardware, so the robot imports without hardware
+from robot.sensors.estimator import DistanceEstimator
+from robot.velocity import VelocityModel, fit_run, save_velocity_model
 
 from robot.helper import get_distances_to_wall
-from constants import COMPARISON_OPERATORS, ROBOT_SPEED_CMPS
+from robot.controller import PIDController
+from constants import COMPARISON_OPERATORS, ROBOT_SPEED_CMPS, ROBOT_MOTOR_TIME_CONSTANT_S, ROBOT_TRACK_WIDTH_CM, ULTRASONIC_MEASUREMENT_VARIANCE_CM2, DISTANCE_PROCESS_VARIANCE_CM2, \
+                      CONTROL_PERIOD_MS, CENTERING_PID_GAINS, CENTERING_MAX_CORRECTION, HEADING_HOLD_GAIN, ROBOT_SIDE_DISTANCES_SUM_CM, SIDE_WALL_MAX_DISTANCE_CM, \
+                      TURN_PD_GAINS, TURN_MAX_SPEED, TURN_MIN_SPEED, TURN_TOLERANCE_DEG, TURN_TIMEOUT_MS, TURN_OFFSET_LEARNING_RATE, \
+                      VELOCITY_CALIBRATION_TIMEOUT_MS, VELOCITY_CALIBRATION_SETTLE_MS, TIMED_TURN_SPEED, BRAKE_TIME_MS
 
 class Robot(object):
-    def __init__(self, motors: DualMotorDriverCarrier, gyro: GyroSensor, left_ultrasonic: UltraSonicSensor, front_ultrasonic: UltraSonicSensor, right_ultrasonic: UltraSonicSensor, width: float, length: float, height: float) -> None:
+    def __init__(self, motors: "DualMotorDriverCarrier", gyro: "GyroSensor", left_ultrasonic: "UltraSonicSensor", front_ultrasonic: "UltraSonicSensor", right_ultrasonic: "UltraSonicSensor", width: float, length: float, height: float, ranger: "UltraSonicRanger"=None,
+                 velocity_model: VelocityModel=None) -> None:
         """
         Initialize Robot class.
 
@@ -22,21 +30,44 @@ class Robot(object):
         :param width: width of the robot in centimeters
         :param length: length of the robot in centimeters
         :param height: height of the robot in centimeters
+        :param ranger: background pinger of the ultrasonic sensors, None if the sensors measure on demand
+        :param velocity_model: how fast the robot drives at each speed, None for velocity proportional to speed at ROBOT_SPEED_CMPS with the motors of ROBOT_MOTOR_TIME_CONSTANT_S
         """
         self.motors = motors
+        if velocity_model is None:
+            velocity_model = VelocityModel((50,), (ROBOT_SPEED_CMPS,), (ROBOT_SPEED_CMPS,), ROBOT_MOTOR_TIME_CONSTANT_S, ROBOT_MOTOR_TIME_CONSTANT_S)
+        self.velocity_model = velocity_model
 
         self.gyro = gyro
         # Ultrasonic sensors
         self.l_us = left_ultrasonic
         self.f_us = front_ultrasonic
         self.r_us = right_ultrasonic
+        self.ranger = ranger
+        # Distance estimates fusing the ultrasonic readings with the commanded motion
+        self.l_est = DistanceEstimator(left_ultrasonic, DISTANCE_PROCESS_VARIANCE_CM2, ULTRASONIC_MEASUREMENT_VARIANCE_CM2)
+        self.f_est = DistanceEstimator(front_ultrasonic, DISTANCE_PROCESS_VARIANCE_CM2, ULTRASONIC_MEASUREMENT_VARIANCE_CM2)
+        self.r_est = DistanceEstimator(right_ultrasonic, DISTANCE_PROCESS_VARIANCE_CM2, ULTRASONIC_MEASUREMENT_VARIANCE_CM2)
 
         # Constant variables
-        self.turn_offset = 0 # How much the robot overturns on turning at default speed, use for this not yet implemented
+        self.turn_offset = [0, 0] # How many degrees the robot overturns in closed loop turns to the left and to the right, learned while turning
         self.wiggle_room = 0.5 # How much wiggle room robot has
-        self.braking_distance = 0 # How long the braking distance is when driving at full speed.
         self.dist_inaccuracy = 0 # How accurately the ultrasonic sensor must detect a distance to turn accurately
         self.acceleration_delay_time = 5 # How many milliseconds to wait before increasing speed by 1
+        # Wall centering when driving straight forward, gains can be tuned at runtime
+        self.centering_enabled = True
+        kp, ki, kd = CENTERING_PID_GAINS
+        self.centering_controller = PIDController(kp, ki, kd, CENTERING_MAX_CORRECTION)
+        # Heading control of closed loop turns
+        kp, kd = TURN_PD_GAINS
+        self.turn_controller = PIDController(kp, 0, kd, TURN_MAX_SPEED)
+        # State of the closed loop turn in progress
+        self.turn_direction = 0 # Index of the direction in turn_offset
+        self.turn_target = 0 # Degrees to turn, positive to the right
+        self.turn_start_angle = 0 # Unwrapped angle the turn started at
+        self.turn_sample = -1 # Gyro reading the motors were last updated from
+        self.turn_timed_out = False
+        self.turn_start_time = self.turn_update_time = 0
         # Robot dimensions
         self.width = width
         self.length = length
@@ -51,8 +82,7 @@ class Robot(object):
 
         :return: None
         """
-        self.motors.set_left_motor_speed(left_motor_speed)
-        self.motors.set_right_motor_speed(right_motor_speed)
+        self.motors.set_speeds(left_motor_speed, right_motor_speed)
 
     def brake(self) -> None:
         """
@@ -60,81 +90,322 @@ class Robot(object):
 
         :return: None
         """
-        self.motors.set_left_motor_speed(0)
-        self.motors.set_right_motor_speed(0)
-        time.sleep(0.05)
+        self.motors.set_speeds(0, 0)
+        time.sleep_ms(BRAKE_TIME_MS)
 
-    def turn_until(self, left_motor_speed: int, right_motor_speed: int, angle: int, cmp_to_current_angle: str='>') -> None:
+    def turn_until(self, left_motor_speed: int, right_motor_speed: int, angle: float, cmp_to_current_angle: str='>') -> None:
         """
         Turn the robot until a condition is no longer met.
 
         :param left_motor_speed: speed at which to turn the left motor
         :param right_motor_speed: speed at which to turn the right motor
-        :param angle: angle to compare with current angle
+        :param angle: unwrapped angle to compare with current unwrapped angle
         :param cmp_to_current_angle: what operation to use when comparing (">", "<", ">=", "<=", "==", "!=")
 
         :return: None
         """
-        cur_angle = self.gyro.get_angle()
+        cur_angle = self.gyro.get_unwrapped_angle()
 
         self.dual_drive(left_motor_speed, right_motor_speed)
         while COMPARISON_OPERATORS[cmp_to_current_angle](angle, cur_angle):
-            cur_angle = self.gyro.get_angle()
+            cur_angle = self.gyro.get_unwrapped_angle()
 
         self.brake()
 
     def turn(self, target_angle: int, speed: int=70) -> None:
         """
-        Turn to target angle with given speed.
+        Turn to target angle with given speed, the shorter way around.
 
-        NB! Might not be very accurate with current implementation.
+        NB! Might not be very accurate with current implementation, turn_90_degrees turns in closed loop.
 
         :param target_angle: angle to turn to
         :param speed: percentage of speed to set the motors to (1 to 100)
         """
-        cur_angle = self.gyro.get_angle()
+        cur_angle = self.gyro.get_unwrapped_angle()
+        # Target on the unwrapped scale, at most 180 degrees away
+        target_angle = cur_angle + (target_angle - cur_angle + 540) % 360 - 180
 
-        if target_angle > cur_angle:
-            right_degrees = target_angle - cur_angle
-            left_degrees = cur_angle + (360 - target_angle)
+        if target_angle < cur_angle:
+            self.turn_until(-speed, speed, target_angle, '<')
         else:
-            right_degrees = (360 - cur_angle) + target_angle
-            left_degrees = cur_angle - target_angle
+            self.turn_until(speed, -speed, target_angle, '>')
 
-        if right_degrees > left_degrees: # Turn left
-            if target_angle > cur_angle:
-                self.turn_until(-speed, speed, target_angle, '>')
+        self.brake()
+        self.reset_distance_estimates()
 
-            self.turn_until(-speed, speed, target_angle, '<')
-        else: # Turn right
-            if target_angle < cur_angle:
-                self.turn_until(speed, -speed, target_angle, '<')
+    def turn_90_degrees(self, direction: str, settle: bool=True):
+        """
+        Turn 90 degrees in place.
 
-            self.turn_until(speed, -speed, target_angle, '>')
+        Turns in closed loop to the next multiple of 90 degrees if the robot has a gyro sensor, timed otherwise.
 
-        self.brake()
+        :param direction: "left" or "right"
+        :param settle: whether to pause before and after turning so the robot stands still
 
-    def turn_90_degrees(self, direction: str):
-        time.sleep(0.2)
-        if direction == "right":
-            # r_dist = self.r_us.measure_distance()
-            # f_dist = self.f_us.measure_distance()
-            self.dual_drive(40, -41)
-            time.sleep_ms(185)
-            # while r_dist + self.dist_inaccuracy < f_dist:
-            #     f_dist = self.f_us.measure_distance()
-            self.brake()
+        :return: None
+        """
+        for wait_ms in self.turn_90_degrees_steps(direction, settle):
+            time.sleep_ms(wait_ms)
+
+    def turn_90_degrees_steps(self, direction: str, settle: bool):
+        """
+        Steps of a 90 degree turn in place, shared by turn_90_degrees and turn_90_degrees_async.
+
+        Yields whenever the turn waits, the caller sleeps for the yielded time before resuming it.
+
+        :param direction: "left" or "right"
+        :param settle: whether to pause before and after turning so the robot stands still
+
+        :return: generator of milliseconds to wait
+        """
+        if settle:
+            yield 200
+        if self.gyro is not None:
+            self.square_heading()
+            self.start_turn(direction)
+            while not self.update_turn():
+                yield 0
         else:
-            # l_dist = self.l_us.measure_distance()
-            # f_dist = self.f_us.measure_distance()
-            self.dual_drive(-40, 41)
-            time.sleep_ms(185)
-            # while l_dist + self.dist_inaccuracy < f_dist:
-            #     f_dist = self.f_us.measure_distance()
+            if direction == "right":
+                self.dual_drive(TIMED_TURN_SPEED, -TIMED_TURN_SPEED)
+            else:
+                self.dual_drive(-TIMED_TURN_SPEED, TIMED_TURN_SPEED)
+            yield self.get_timed_turn_ms(TIMED_TURN_SPEED)
+        self.motors.set_speeds(0, 0) # Brake
+        yield BRAKE_TIME_MS
+        if self.gyro is not None:
+            self.finish_turn()
+        self.reset_distance_estimates()
+        if settle:
+            yield 300
+
+    def get_timed_turn_ms(self, speed: int) -> int:
+        """
+        Get how long to spin in place at a speed to turn 90 degrees without a gyro sensor.
+
+        :param speed: percentage of speed the wheels spin at in opposite directions (1 to 100)
+
+        :return: time in milliseconds, including the time the robot takes to speed up and the turning it does after braking
+        """
+        model = self.velocity_model
+        rotation_rate = (model.get_velocity(speed) - model.get_velocity(-speed)) / ROBOT_TRACK_WIDTH_CM
+        return round((math.radians(90) / rotation_rate + model.time_constant - model.braking_time) * 1000)
+
+    def get_turn_90_degrees_time(self) -> float:
+        """
+        Get how long a 90 degree turn without settling takes, as the plans of the solution run turn.
+
+        The timed turn and the braking after it, a closed loop turn with a gyro sensor takes about as long.
+
+        :return: time in seconds
+        """
+        return (self.get_timed_turn_ms(TIMED_TURN_SPEED) + BRAKE_TIME_MS) / 1000
+
+    def calibrate_gyro(self, speed: int, turns: int, max_samples: int, path: str=None) -> tuple:
+        """
+        Spin in place and fit the gyro sensor's hard and soft iron calibration to the readings.
+
+        Readings are collected into arrays allocated before spinning. The robot must stand on level ground
+        away from the maze's metal parts, the calibration holds for where the sensor is mounted on the robot.
+
+        :param speed: percentage of speed to spin at (1 to 100)
+        :param turns: how many whole turns to spin
+        :param max_samples: most readings to collect, spinning stops early when they are collected
+        :param path: file to save the calibration to, None to not save it
+
+        :return: calibration in the format (x offset, y offset, xx, xy, yy), None if it could not be fitted
+        """
+        from robot.sensors.gyro import fit_ellipse
+        gyro = self.gyro
+        sensor = gyro.sensor
+        xs = array('f', bytes(4 * max_samples))
+        ys = array('f', bytes(4 * max_samples))
+        count = 0
+        sample = sensor.sample_count
+        start_angle = gyro.get_unwrapped_angle()
+
+        self.dual_drive(speed, -speed)
+        while count < max_samples and gyro.get_unwrapped_angle() - start_angle < turns * 360:
+            if sensor.sample_count != sample:
+                sample = sensor.sample_count
+                xs[count], ys[count], z = sensor.read_raw()
+                count += 1
         self.brake()
-        time.sleep(0.3)
 
-    def drive(self, distance: float, speed: int, angle: int, brake: bool=True) -> None:
+        calibration = fit_ellipse(xs, ys, count)
+        if calibration is not None:
+            gyro.set_calibration(calibration, path)
+        return calibration
+
+    def measure_velocity_run(self, speed: int, distance: float, times, distances) -> tuple:
+        """
+        Drive straight towards or away from the wall in front and measure the velocity with the front ultrasonic sensor.
+
+        Every echo of the front sensor is recorded as the robot drives, the distance it stops at is read once it stands still.
+
+        :param speed: percentage of speed to drive at, negative to drive away from the wall (-100 to 100)
+        :param distance: distance to drive in centimeters
+        :param times: float array to collect the seconds since starting of the readings into, its length limits the readings
+        :param distances: float array to collect the distances of the readings into
+
+        :return: tuple (velocity, time constant, braking time) in centimeters per second and seconds, see fit_run,
+                 None if the wall is out of range or the readings do not fit a line
+        """
+        sensor = self.f_us
+        direction = 1 if speed > 0 else -1
+        time.sleep_ms(VELOCITY_CALIBRATION_SETTLE_MS)
+        start_distance = sensor.get_distance()
+        if start_distance == 0:
+            return None
+        stop_distance = start_distance - direction * distance
+        max_samples = len(times)
+        count = 0
+        last_timestamp = sensor.get_raw_reading()[1]
+
+        self.dual_drive(speed, speed)
+        start_time = time.ticks_ms()
+        while count < max_samples and time.ticks_diff(time.ticks_ms(), start_time) < VELOCITY_CALIBRATION_TIMEOUT_MS:
+            reading, timestamp = sensor.get_raw_reading()
+            if timestamp == last_timestamp:
+                continue
+            last_timestamp = timestamp
+            if reading > 0:
+                times[count] = time.ticks_diff(timestamp, start_time) / 1000
+                distances[count] = reading
+                count += 1
+                if (reading - stop_distance) * direction <= 0:
+                    break
+        brake_time = time.ticks_diff(time.ticks_ms(), start_time) / 1000
+        self.brake()
+        time.sleep_ms(VELOCITY_CALIBRATION_SETTLE_MS)
+        end_distance = sensor.get_distance()
+
+        fit = fit_run(times, distances, count, start_distance, direction)
+        if fit is None:
+            return None
+        velocity, time_constant, line = fit
+        if velocity == 0:
+            return 0, 0, 0
+        # Distance gone after braking, counted from where the fitted line has the robot when it braked
+        coast = direction * (line[0] + line[1] * brake_time - end_distance)
+        return velocity, time_constant, coast / velocity
+
+    def calibrate_velocity(self, speeds: tuple, distance: float, max_samples: int, path: str=None) -> VelocityModel:
+        """
+        Drive towards the wall in front and back at several speeds and fit the velocity model to the front sensor's readings.
+
+        The robot must face a wall further than the distance and the room to brake, with the distance free behind it,
+        and drive straight without wall centering. Readings are collected into arrays allocated before driving.
+        The time constant and the braking time are averaged over the runs, weighed by their velocities.
+
+        :param speeds: percentages of speed to measure the velocity at, in increasing order
+        :param distance: distance to drive in centimeters at every speed in both directions
+        :param max_samples: most readings to collect in a run
+        :param path: file to save the model to, None to not save it
+
+        :return: the fitted velocity model, which the robot then drives with, None if a run could not be measured
+        """
+        times = array('f', bytes(4 * max_samples))
+        distances = array('f', bytes(4 * max_samples))
+        forward_velocities = []
+        reverse_velocities = []
+        time_constant = braking_time = total_velocity = 0
+        for speed in speeds:
+            for velocities, run_speed in ((forward_velocities, speed), (reverse_velocities, -speed)):
+                run = self.measure_velocity_run(run_speed, distance, times, distances)
+                if run is None:
+                    return None
+                velocity, run_time_constant, run_braking_time = run
+                velocities.append(velocity)
+                time_constant += run_time_constant * velocity
+                braking_time += run_braking_time * velocity
+                total_velocity += velocity
+        if total_velocity == 0:
+            return None
+
+        model = VelocityModel(tuple(speeds), tuple(forward_velocities), tuple(reverse_velocities),
+                              max(0, time_constant / total_velocity), max(0, braking_time / total_velocity))
+        self.velocity_model = model
+        if path is not None:
+            save_velocity_model(path, model)
+        return model
+
+    def square_heading(self) -> None:
+        """
+        Reset the gyro sensor to the corridor's heading if there are walls on both sides of the robot.
+
+        Centering between the walls while driving squares the robot to the corridor, so the closest multiple
+        of 90 degrees is its real heading. This keeps local disturbances of the magnetometer from adding up.
+
+        :return: None
+        """
+        left_dist, front_dist, right_dist = self.estimate_distances()
+        if 0 < left_dist < SIDE_WALL_MAX_DISTANCE_CM and 0 < right_dist < SIDE_WALL_MAX_DISTANCE_CM:
+            self.gyro.reset_angle(round(self.gyro.get_unwrapped_angle() / 90) * 90) # Keeps the counted whole turns
+
+    def start_turn(self, direction: str) -> None:
+        """
+        Start a closed loop turn to the next multiple of 90 degrees in a direction, call update_turn until it returns True.
+
+        :param direction: "left" or "right"
+
+        :return: None
+        """
+        self.turn_direction = 1 if direction == "right" else 0
+        self.turn_start_angle = cur_angle = self.gyro.get_unwrapped_angle()
+        self.turn_target = round(cur_angle / 90) * 90 + (90 if self.turn_direction else -90) - cur_angle
+        self.turn_sample = self.gyro.heading_sample
+        self.turn_controller.reset()
+        self.turn_timed_out = False
+        self.turn_start_time = self.turn_update_time = time.ticks_us()
+
+    def update_turn(self) -> bool:
+        """
+        Set the motor speeds of a closed loop turn from the latest heading.
+
+        The heading controller slows the robot down near the target, which is moved closer by the
+        direction's learned overshoot. The motors are only updated when the gyro sensor has a new reading.
+
+        :return: whether the turn is done and the motors must be stopped
+        """
+        turned = self.gyro.get_unwrapped_angle() - self.turn_start_angle
+        if self.gyro.heading_sample == self.turn_sample:
+            return False
+        self.turn_sample = self.gyro.heading_sample
+
+        overshoot = self.turn_offset[self.turn_direction]
+        aim = self.turn_target - overshoot if self.turn_target > 0 else self.turn_target + overshoot
+        error = aim - turned
+        now = time.ticks_us()
+        if time.ticks_diff(now, self.turn_start_time) > TURN_TIMEOUT_MS * 1000:
+            self.turn_timed_out = True
+            return True
+        if abs(error) < TURN_TOLERANCE_DEG:
+            return True
+
+        speed = self.turn_controller.update(error, time.ticks_diff(now, self.turn_update_time) / 1000000)
+        self.turn_update_time = now
+        if abs(speed) < TURN_MIN_SPEED:
+            speed = TURN_MIN_SPEED if error > 0 else -TURN_MIN_SPEED
+        speed = round(speed)
+        self.dual_drive(speed, -speed)
+        return False
+
+    def finish_turn(self) -> None:
+        """
+        Learn the overshoot of a closed loop turn's direction once the robot has stopped.
+
+        :return: None
+        """
+        if self.turn_timed_out:
+            return # The overshoot of a turn that never reached its target is not the robot's usual one
+        overshoot = self.gyro.get_unwrapped_angle() - self.turn_start_angle - self.turn_target
+        if self.turn_target < 0:
+            overshoot = -overshoot
+        offset = self.turn_offset[self.turn_direction] + TURN_OFFSET_LEARNING_RATE * overshoot
+        self.turn_offset[self.turn_direction] = max(-45, min(45, offset))
+
+    def drive(self, distance: float, speed: int, angle: int, brake: bool=True, centered: bool=True) -> None:
         """
         Drive straight at given angle and speed for given distance.
 
@@ -144,19 +415,241 @@ class Robot(object):
         :param speed: percentage of speed to drive at.
         :param angle: angle at which to drive at. - NOT CURRENTLY IMPLEMENTED
         :param brake: whether to brake or not
+        :param centered: whether to keep to the center of the corridor if wall centering is enabled
 
         :return: None
         """
-        if speed > 0:
-            self.dual_drive(speed, speed + 1)
-            time.sleep(distance / ROBOT_SPEED_CMPS * (50 / speed))
+        if speed > 0 and centered and self.centering_enabled:
+            self.drive_centered(distance, speed, brake)
+        else:
+            duration = self.velocity_model.get_drive_time(distance, speed, self.get_velocity(), brake)
+            self.dual_drive(speed, speed)
+            time.sleep(duration)
+
+        if brake:
+            self.brake()
+
+    def get_arc_motion(self, angle: int, radius: float, speed: int) -> tuple:
+        """
+        Get the motor speeds and the duration of driving along an arc.
+
+        The outer wheel drives faster and the inner one slower than the center of the robot,
+        the speed is lowered if the outer wheel would have to drive faster than at 100%.
+
+        :param angle: degrees to turn, positive to the right
+        :param radius: radius of the arc the center of the robot follows in centimeters
+        :param speed: percentage of speed the center of the robot drives at (1 to 100)
+
+        :return: tuple (left_motor_speed, right_motor_speed, duration_ms)
+        """
+        model = self.velocity_model
+        half_track = ROBOT_TRACK_WIDTH_CM / 2
+        velocity = model.get_velocity(speed)
+        outer_velocity = velocity * (radius + half_track) / radius
+        max_velocity = model.get_max_velocity()
+        if outer_velocity > max_velocity:
+            velocity = velocity * max_velocity / outer_velocity
+            outer_velocity = max_velocity
+        outer_speed = model.get_speed(outer_velocity)
+        inner_speed = model.get_speed(velocity * (radius - half_track) / radius)
+        # Wheels rounded to speeds of the same velocity would not turn, the outer one is sped up until they do
+        while model.get_velocity(outer_speed) <= model.get_velocity(inner_speed):
+            if outer_speed < 100:
+                outer_speed += 1
+            else:
+                inner_speed -= 1
+        # Timed from the rotation rate of the whole speeds, so the angle turned is exact
+        rotation_rate = (model.get_velocity(outer_speed) - model.get_velocity(inner_speed)) / ROBOT_TRACK_WIDTH_CM
+        duration_ms = round(math.radians(abs(angle)) / rotation_rate * 1000)
+
+        if angle > 0:
+            left_speed, right_speed = outer_speed, inner_speed
+        else:
+            left_speed, right_speed = inner_speed, outer_speed
+        return left_speed, right_speed, duration_ms
+
+    def arc(self, angle: int, radius: float, speed: int, brake: bool=True, heading: float=None) -> None:
+        """
+        Drive along an arc, turning without stopping.
+
+        Timed from the wheel speeds without a gyro sensor, with one it ends on the gyro's heading
+        and times out after twice the time in case the heading is never reached.
+
+        :param angle: degrees to turn, positive to the right
+        :param radius: radius of the arc the center of the robot follows in centimeters
+        :param speed: percentage of speed the center of the robot drives at (1 to 100)
+        :param brake: whether to brake in the end
+        :param heading: unwrapped angle of the gyro sensor to end the arc at, None for the current angle turned by the angle
+
+        :return: None
+        """
+        left_speed, right_speed, duration_ms = self.get_arc_motion(angle, radius, speed)
+        start_time = time.ticks_ms()
+        self.dual_drive(left_speed, right_speed)
+        if self.gyro is None:
+            time.sleep_ms(duration_ms)
         else:
-            self.dual_drive(speed, speed - 1)
-            time.sleep(distance / ROBOT_SPEED_CMPS * (50 / -speed))
+            if heading is None:
+                heading = self.gyro.get_unwrapped_angle() + angle
+            # The wheels keep turning the robot for a time constant after the arc, it ends that much of the arc earlier
+            target_angle = heading - angle * self.velocity_model.time_constant * 1000 / duration_ms
+            while time.ticks_diff(time.ticks_ms(), start_time) < 2 * duration_ms and \
+                  (self.gyro.get_unwrapped_angle() - target_angle) * angle < 0:
+                pass
 
         if brake:
             self.brake()
-        
+        self.reset_distance_estimates()
+
+    def get_centering_error(self, left_distance: float, right_distance: float) -> float:
+        """
+        Get how far the robot is from the center of the corridor.
+
+        Uses both side walls if there are, a single wall if the other side is open and nothing if both sides are open.
+
+        :param left_distance: distance to the wall on the left in centimeters
+        :param right_distance: distance to the wall on the right in centimeters
+
+        :return: distance of the robot from the center in centimeters, positive if the robot is right of the center
+        """
+        left_wall = 0 < left_distance < SIDE_WALL_MAX_DISTANCE_CM
+        right_wall = 0 < right_distance < SIDE_WALL_MAX_DISTANCE_CM
+
+        if left_wall and right_wall:
+            return (left_distance - right_distance) / 2
+        elif left_wall:
+            return left_distance - ROBOT_SIDE_DISTANCES_SUM_CM / 2
+        elif right_wall:
+            return ROBOT_SIDE_DISTANCES_SUM_CM / 2 - right_distance
+        return 0
+
+    def steer_centered(self, speed: int, dt: float) -> None:
+        """
+        Set the motors to drive forward, corrected towards the center and the heading of the corridor if centering is enabled.
+
+        :param speed: percentage of speed to drive at (0 to 100)
+        :param dt: seconds since the last call
+
+        :return: None
+        """
+        if not self.centering_enabled:
+            self.dual_drive(speed, speed)
+            return
+
+        left_dist, front_dist, right_dist = self.estimate_distances()
+        correction = self.centering_controller.update(self.get_centering_error(left_dist, right_dist), dt)
+        # A short straight is over before the centering squares the robot, the gyro sensor steers it back to the corridor's heading
+        if self.gyro is not None:
+            angle = self.gyro.get_unwrapped_angle()
+            correction += HEADING_HOLD_GAIN * (angle - round(angle / 90) * 90)
+        # Robot right of the center steers left by slowing down the left motor
+        self.dual_drive(speed - correction, speed + correction) # Rounded by the motor driver after its deadband is added
+
+    def drive_centered(self, distance: float, speed: int, brake: bool=True) -> None:
+        """
+        Drive forward for given distance, keeping the robot in the center of the corridor with the side sensors.
+
+        Runs the centering controller at a fixed rate of CONTROL_PERIOD_MS.
+
+        :param distance: distance to drive in centimeters.
+        :param speed: percentage of speed to drive at (1 to 100)
+        :param brake: whether the robot brakes after, the distance it goes while braking is left for it
+
+        :return: None
+        """
+        duration_ms = int(self.velocity_model.get_drive_time(distance, speed, self.get_velocity(), brake) * 1000)
+        self.centering_controller.reset()
+
+        start_time = next_time = time.ticks_ms()
+        self.dual_drive(speed, speed)
+        while time.ticks_diff(time.ticks_ms(), start_time) < duration_ms:
+            self.steer_centered(speed, CONTROL_PERIOD_MS / 1000)
+
+            next_time = time.ticks_add(next_time, CONTROL_PERIOD_MS)
+            now = time.ticks_ms()
+            wait_time = min(time.ticks_diff(next_time, now), duration_ms - time.ticks_diff(now, start_time))
+            if wait_time > 0:
+                time.sleep_ms(wait_time)
+
+    async def brake_async(self) -> None:
+        """
+        Stop the motors, letting other tasks run while waiting for the robot to stop.
+
+        :return: None
+        """
+        self.motors.set_speeds(0, 0)
+        await asyncio.sleep_ms(BRAKE_TIME_MS)
+
+    async def turn_90_degrees_async(self, direction: str, settle: bool=True) -> None:
+        """
+        Turn 90 degrees in place, letting other tasks run while waiting.
+
+        :param direction: "left" or "right"
+        :param settle: whether to pause before and after turning so the robot stands still
+
+        :return: None
+        """
+        for wait_ms in self.turn_90_degrees_steps(direction, settle):
+            await asyncio.sleep_ms(wait_ms)
+
+    async def arc_async(self, angle: int, radius: float, speed: int, brake: bool=True, heading: float=None) -> None:
+        """
+        Drive along an arc, letting other tasks run while turning.
+
+        :param angle: degrees to turn, positive to the right
+        :param radius: radius of the arc the center of the robot follows in centimeters
+        :param speed: percentage of speed the center of the robot drives at (1 to 100)
+        :param brake: whether to brake in the end
+        :param heading: unwrapped angle of the gyro sensor to end the arc at, None for the current angle turned by the angle
+
+        :return: None
+        """
+        left_speed, right_speed, duration_ms = self.get_arc_motion(angle, radius, speed)
+        start_time = time.ticks_ms()
+        self.dual_drive(left_speed, right_speed)
+        if self.gyro is None:
+            await asyncio.sleep_ms(duration_ms)
+        else:
+            if heading is None:
+                heading = self.gyro.get_unwrapped_angle() + angle
+            # The wheels keep turning the robot for a time constant after the arc, it ends that much of the arc earlier
+            target_angle = heading - angle * self.velocity_model.time_constant * 1000 / duration_ms
+            while time.ticks_diff(time.ticks_ms(), start_time) < 2 * duration_ms and \
+                  (self.gyro.get_unwrapped_angle() - target_angle) * angle < 0:
+                await asyncio.sleep_ms(0)
+
+        if brake:
+            await self.brake_async()
+        self.reset_distance_estimates()
+
+    async def drive_async(self, distance: float, speed: int, angle: int, brake: bool=True, centered: bool=True) -> None:
+        """
+        Drive straight at given speed for given distance, letting other tasks run between control steps.
+
+        :param distance: distance to drive in centimeters.
+        :param speed: percentage of speed to drive at.
+        :param angle: angle at which to drive at. - NOT CURRENTLY IMPLEMENTED
+        :param brake: whether to brake or not
+        :param centered: whether to keep to the center of the corridor if wall centering is enabled
+
+        :return: None
+        """
+        duration_ms = int(self.velocity_model.get_drive_time(distance, speed, self.get_velocity(), brake) * 1000)
+        steer = speed > 0 and centered and self.centering_enabled
+        self.centering_controller.reset()
+
+        start_time = time.ticks_ms()
+        self.dual_drive(speed, speed)
+        elapsed = 0
+        while elapsed < duration_ms:
+            if steer:
+                self.steer_centered(speed, CONTROL_PERIOD_MS / 1000)
+            await asyncio.sleep_ms(min(CONTROL_PERIOD_MS, duration_ms - elapsed))
+            elapsed = time.ticks_diff(time.ticks_ms(), start_time)
+
+        if brake:
+            await self.brake_async()
+
     def accelerate_to_speed(self, target_speed: int) -> None:
         """
         Accelerate from current speed to a target speed.
@@ -188,9 +681,10 @@ class Robot(object):
         if distance <= 0 or speed == 0:
             return
         cur_reading = self.f_us.measure_distance()
+        braking_distance = self.velocity_model.get_braking_distance(speed) if brake else 0
         if speed > 0:
-            self.dual_drive(speed, speed + 1)
-            while cur_reading - self.braking_distance > distance:
+            self.dual_drive(speed, speed)
+            while cur_reading - braking_distance > distance:
                 left_dist, cur_reading, right_dist = self.measure_distances()
                 left_dist, right_dist = get_distances_to_wall(left_dist, right_dist, square_length)
                 if left_dist - right_dist > self.wiggle_room:
@@ -199,7 +693,7 @@ class Robot(object):
                     self.dual_drive(speed, speed - math.ceil(right_dist - left_dist))
         else:
             self.dual_drive(speed, speed)
-            while cur_reading + self.braking_distance < distance:
+            while cur_reading + braking_distance < distance:
                 left_dist, cur_reading, right_dist = self.measure_distances()
                 left_dist, right_dist = get_distances_to_wall(left_dist, right_dist, square_length)
                 if left_dist - right_dist > self.wiggle_room:
@@ -221,17 +715,47 @@ class Robot(object):
 
         return left_distance, front_distance, right_distance
 
+    def get_velocity(self) -> float:
+        """
+        Get the forward velocity of the robot predicted from the commanded motor speeds.
+
+        :return: velocity in centimeters per second, negative when driving backwards
+        """
+        model = self.velocity_model
+        return (model.get_velocity(self.motors.left_motor_speed) + model.get_velocity(self.motors.right_motor_speed)) / 2
+
+    def estimate_distances(self) -> tuple:
+        """
+        Update and get the fused distance estimates of all ultrasonic sensors.
+
+        :return: Tuple of floats containing the estimated distances in the order (left, front, right), 0 if nothing is known
+        """
+        left_distance = self.l_est.update(0)
+        front_distance = self.f_est.update(self.get_velocity())
+        right_distance = self.r_est.update(0)
+
+        return left_distance, front_distance, right_distance
+
+    def reset_distance_estimates(self) -> None:
+        """
+        Forget the distance estimates, the sensors face different walls after turning.
+
+        The echoes the interrupt driven sensors filter their distance over are forgotten too,
+        the ones from while turning would start the new estimates off by centimeters.
+
+        :return: None
+        """
+        self.l_est.reset()
+        self.f_est.reset()
+        self.r_est.reset()
+        for sensor in (self.l_us, self.f_us, self.r_us):
+            if hasattr(sensor, "clear"):
+                sensor.clear()
+
     def get_closest_90_degree_heading(self) -> int:
         """
         Get the closest multiple of 90 degrees the robot is heading towards.
 
-        :return: Closest multiple of 90 of the current robot's angle.
+        :return: Closest multiple of 90 of the current robot's angle (0, 90, 180 or 270).
         """
-        cur_angle = round(self.gyro.get_angle())
-        multiplier = cur_angle // 90
-        point1, point2 = multiplier * 90, (multiplier + 1) * 90
-
-        if abs(point1 - cur_angle) > abs(point2 - cur_angle):
-            return point2
-        else:
-            return point1
+        return round(self.gyro.get_angle() / 90) * 90 % 360
@@ -0,0 +1,128 @@
+"""Distance estimator fusing an ultrasonic sensor with the robot's motion."""
+import time
+
+
+class DistanceEstimator(object):
+    def __init__(self, sensor, process_variance: float, measurement_variance: float, gate: float=3, max_rejections: int=3, max_age_ms: int=300) -> None:
+        """
+        Initialize DistanceEstimator class.
+
+        A 1-D Kalman filter of the distance to the wall a sensor is facing. The distance is predicted
+        from the robot's velocity towards the wall and corrected with every new reading of the sensor.
+
+        :param sensor: ultrasonic sensor to read, either UltraSonicSensor or IRQUltraSonicSensor
+        :param process_variance: how much the variance of the estimate grows per second in cm^2
+        :param measurement_variance: variance of a single reading in cm^2
+        :param gate: readings further than this many standard deviations from the estimate are rejected as outliers
+        :param max_rejections: after this many rejections in a row the estimate is reset to the reading
+        :param max_age_ms: an estimate not corrected for this long is reset to the next reading, as the readings in between were missed
+
+        :return: None
+        """
+        self.sensor = sensor
+        self.timestamped = hasattr(sensor, "get_reading") # Whether readings come with the time they were measured
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        self.gate = gate
+        self.max_rejections = max_rejections
+        self.max_age_ms = max_age_ms
+
+        self.distance = 0 # Estimated distance to the wall in centimeters
+        self.variance = 0 # Variance of the estimated distance in cm^2
+        self.initialized = False
+        self.rejections = 0
+        self.last_time = time.ticks_ms()
+        self.last_reading_time = None
+        self.last_correction_time = self.last_time
+
+    def reset(self) -> None:
+        """
+        Forget the estimate, for example after the robot turned to face another wall.
+
+        :return: None
+        """
+        self.initialized = False
+        self.rejections = 0
+        self.last_reading_time = None
+
+    def predict(self, velocity: float) -> None:
+        """
+        Move the estimate forward in time.
+
+        :param velocity: speed at which the robot moves towards the wall in centimeters per second
+
+        :return: None
+        """
+        now = time.ticks_ms()
+        dt = time.ticks_diff(now, self.last_time) / 1000
+        self.last_time = now
+
+        if self.initialized:
+            self.distance -= velocity * dt
+            self.variance += self.process_variance * dt
+
+    def correct(self, reading: float) -> bool:
+        """
+        Correct the estimate with a reading of the sensor.
+
+        :param reading: measured distance in centimeters, 0 if out of range
+
+        :return: whether the reading was used
+        """
+        if reading <= 0: # Out of range
+            return False
+
+        if not self.initialized:
+            self.distance = reading
+            self.variance = self.measurement_variance
+            self.initialized = True
+            self.last_correction_time = self.last_time
+            return True
+
+        innovation = reading - self.distance
+        innovation_variance = self.variance + self.measurement_variance
+        if innovation * innovation > self.gate * self.gate * innovation_variance: # Outlier
+            self.rejections += 1
+            if self.rejections >= self.max_rejections: # Wall has really moved, start over
+                self.reset()
+                return self.correct(reading)
+            return False
+
+        self.rejections = 0
+        self.last_correction_time = self.last_time
+        gain = self.variance / innovation_variance
+        self.distance += gain * innovation
+        self.variance *= 1 - gain
+        return True
+
+    def update(self, velocity: float) -> float:
+        """
+        Predict the estimate and correct it if the sensor has a new reading.
+
+        :param velocity: speed at which the robot moves towards the wall in centimeters per second
+
+        :return: estimated distance in centimeters, 0 if nothing is known
+        """
+        self.predict(velocity)
+        if self.initialized and time.ticks_diff(self.last_time, self.last_correction_time) > self.max_age_ms:
+            self.reset()
+
+        if self.timestamped: # Only use readings that have not been used yet
+            reading, reading_time = self.sensor.get_reading()
+            if reading_time != self.last_reading_time:
+                self.last_reading_time = reading_time
+                self.correct(reading)
+        else:
+            self.correct(self.sensor.measure_distance())
+
+        return self.get_distance()
+
+    def get_distance(self) -> float:
+        """
+        Get the estimated distance without updating it.
+
+        :return: estimated distance in centimeters, 0 if nothing is known
+        """
+        if not self.initialized:
+            return 0
+        return self.distance
@@ -1,46 +1,226 @@
 """Gyro sensor class. Model GY-273 HMC5883L."""
+import math
 from machine import Pin
 
 from lib.hmc5883l import HMC5883L
+from lib.storage import save_floats, load_floats
+
+GYRO_CALIBRATION_MAGIC = b"MAGC"
+GYRO_CALIBRATION_VERSION = 1 # Saved before the calibration, version 1 calibrates the x and y axes only (see fit_ellipse)
+GYRO_CALIBRATION_LENGTH = 5 # Numbers in a calibration of GYRO_CALIBRATION_VERSION
+
+
+def solve_linear_system(matrix: list) -> list:
+    """
+    Solve a system of linear equations with Gaussian elimination.
+
+    :param matrix: augmented matrix of the system as a list of rows, changed in place
+
+    :return: solution of the system, None if it has no single solution
+    """
+    size = len(matrix)
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(matrix[row][column]))
+        if abs(matrix[pivot][column]) < 1e-12:
+            return None
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        for row in range(column + 1, size):
+            factor = matrix[row][column] / matrix[column][column]
+            for i in range(column, size + 1):
+                matrix[row][i] -= factor * matrix[column][i]
+
+    solution = [0] * size
+    for row in range(size - 1, -1, -1):
+        total = matrix[row][size]
+        for i in range(row + 1, size):
+            total -= matrix[row][i] * solution[i]
+        solution[row] = total / matrix[row][row]
+    return solution
+
+
+def fit_ellipse(xs, ys, count: int) -> tuple:
+    """
+    Fit a hard and soft iron calibration to magnetometer readings taken while turning in place.
+
+    The readings of a level magnetometer turning in place lie on an ellipse. A least squares fit of the conic
+    A x^2 + B xy + C y^2 + D x + E y = 1 gives its center, the hard iron offset, and its shape, which the
+    soft iron matrix turns into a circle of the same area.
+
+    :param xs: x readings without calibration
+    :param ys: y readings without calibration
+    :param count: how many readings there are
+
+    :return: calibration in the format (x offset, y offset, xx, xy, yy), None if the readings do not form an ellipse
+    """
+    if count < 5:
+        return None
+    # Fit in normalized coordinates, single precision floats lose too much on squared raw readings
+    mean_x = mean_y = 0
+    for i in range(count):
+        mean_x += xs[i]
+        mean_y += ys[i]
+    mean_x /= count
+    mean_y /= count
+    scale = 0
+    for i in range(count):
+        scale = max(scale, abs(xs[i] - mean_x), abs(ys[i] - mean_y))
+    if scale == 0:
+        return None
+
+    normal = [[0] * 6 for _ in range(5)] # Normal equations of the least squares fit
+    for i in range(count):
+        x = (xs[i] - mean_x) / scale
+        y = (ys[i] - mean_y) / scale
+        terms = (x * x, x * y, y * y, x, y)
+        for row in range(5):
+            for column in range(5):
+                normal[row][column] += terms[row] * terms[column]
+            normal[row][5] += terms[row]
+    solution = solve_linear_system(normal)
+    if solution is None:
+        return None
+    a, b, c, d, e = solution
+
+    det = a * c - b * b / 4
+    if det <= 0:
+        return None
+    center_x = -(c * d - b * e / 2) / det / 2
+    center_y = -(a * e - b * d / 2) / det / 2
+    k = 1 + a * center_x * center_x + b * center_x * center_y + c * center_y * center_y
+    if k <= 0:
+        return None
+
+    # Square root of the ellipse's matrix maps it onto a circle, divided by its determinant's root to keep the area
+    a, b, c = a / k, b / 2 / k, c / k
+    s = math.sqrt(a * c - b * b)
+    t = math.sqrt(a + c + 2 * s) * math.sqrt(s)
+    return (mean_x + center_x * scale, mean_y + center_y * scale, (a + s) / t, b / t, (c + s) / t)
+
+
+def save_gyro_calibration(path: str, calibration: tuple) -> None:
+    """
+    Save a hard and soft iron calibration to a file, after the version of its format.
+
+    :param path: path of the file on the flash filesystem
+    :param calibration: calibration in the format (x offset, y offset, xx, xy, yy), see fit_ellipse
+
+    :return: None
+    """
+    save_floats(path, GYRO_CALIBRATION_MAGIC, (GYRO_CALIBRATION_VERSION,) + tuple(calibration))
+
+
+def load_gyro_calibration(path: str) -> tuple:
+    """
+    Load a calibration saved with save_gyro_calibration.
+
+    :param path: path of the file on the flash filesystem
+
+    :return: calibration in the format (x offset, y offset, xx, xy, yy), None if the file is missing, corrupted or of another version
+    """
+    values = load_floats(path, GYRO_CALIBRATION_MAGIC, 1 + GYRO_CALIBRATION_LENGTH)
+    if values is None or values[0] != GYRO_CALIBRATION_VERSION:
+        return None
+    return values[1:]
 
 
 class GyroSensor(object):
-    def __init__(self, scl: Pin, sda: Pin) -> None:
+    def __init__(self, scl: Pin, sda: Pin, i2c_id: int=None, freq: int=15000, rate: float=15, samples: int=8, drdy: Pin=None,
+                 calibration_path: str=None) -> None:
         """
         Initialize GyroSensor class. Model GY-273 HMC5883L.
 
+        Headings are cached per magnetometer reading, so asking for the angle more often than
+        the sensor measures does not use the I2C bus.
+
         :param scl: Pin for serial clock
         :param sda: Pin for serial data
+        :param i2c_id: hardware I2C bus of the pins, None to use software I2C
+        :param freq: clock frequency of the I2C bus in Hz
+        :param rate: how often the sensor measures in Hz (0.75 to 75)
+        :param samples: how many samples the sensor averages per measurement (1, 2, 4 or 8)
+        :param drdy: Pin connected to the data ready output, None to time the readings instead
+        :param calibration_path: file the calibration is saved to, the driver's default calibration is used if there is none
 
         :return: None
         """
-        self.sensor = HMC5883L(scl, sda)
-        self.offset = 0
+        calibration = None if calibration_path is None else load_gyro_calibration(calibration_path)
+        self.sensor = HMC5883L(scl, sda, i2c_id=i2c_id, freq=freq, rate=rate, samples=samples, drdy=drdy, calibration=calibration)
+        # Angles are kept in tenths of degrees as integers
+        self.heading = 0 # Heading of the latest reading (0 to 3599)
+        self.heading_sample = -1 # Sample count of the reading the heading was computed from
+        self.rotation = 0 # Heading of the first reading plus the rotation since, unwrapped, positive to the right
+        self.offset = 0 # Rotation at which the angle is 0
     
+    def update(self) -> None:
+        """
+        Read the sensor and track the rotation if it has a new reading.
+
+        The rotation is unwrapped by taking the shortest way between two readings, so the robot
+        must not turn more than 180 degrees between two calls.
+
+        :return: None
+        """
+        sensor = self.sensor
+        x, y, z = sensor.read()
+        if sensor.sample_count == self.heading_sample:
+            return
+        heading = sensor.heading_tenths(x, y)
+        if self.heading_sample >= 0:
+            self.rotation += (heading - self.heading + 5400) % 3600 - 1800
+        else:
+            self.rotation = heading
+        self.heading = heading
+        self.heading_sample = sensor.sample_count
+
+    def set_calibration(self, calibration: tuple, path: str=None) -> None:
+        """
+        Use a new hard and soft iron calibration.
+
+        :param calibration: calibration in the format (x offset, y offset, xx, xy, yy), see fit_ellipse
+        :param path: file to save the calibration to, None to not save it
+
+        :return: None
+        """
+        self.sensor.set_calibration(calibration)
+        if path is not None:
+            save_gyro_calibration(path, calibration)
+
     def get_heading(self) -> float:
         """
         Get heading of the robot in degrees.
 
-        :return: Heading of the robot with accuracy up to 0.1 degrees
+        :return: Heading of the robot with accuracy up to 0.1 degrees (0 to 359.9)
         """
-        x, y, z = self.sensor.read()
-        degrees, minutes = self.sensor.heading(x, y)
-        return round(degrees + minutes / 60, 1)
+        self.update()
+        return self.heading / 10
 
     def reset_angle(self, angle: float) -> None:
         """
         Reset angle of gyro sensor to given value.
 
-        :param angle: angle to reset the gyro sensor to.
+        :param angle: angle to reset the gyro sensor to, may be outside 0 to 360.
 
         :return: None
         """
-        self.offset = self.get_heading() - round(angle, 1)
+        self.update()
+        self.offset = self.rotation - round(angle * 10)
+
+    def get_unwrapped_angle(self) -> float:
+        """
+        Get angle of the robot in degrees, counting whole turns instead of wrapping around at 360.
+
+        The difference of two angles is how much the robot turned in between, positive to the right.
+
+        :return: Angle of the robot with accuracy up to 0.1 degrees
+        """
+        self.update()
+        return (self.rotation - self.offset) / 10
 
     def get_angle(self) -> float:
         """
         Get angle of the robot in degrees.
 
-        :return: Angle of the robot with accuracy up to 0.1 degrees
+        :return: Angle of the robot with accuracy up to 0.1 degrees (0 to 359.9)
         """
-        return round((360 + self.get_heading() - self.offset) % 360, 1)
+        self.update()
+        return (self.rotation - self.offset) % 3600 / 10
@@ -1,10 +1,13 @@
 """Ultrasonic sensor class. Model HC-SRO4."""
 import time
+from array import array
 
-from machine import Pin
+from machine import Pin, Timer
 
 from constants import ACTUAL_DISTANCE_MULTIPLIER_CM
 
+MAX_ECHO_TIME_US = 17500 # Echoes longer than this are further than 300 cm and out of range
+
 
 class UltraSonicSensor(object):
     def __init__(self, trigger: Pin, echo: Pin) -> None:
@@ -36,13 +39,13 @@ class UltraSonicSensor(object):
             self.trigger.value(0)
             start_time = end_time = time.ticks_us()
 
-            while self.echo.value() == 0 and start_time - end_time < 50000:
+            while self.echo.value() == 0 and time.ticks_diff(start_time, end_time) < 50000:
                 start_time = time.ticks_us()
 
-            while self.echo.value() == 1 and end_time - start_time < 50000:
+            while self.echo.value() == 1 and time.ticks_diff(end_time, start_time) < 50000:
                 end_time = time.ticks_us()
 
-            total_time = end_time - start_time
+            total_time = time.ticks_diff(end_time, start_time)
 
             distance = round(total_time * ACTUAL_DISTANCE_MULTIPLIER_CM, 1)
             if distance <= 1 or distance >= 300:
@@ -50,3 +53,162 @@ class UltraSonicSensor(object):
             vals.append(distance)
         vals.sort()
         return vals[2] # Median value
+
+
+class IRQUltraSonicSensor(object):
+    def __init__(self, trigger: Pin, echo: Pin, history_size: int=3) -> None:
+        """
+        Initialize IRQUltraSonicSensor class. Model HC-SRO4.
+
+        Echo edges are timestamped in a pin interrupt, so pinging and reading never wait for the echo.
+        Use UltraSonicRanger to ping in the background.
+
+        :param trigger: Pin class for trigger pin
+        :param echo: Pin class for echo pin
+        :param history_size: how many last echoes the distance is filtered over, every echo adds a ping period per sensor of lag
+
+        :return: None
+        """
+        self.trigger = trigger
+        self.echo = echo
+
+        self.echo_times = array('l', [0] * history_size) # Ring buffer of last echo times in microseconds, 0 if no echo
+        self.sorted_echo_times = array('l', [0] * history_size) # Scratch buffer for the median
+        self.history_size = history_size
+        self.history_pos = 0
+
+        self.rise_time = 0 # When the current echo started in ticks_us
+        self.echo_timestamp = 0 # When the latest echo ended in ticks_ms
+        self.waiting = False # Whether the last ping has not been answered yet
+
+        self.echo_handler = self._echo_handler # Bound once, so the interrupt does not allocate it
+        echo.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self.echo_handler)
+
+    def _echo_handler(self, pin: Pin) -> None:
+        now = time.ticks_us()
+        if pin.value():
+            self.rise_time = now
+        elif self.waiting:
+            self._add_echo_time(time.ticks_diff(now, self.rise_time))
+            self.echo_timestamp = time.ticks_ms()
+
+    def _add_echo_time(self, echo_time: int) -> None:
+        self.waiting = False
+        self.echo_times[self.history_pos] = echo_time if echo_time < MAX_ECHO_TIME_US else 0
+        self.history_pos = (self.history_pos + 1) % self.history_size
+
+    def clear(self) -> None:
+        """
+        Forget the last echoes, for example after turning, when they are of another wall.
+
+        :return: None
+        """
+        for i in range(self.history_size):
+            self.echo_times[i] = 0
+
+    def ping(self) -> None:
+        """
+        Send an ultrasonic ping, its echo is recorded in the background.
+
+        :return: None
+        """
+        if self.waiting: # Previous ping got no echo
+            self._add_echo_time(0)
+        self.waiting = True
+        self.trigger.value(1)
+        time.sleep_us(10)
+        self.trigger.value(0)
+
+    def get_distance(self) -> float:
+        """
+        Get the latest filtered distance in centimeters without waiting.
+
+        :return: median of the distances of the last echoes in centimeters, 0 if the distance is out of range
+        """
+        times = self.sorted_echo_times
+        count = 0
+        for echo_time in self.echo_times: # Insertion sort of the valid echo times
+            if echo_time == 0:
+                continue
+            i = count
+            while i > 0 and times[i - 1] > echo_time:
+                times[i] = times[i - 1]
+                i -= 1
+            times[i] = echo_time
+            count += 1
+
+        if count <= self.history_size // 2: # Most pings had no echo
+            return 0
+
+        distance = round(times[count // 2] * ACTUAL_DISTANCE_MULTIPLIER_CM, 1)
+        if distance <= 1:
+            return 0
+        return distance
+
+    def get_reading(self) -> tuple:
+        """
+        Get the latest filtered distance together with when it was measured.
+
+        :return: tuple (distance, timestamp) of the distance in centimeters and the ticks_ms time of the latest echo
+        """
+        return self.get_distance(), self.echo_timestamp
+
+    def get_raw_reading(self) -> tuple:
+        """
+        Get the distance of the latest echo without filtering, the median of get_distance lags behind a moving robot.
+
+        :return: tuple (distance, timestamp) of the distance in centimeters, 0 if there was no echo,
+                 and the ticks_ms time the ping reached the wall
+        """
+        echo_time = self.echo_times[(self.history_pos - 1) % self.history_size]
+        return round(echo_time * ACTUAL_DISTANCE_MULTIPLIER_CM, 1), time.ticks_add(self.echo_timestamp, -(echo_time // 2000))
+
+    def measure_distance(self) -> float:
+        """
+        Measure distance in centimeters.
+
+        :return: latest filtered distance from ultrasonic sensor in centimeters
+        """
+        return self.get_distance()
+
+
+class UltraSonicRanger(object):
+    def __init__(self, sensors: tuple, period_ms: int) -> None:
+        """
+        Initialize UltraSonicRanger class.
+
+        Pings the sensors one at a time from a timer, so their echoes never overlap.
+
+        :param sensors: IRQUltraSonicSensor objects to ping
+        :param period_ms: milliseconds between two pings, each sensor is pinged once every len(sensors) * period_ms
+
+        :return: None
+        """
+        self.sensors = sensors
+        self.period_ms = period_ms
+        self.next_sensor = 0
+        self.timer = None
+        self.timer_callback = self._ping_next # Bound once, so the timer does not allocate it
+
+    def _ping_next(self, timer: Timer) -> None:
+        self.sensors[self.next_sensor].ping()
+        self.next_sensor = (self.next_sensor + 1) % len(self.sensors)
+
+    def start(self) -> None:
+        """
+        Start pinging in the background.
+
+        :return: None
+        """
+        if self.timer is None:
+            self.timer = Timer(period=self.period_ms, mode=Timer.PERIODIC, callback=self.timer_callback)
+
+    def stop(self) -> None:
+        """
+        Stop pinging.
+
+        :return: None
+        """
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
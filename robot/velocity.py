@@ -0,0 +1,233 @@
+"""Model of how fast the robot drives at a percentage of speed, calibrated by driving towards a wall."""
+from array import array
+
+from lib.storage import save_floats, load_floats
+
+VELOCITY_MODEL_MAGIC = b"VELM"
+VELOCITY_MODEL_VERSION = 1 # Saved before the model, version 1 saves the speeds, time constant, braking time and velocities
+
+
+def get_velocity_table(speeds: tuple, velocities: tuple) -> array:
+    """
+    Compile velocities measured at some speeds of one direction into a table of velocities of every speed.
+
+    Velocities are interpolated between the measured speeds and extrapolated from the two closest ones outside them,
+    so the line through the two slowest ones gives the deadband. The table never decreases with speed.
+
+    :param speeds: percentages of speed the velocities were measured at, in increasing order
+    :param velocities: velocities measured at the speeds in centimeters per second
+
+    :return: velocities in centimeters per second indexed by speed from 0 to 100
+    """
+    table = array('f', [0] * 101)
+    last = len(speeds) - 1
+    segment = 0
+    for speed in range(1, 101):
+        while segment < last - 1 and speed > speeds[segment + 1]:
+            segment += 1
+        if last == 0: # Single measurement, velocity proportional to speed
+            velocity = velocities[0] * speed / speeds[0]
+        else:
+            speed_0, speed_1 = speeds[segment], speeds[segment + 1]
+            velocity_0, velocity_1 = velocities[segment], velocities[segment + 1]
+            velocity = velocity_0 + (velocity_1 - velocity_0) * (speed - speed_0) / (speed_1 - speed_0)
+        table[speed] = max(table[speed - 1], velocity)
+    return table
+
+
+def fit_line(xs, ys, start: int, end: int) -> tuple:
+    """
+    Fit a line y = a + b x to points by least squares.
+
+    :param xs: x coordinates of the points
+    :param ys: y coordinates of the points
+    :param start: index of the first point to fit
+    :param end: index after the last point to fit
+
+    :return: tuple (a, b), None if there are less than 2 different x coordinates
+    """
+    count = end - start
+    if count < 2:
+        return None
+    mean_x = mean_y = 0
+    for i in range(start, end):
+        mean_x += xs[i]
+        mean_y += ys[i]
+    mean_x /= count
+    mean_y /= count
+    sxx = sxy = 0
+    for i in range(start, end):
+        dx = xs[i] - mean_x
+        sxx += dx * dx
+        sxy += dx * (ys[i] - mean_y)
+    if sxx == 0:
+        return None
+    slope = sxy / sxx
+    return mean_y - slope * mean_x, slope
+
+
+def fit_run(times, distances, count: int, start_distance: float, direction: int) -> tuple:
+    """
+    Fit the velocity and the time constant of a run driven towards or away from a wall.
+
+    Motors reach their velocity like a first order system, so once it has settled the robot is velocity * time constant
+    behind where it would be had it started at full velocity. A line fitted to the later half of the run gives the
+    velocity as its slope and the time constant from where it crosses the start distance.
+
+    :param times: seconds since the motors were started of the readings
+    :param distances: distances to the wall read in centimeters
+    :param count: how many readings there are
+    :param start_distance: distance to the wall before the motors were started
+    :param direction: 1 if the robot drove towards the wall, -1 if away from it
+
+    :return: tuple (velocity, time constant, line) of the velocity in centimeters per second, the time constant in seconds
+             and the fitted line (a, b) of distance = a + b * time, None if the readings do not give a line
+    """
+    if count < 2:
+        return None
+    half_time = times[count - 1] / 2
+    start = 0
+    while start < count - 2 and times[start] < half_time:
+        start += 1
+    line = fit_line(times, distances, start, count)
+    if line is None:
+        return None
+    velocity = -direction * line[1]
+    if velocity <= 0:
+        return 0, 0, line
+    return velocity, direction * (line[0] - start_distance) / velocity, line
+
+
+class VelocityModel(object):
+    def __init__(self, speeds: tuple, forward_velocities: tuple, reverse_velocities: tuple, time_constant: float=0,
+                 braking_time: float=0) -> None:
+        """
+        Initialize VelocityModel class.
+
+        The measured velocities are compiled into tables here, so getting the velocity of a speed is a table lookup.
+
+        :param speeds: percentages of speed the velocities were measured at, in increasing order
+        :param forward_velocities: velocities driving forward at the speeds in centimeters per second
+        :param reverse_velocities: velocities driving backward at the speeds in centimeters per second, positive
+        :param time_constant: time constant of the robot reaching the velocity of a speed in seconds
+        :param braking_time: how far the robot goes after braking, in seconds of driving at the velocity it braked at
+
+        :return: None
+        """
+        self.speeds = speeds
+        self.forward_velocities = forward_velocities
+        self.reverse_velocities = reverse_velocities
+        self.time_constant = time_constant
+        self.braking_time = braking_time
+        self.forward_table = get_velocity_table(speeds, forward_velocities)
+        self.reverse_table = get_velocity_table(speeds, reverse_velocities)
+
+    def get_velocity(self, speed: int) -> float:
+        """
+        Get the velocity the robot settles at when driving at a speed.
+
+        :param speed: percentage of speed (-100 to 100), limited to the range
+
+        :return: velocity in centimeters per second, negative when driving backwards
+        """
+        speed = max(-100, min(100, int(speed)))
+        if speed < 0:
+            return -self.reverse_table[-speed]
+        return self.forward_table[speed]
+
+    def get_speed(self, velocity: float) -> int:
+        """
+        Get the speed the robot drives closest to a velocity at, a speed in the deadband is never given for a velocity other than 0.
+
+        :param velocity: velocity in centimeters per second, negative when driving backwards
+
+        :return: percentage of speed (-100 to 100), 100 or -100 if the velocity can't be reached
+        """
+        if velocity == 0:
+            return 0
+        table = self.forward_table if velocity > 0 else self.reverse_table
+        direction = 1 if velocity > 0 else -1
+        velocity = abs(velocity)
+        low, high = 1, 100
+        while low < high: # Table never decreases, binary search for the first speed that is fast enough
+            middle = (low + high) // 2
+            if table[middle] < velocity:
+                low = middle + 1
+            else:
+                high = middle
+        if low > 1 and table[low - 1] > 0 and velocity - table[low - 1] < table[low] - velocity:
+            low -= 1
+        return direction * low
+
+    def get_max_velocity(self) -> float:
+        """
+        Get the velocity at full speed forward.
+
+        :return: velocity in centimeters per second
+        """
+        return self.forward_table[100]
+
+    def get_braking_distance(self, speed: int) -> float:
+        """
+        Get how far the robot goes after braking from a speed.
+
+        :param speed: percentage of speed (-100 to 100)
+
+        :return: distance in centimeters
+        """
+        return abs(self.get_velocity(speed)) * self.braking_time
+
+    def get_drive_time(self, distance: float, speed: int, start_velocity: float=0, brake: bool=True) -> float:
+        """
+        Get how long to drive at a speed to cover a distance.
+
+        Speeding up from the start velocity the robot falls behind by the velocity change times the time constant,
+        braking in the end it makes up for the distance it goes after braking.
+
+        :param distance: distance to drive in centimeters
+        :param speed: percentage of speed to drive at (-100 to 100)
+        :param start_velocity: velocity the robot drives at before, in centimeters per second
+        :param brake: whether the robot brakes in the end
+
+        :return: time in seconds, 0 if the robot doesn't move at the speed
+        """
+        velocity = self.get_velocity(speed)
+        if velocity == 0:
+            return 0
+        if velocity < 0: # Driving backwards, count velocities in the direction of driving
+            velocity = -velocity
+            start_velocity = -start_velocity
+        distance += (velocity - start_velocity) * self.time_constant
+        if brake:
+            distance -= velocity * self.braking_time
+        return max(0, distance / velocity)
+
+
+def save_velocity_model(path: str, model: VelocityModel) -> None:
+    """
+    Save a velocity model to a file, after the version of its format and the speeds it was calibrated at.
+
+    :param path: path of the file on the flash filesystem
+    :param model: velocity model to save
+
+    :return: None
+    """
+    save_floats(path, VELOCITY_MODEL_MAGIC, (VELOCITY_MODEL_VERSION,) + tuple(model.speeds)
+                + (model.time_constant, model.braking_time) + tuple(model.forward_velocities) + tuple(model.reverse_velocities))
+
+
+def load_velocity_model(path: str, speeds: tuple) -> VelocityModel:
+    """
+    Load a velocity model saved with save_velocity_model.
+
+    :param path: path of the file on the flash filesystem
+    :param speeds: percentages of speed the model was calibrated at
+
+    :return: velocity model, None if the file is missing, corrupted, of another version or calibrated at other speeds
+    """
+    count = len(speeds)
+    values = load_floats(path, VELOCITY_MODEL_MAGIC, 3 + 3 * count)
+    if values is None or values[0] != VELOCITY_MODEL_VERSION or values[1:1 + count] != tuple(speeds):
+        return None
+    values = values[1 + count:]
+    return VelocityModel(speeds, values[2:2 + count], values[2 + count:], values[0], values[1])
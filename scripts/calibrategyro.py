@@ -1,66 +1,29 @@
-#              .';:cc;.
-#            .,',;lol::c.
-#            ;';lddddlclo
-#            lcloxxoddodxdool:,.
-#            cxdddxdodxdkOkkkkkkkd:.
-#          .ldxkkOOOOkkOO000Okkxkkkkx:.
-#        .lddxkkOkOOO0OOO0000Okxxxxkkkk:
-#       'ooddkkkxxkO0000KK00Okxdoodxkkkko
-#      .ooodxkkxxxOO000kkkO0KOxolooxkkxxkl
-#      lolodxkkxxkOx,.      .lkdolodkkxxxO.
-#      doloodxkkkOk           ....   .,cxO;
-#      ddoodddxkkkk:         ,oxxxkOdc'..o'
-#      :kdddxxxxd,  ,lolccldxxxkkOOOkkkko,
-#       lOkxkkk;  :xkkkkkkkkOOO000OOkkOOk.
-#        ;00Ok' 'O000OO0000000000OOOO0Od.
-#         .l0l.;OOO000000OOOOOO000000x,
-#            .'OKKKK00000000000000kc.
-#               .:ox0KKKKKKK0kdc,.
-#                      ...
-#
-# Author: peppe8o
-# Date: Dec 11th, 2021
-# Version: 1.0
-# https://peppe8o.com
+# Spins the robot in place, fits the magnetometer's hard and soft iron calibration
+# and saves it to flash, where the gyro sensor loads it from at startup
 import sys
 root_folder = sys.path[0] = "/.."
 sys.path.insert(1, root_folder)
 
-from lib.hmc5883l import HMC5883L
 from time import sleep
-from constants import GYRO_SCL_PIN, GYRO_SDA_PIN
+from lib.hardware import Hardware
+from constants import GYRO_CALIBRATION_FILE_PATH, GYRO_CALIBRATION_SPEED, GYRO_CALIBRATION_TURNS, GYRO_CALIBRATION_MAX_SAMPLES
 
 
 if __name__ == "__main__":
-    sensor = HMC5883L(GYRO_SCL_PIN, GYRO_SDA_PIN)
+    hardware = Hardware()
+    # Calibrate from the driver's default calibration, not from a saved one, the gyro is created before the robot for that
+    gyro = hardware.get_gyro(None)
+    robot = hardware.get_robot()
+    robot.gyro = gyro
+    print("Spinning in 3 seconds, put the robot on level ground away from metal")
+    sleep(3)
 
-    Xmin=1000
-    Xmax=-1000
-    Ymin=1000
-    Ymax=-1000
-
-    while True:
-        try:
-            sleep(0.2)
-            x, y, z = sensor.read()
-            Xmin=min(x,Xmin)
-            Xmax=max(x,Xmax)
-            Ymin=min(y,Ymin)
-            Ymax=max(y,Ymax)
-            print(sensor.format_result(x, y, z))
-            print("Xmin="+str(Xmin)+"; Xmax="+str(Xmax)+"; Ymin="+str(Ymin)+"; Ymax="+str(Ymax))
-
-        except KeyboardInterrupt:
-            print()
-            print('Got ctrl-c')
-
-            xs=1
-            ys=(Xmax-Xmin)/(Ymax-Ymin)
-            xb =xs*(1/2*(Xmax-Xmin)-Xmax)
-            yb =xs*(1/2*(Ymax-Ymin)-Ymax)
-            print("Calibration corrections:")
-            print("xs="+str(xs))
-            print("xb="+str(xb))
-            print("ys="+str(ys))
-            print("yb="+str(yb))
-            break
+    calibration = robot.calibrate_gyro(GYRO_CALIBRATION_SPEED, GYRO_CALIBRATION_TURNS, GYRO_CALIBRATION_MAX_SAMPLES, GYRO_CALIBRATION_FILE_PATH)
+    robot.ranger.stop()
+    if calibration is None:
+        print("Calibration failed, the readings do not form an ellipse")
+    else:
+        x_offset, y_offset, xx, xy, yy = calibration
+        print("Saved calibration to " + GYRO_CALIBRATION_FILE_PATH + ":")
+        print("x offset={}, y offset={}".format(x_offset, y_offset))
+        print("soft iron matrix=(({}, {}), ({}, {}))".format(xx, xy, xy, yy))
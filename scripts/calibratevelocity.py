@@ -0,0 +1,28 @@
+# Drives towards the wall in front and back at several speeds, fits how fast the robot
+# drives at each speed and saves it to flash, where the robot loads it from at startup
+import sys
+root_folder = sys.path[0] = "/.."
+sys.path.insert(1, root_folder)
+
+from time import sleep
+from lib.helper import get_robot
+from constants import VELOCITY_MODEL_FILE_PATH, VELOCITY_CALIBRATION_SPEEDS, VELOCITY_CALIBRATION_DISTANCE_CM, \
+                      VELOCITY_CALIBRATION_MAX_SAMPLES
+
+
+if __name__ == "__main__":
+    robot = get_robot()
+    print("Driving in 3 seconds, face the robot to a wall {} cm or more away with as much room behind it".format(
+        VELOCITY_CALIBRATION_DISTANCE_CM + 20))
+    sleep(3)
+
+    model = robot.calibrate_velocity(VELOCITY_CALIBRATION_SPEEDS, VELOCITY_CALIBRATION_DISTANCE_CM, VELOCITY_CALIBRATION_MAX_SAMPLES,
+                                     VELOCITY_MODEL_FILE_PATH)
+    robot.ranger.stop()
+    if model is None:
+        print("Calibration failed, the wall was out of range or the robot did not move")
+    else:
+        print("Saved velocity model to " + VELOCITY_MODEL_FILE_PATH + ":")
+        for speed, forward_velocity, reverse_velocity in zip(model.speeds, model.forward_velocities, model.reverse_velocities):
+            print("{}%: {:.1f} cm/s forward, {:.1f} cm/s backward".format(speed, forward_velocity, reverse_velocity))
+        print("time constant={:.3f} s, braking time={:.3f} s".format(model.time_constant, model.braking_time))
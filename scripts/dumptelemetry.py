@@ -0,0 +1,15 @@
+# Prints the telemetry of the last run saved to flash over USB serial as comma separated values
+import sys
+root_folder = sys.path[0] = "/.."
+sys.path.insert(1, root_folder)
+
+from lib.telemetry import load_telemetry
+from constants import TELEMETRY_FILE_PATH
+
+
+if __name__ == "__main__":
+    telemetry = load_telemetry(TELEMETRY_FILE_PATH)
+    if telemetry is None:
+        print("No telemetry saved in " + TELEMETRY_FILE_PATH)
+    else:
+        telemetry.dump()
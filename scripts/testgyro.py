@@ -3,11 +3,10 @@ root_folder = sys.path[0] = "/.."
 sys.path.insert(1, root_folder)
 
 from time import sleep
-from constants import GYRO_SCL_PIN, GYRO_SDA_PIN
-from robot.sensors.gyro import GyroSensor
+from lib.hardware import Hardware
 
 if __name__ == "__main__":
-    gyro = GyroSensor(GYRO_SCL_PIN, GYRO_SDA_PIN)
+    gyro = Hardware().get_gyro()
     gyro.reset_angle(0)
     while True:
         reading = gyro.get_angle()
@@ -3,6 +3,9 @@ import sys
 root_folder = sys.path[0] = "/.."
 sys.path.insert(1, root_folder)
 
+from machine import Pin
+
+from lib.hardware import Hardware
 from constants import LEFT_ULTRASONIC_ECHO_PIN, LEFT_ULTRASONIC_TRIGGER_PIN, \
                       RIGHT_ULTRASONIC_ECHO_PIN, RIGHT_ULTRASONIC_TRIGGER_PIN, \
                       FRONT_ULTRASONIC_ECHO_PIN, FRONT_ULTRASONIC_TRIGGER_PIN
@@ -11,9 +14,11 @@ from time import sleep
 
 
 if __name__ == "__main__":
-    left = UltraSonicSensor(LEFT_ULTRASONIC_TRIGGER_PIN, LEFT_ULTRASONIC_ECHO_PIN)
-    front = UltraSonicSensor(FRONT_ULTRASONIC_TRIGGER_PIN, FRONT_ULTRASONIC_ECHO_PIN)
-    right = UltraSonicSensor(RIGHT_ULTRASONIC_TRIGGER_PIN, RIGHT_ULTRASONIC_ECHO_PIN)
+    # Measures with blocking pings, the robot's interrupt driven sensors are not created
+    hardware = Hardware()
+    left = UltraSonicSensor(hardware.get_pin(LEFT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), hardware.get_pin(LEFT_ULTRASONIC_ECHO_PIN, Pin.IN))
+    front = UltraSonicSensor(hardware.get_pin(FRONT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), hardware.get_pin(FRONT_ULTRASONIC_ECHO_PIN, Pin.IN))
+    right = UltraSonicSensor(hardware.get_pin(RIGHT_ULTRASONIC_TRIGGER_PIN, Pin.OUT), hardware.get_pin(RIGHT_ULTRASONIC_ECHO_PIN, Pin.IN))
 
     while True:
         l_reading = left.measure_distance()
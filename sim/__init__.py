@@ -0,0 +1,105 @@
+"""Host side simulator of the robot, run the robot's code on CPython without a Raspberry Pi Pico."""
+import sys
+import math
+import time
+import struct
+import asyncio
+import selectors
+
+from sim import machine
+from sim.world import SimulatedWorld
+
+
+def install(world: SimulatedWorld=None) -> None:
+    """
+    Make the robot's code run in a simulated world.
+
+    Replaces the machine module with the simulated one and makes the MicroPython time functions
+    use the world's virtual clock, so sleeping only advances simulated time.
+    Must be called before any module that imports machine is imported. Without a world only the modules
+    are replaced, so the constants can be read before building a world. Calling it again with a new world
+    moves the hardware into that world, robot objects must then be created again.
+
+    Asyncio code runs in simulated time too when it is run with run_async.
+
+    :param world: world to simulate, None to only replace the modules
+
+    :return: None
+    """
+    sys.modules["machine"] = machine
+    sys.modules.setdefault("ustruct", struct)
+
+    time.sleep = lambda seconds: machine.world.advance(int(seconds * 1000000))
+    time.sleep_ms = lambda ms: machine.world.advance(int(ms * 1000))
+    time.sleep_us = lambda us: machine.world.advance(int(us))
+    time.ticks_ms = lambda: machine.world.ticks_ms()
+    time.ticks_us = lambda: machine.world.ticks_us()
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+
+    if not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+
+    if world is None:
+        return
+
+    machine.world = world
+    for pin in machine.pins.values(): # Pins outlive a world, inputs start low in the new one
+        if pin.mode == machine.Pin.IN:
+            pin._value = 0
+
+    import constants
+    from lib.hmc5883l import HMC5883L
+    world.bind(constants, HMC5883L)
+
+
+class SimulatedSelector(selectors.DefaultSelector):
+    def select(self, timeout: float=None) -> list:
+        """
+        Poll for I/O without blocking, letting simulated time pass instead of waiting for the next timer.
+
+        :param timeout: seconds until the event loop's next timer, None if it has none
+
+        :return: list of (key, events) of the ready file objects
+        """
+        events = super().select(0)
+        if not events and timeout:
+            machine.world.advance(math.ceil(timeout * 1000000))
+        elif not events and timeout is None:
+            raise RuntimeError("Nothing left to run, the tasks wait for each other forever")
+        return events
+
+
+class SimulatedEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self) -> None:
+        """
+        Initialize SimulatedEventLoop class.
+
+        An event loop whose clock is the world's simulated time, sleeping tasks let simulated time pass.
+
+        :return: None
+        """
+        super().__init__(SimulatedSelector())
+
+    def time(self) -> float:
+        return machine.world.now_us / 1000000
+
+
+def run_async(coroutine):
+    """
+    Run a coroutine and the tasks it starts in simulated time, like asyncio.run does on the robot.
+
+    :param coroutine: coroutine to run
+
+    :return: what the coroutine returns
+    """
+    loop = SimulatedEventLoop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks: # Background tasks run forever
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
@@ -0,0 +1,230 @@
+"""Benchmark the mapping and solving strategies in the simulator, run from the repository root with python -m sim.benchmark"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import sim
+from sim.world import SimulatedWorld
+from sim.mazes import generate_maze
+
+MAPPING_STRATEGIES = ("flood", "dfs", "frontier")
+MAZE_KINDS = {"perfect": 0, "imperfect": 0.1} # Fraction of inner walls removed to make loops
+
+
+class Measurement(object):
+    def __init__(self, world: SimulatedWorld, trace_memory: bool=True) -> None:
+        """
+        Initialize Measurement class.
+
+        Measures a piece of robot code run in the simulator: processor time and peak memory of the code
+        itself and the simulated time, distance, turns, stops and collisions of the robot.
+
+        An exception raised by the code is recorded in the result instead of stopping the benchmark.
+
+        :param world: world the code runs in
+        :param trace_memory: whether to measure peak memory, tracing allocations makes the code run several times slower
+
+        :return: None
+        """
+        self.world = world
+        self.trace_memory = trace_memory
+        self.result = {}
+
+    def __enter__(self):
+        world = self.world
+        self.start = (time.process_time(), world.cpu_time_s, world.now_us, world.distance_cm,
+                      world.rotation_deg, world.stops, world.collisions)
+        if self.trace_memory:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if self.trace_memory:
+            self.result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        world = self.world
+        cpu_time, world_cpu_time, now_us, distance, rotation, stops, collisions = self.start
+        side_length = world.maze.side_length
+        self.result.update({
+            "cpu_time_s": round(time.process_time() - cpu_time - (world.cpu_time_s - world_cpu_time), 4),
+            "robot_time_s": round((world.now_us - now_us) / 1000000, 3),
+            "squares_driven": round((world.distance_cm - distance) / side_length, 1),
+            "turns": round((world.rotation_deg - rotation) / 90, 1),
+            "stops": world.stops - stops,
+            "collisions": world.collisions - collisions,
+        })
+        if exc_type is not None:
+            self.result["error"] = "{}: {}".format(exc_type.__name__, exc_value)
+        return exc_type is not None and issubclass(exc_type, Exception)
+
+
+def get_shortest_path_length(maze, start_x: int, start_y: int) -> int:
+    """
+    Get how many squares the shortest path from a square to the center of a fully known maze has.
+
+    :param maze: maze with every wall known
+    :param start_x: x coordinate of the start square
+    :param start_y: y coordinate of the start square
+
+    :return: number of squares driven on the shortest path, -1 if the center can't be reached
+    """
+    from mazesolver.bfs import BFSEngine
+    path = BFSEngine(maze.width * maze.height).search(maze, start_x, start_y, maze.goal_mask)
+    return -1 if path is None else len(path) - 1
+
+
+def count_wrong_walls(mapped_maze, real_maze) -> int:
+    """
+    Count the known walls of a mapped maze that differ from the real maze.
+
+    :param mapped_maze: maze mapped by the robot
+    :param real_maze: maze the robot drove in
+
+    :return: number of square sides whose wall was mapped wrong, counted from both sides
+    """
+    wrong = 0
+    for y in range(real_maze.height):
+        for x in range(real_maze.width):
+            for direction in range(4):
+                if mapped_maze.is_known(x, y, direction) and mapped_maze.has_wall(x, y, direction) != real_maze.has_wall(x, y, direction):
+                    wrong += 1
+    return wrong
+
+
+def run_benchmark(width: int, kind: str, seed: int, strategy: str, exploration_speed: int, trace_memory: bool=True) -> dict:
+    """
+    Map a generated maze with a strategy, then plan and drive the solution.
+
+    :param width: width and height of the maze
+    :param kind: "perfect" or "imperfect"
+    :param seed: seed of the maze and the sensor noise
+    :param strategy: mapping strategy, one of MAPPING_STRATEGIES
+    :param exploration_speed: speed to explore the maze at (1 to 100)
+    :param trace_memory: whether to measure peak memory
+
+    :return: results in the format {"maze": ..., "strategy": ..., "mapping": ..., "bfs": ..., "motion_plan": ..., "planner": ..., "solution": ...}
+    """
+    sim.install()
+    from constants import LABYRINTH_SQUARE_LENGTH_CM
+    real_maze = generate_maze(width, width, LABYRINTH_SQUARE_LENGTH_CM, seed, MAZE_KINDS[kind])
+    world = SimulatedWorld(real_maze, 0, width - 1, 0, seed)
+    sim.install(world)
+
+    from lib.hardware import Hardware
+    from mazesolver.maze import Maze
+    from mazesolver.mazemapper import MazeMapper
+    from robot.motion import MotionController
+    from constants import MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED
+
+    robot = Hardware().get_robot() # Every run has its own world, so its own hardware
+    maze_mapper = MazeMapper(robot, Maze(width, width, LABYRINTH_SQUARE_LENGTH_CM), exploration_speed)
+    motion = MotionController(robot, MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED)
+    results = {
+        "maze": {"size": width, "kind": kind, "seed": seed,
+                 "shortest_path_squares": get_shortest_path_length(real_maze, 0, width - 1)},
+        "strategy": strategy,
+    }
+
+    with Measurement(world, trace_memory) as mapping:
+        if strategy == "flood":
+            maze_mapper.map_maze_flood_fill(maze_mapper.start_x, maze_mapper.start_y, 0)
+        elif strategy == "dfs":
+            maze_mapper.map_maze_dfs(maze_mapper.start_x, maze_mapper.start_y, 0)
+        else:
+            maze_mapper.map_maze_frontier(maze_mapper.start_x, maze_mapper.start_y, 0)
+    mapping.result["squares_visited"] = sum(maze_mapper.visited)
+    mapping.result["shortest_path_squares"] = get_shortest_path_length(maze_mapper.maze, maze_mapper.start_x, maze_mapper.start_y)
+    mapping.result["wrong_walls"] = count_wrong_walls(maze_mapper.maze, real_maze)
+    results["mapping"] = mapping.result
+    if "error" in mapping.result: # Robot got lost, the map can't be solved
+        robot.ranger.stop()
+        return results
+
+    maze_solver = maze_mapper.get_maze_solver()
+    with Measurement(world, trace_memory) as bfs:
+        plan = maze_solver.find_and_construct_optimal_path()
+    bfs.result["plan_bytes"] = len(plan)
+    results["bfs"] = bfs.result
+
+    with Measurement(world, trace_memory) as motion_plan:
+        plan, estimated_time = maze_solver.find_and_construct_motion_plan()
+    motion_plan.result["plan_bytes"] = len(plan)
+    motion_plan.result["estimated_time_s"] = round(estimated_time, 3)
+    results["motion_plan"] = motion_plan.result
+
+    with Measurement(world, trace_memory) as planner:
+        plan, estimated_time = maze_solver.find_and_construct_speed_run_plan()
+    planner.result["plan_bytes"] = len(plan)
+    planner.result["estimated_time_s"] = round(estimated_time, 3)
+    results["planner"] = planner.result
+
+    with Measurement(world, trace_memory) as solution:
+        motion.execute(plan)
+    results["solution"] = solution.result
+
+    robot.ranger.stop()
+    return results
+
+
+def get_failures(runs: list) -> list:
+    """
+    Find the runs whose robot collided with a wall or got lost.
+
+    :param runs: results of run_benchmark
+
+    :return: list of descriptions of the failures in the format ["8 perfect seed 0 dfs mapping: 2 collisions", ...]
+    """
+    failures = []
+    for run in runs:
+        name = "{} {} seed {} {}".format(run["maze"]["size"], run["maze"]["kind"], run["maze"]["seed"], run["strategy"])
+        for stage in ("mapping", "bfs", "motion_plan", "planner", "solution"):
+            result = run.get(stage)
+            if result is None:
+                continue
+            if "error" in result:
+                failures.append("{} {}: {}".format(name, stage, result["error"]))
+            if result["collisions"] > 0:
+                failures.append("{} {}: {} collisions".format(name, stage, result["collisions"]))
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32], help="widths of the square mazes")
+    parser.add_argument("--kinds", nargs="+", choices=tuple(MAZE_KINDS), default=list(MAZE_KINDS), help="kinds of mazes")
+    parser.add_argument("--seeds", type=int, default=3, help="how many mazes of every size and kind")
+    parser.add_argument("--strategies", nargs="+", choices=MAPPING_STRATEGIES, default=list(MAPPING_STRATEGIES), help="mapping strategies")
+    parser.add_argument("--speed", type=int, default=30, help="exploration speed (1 to 100)")
+    parser.add_argument("--no-memory", action="store_true", help="do not measure peak memory, runs several times faster")
+    parser.add_argument("--output", help="file to write the JSON results to, standard output if not given")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(10000) # Depth first mapping recurses once per square
+
+    runs = []
+    for size in args.sizes:
+        for kind in args.kinds:
+            for seed in range(args.seeds):
+                for strategy in args.strategies:
+                    runs.append(run_benchmark(size, kind, seed, strategy, args.speed, not args.no_memory))
+                    print("{} {} seed {} {}: done".format(size, kind, seed, strategy), file=sys.stderr)
+
+    report = {"exploration_speed": args.speed, "loop_fractions": MAZE_KINDS, "runs": runs}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    # A run that collided or got lost fails the benchmark, its numbers are in the report all the same
+    failures = get_failures(runs)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Simulated machine module, a drop-in replacement of MicroPython's machine module backed by a SimulatedWorld."""
+world = None # SimulatedWorld the hardware lives in, set by sim.install
+
+pins = {} # Latest Pin object created for every pin id
+pwms = {} # PWM object of every pin id
+
+
+class Pin(object):
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id: int, mode: int=-1, pull: int=-1, value: int=None) -> None:
+        """
+        Initialize Pin class.
+
+        :param id: GPIO number of the pin
+        :param mode: Pin.IN or Pin.OUT
+        :param pull: ignored
+        :param value: initial value of an output pin
+
+        :return: None
+        """
+        self.id = id
+        self.mode = mode
+        self._value = 0
+        self.irq_handler = None
+        self.irq_trigger = 0
+        pins[id] = self
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode: int=-1, pull: int=-1, value: int=None) -> None:
+        """
+        Reinitialize the pin with a new mode.
+
+        :param mode: Pin.IN or Pin.OUT
+        :param pull: ignored
+        :param value: initial value of an output pin
+
+        :return: None
+        """
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, value: int=None) -> int:
+        """
+        Get or set the value of the pin.
+
+        :param value: value to set, None to read the pin
+
+        :return: value of the pin when reading, None when setting
+        """
+        if value is None:
+            return self._value
+        previous = self._value
+        self._value = 1 if value else 0
+        if world is not None and previous != self._value:
+            world.on_pin_change(self)
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+    def __call__(self, value: int=None) -> int:
+        return self.value(value)
+
+    def irq(self, handler=None, trigger: int=IRQ_FALLING | IRQ_RISING) -> None:
+        """
+        Call handler with the pin every time the simulated world changes the pin's value.
+
+        :param handler: function to call, None to disable the interrupt
+        :param trigger: Pin.IRQ_RISING and/or Pin.IRQ_FALLING
+
+        :return: None
+        """
+        self.irq_handler = handler
+        self.irq_trigger = trigger
+
+    def drive(self, value: int) -> None:
+        """
+        Change the value of an input pin from the simulated world, calling its interrupt handler.
+
+        :param value: new value of the pin
+
+        :return: None
+        """
+        value = 1 if value else 0
+        if value == self._value:
+            return
+        self._value = value
+        edge = Pin.IRQ_RISING if value else Pin.IRQ_FALLING
+        if self.irq_handler is not None and self.irq_trigger & edge:
+            self.irq_handler(self)
+
+
+class PWM(object):
+    def __init__(self, pin: Pin) -> None:
+        """
+        Initialize PWM class.
+
+        :param pin: pin to output the PWM on
+
+        :return: None
+        """
+        self.pin = pin
+        self._freq = 0
+        self._duty = 0
+        pwms[pin.id] = self
+
+    def freq(self, value: int=None) -> int:
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value: int=None) -> int:
+        if value is None:
+            return self._duty
+        self._duty = int(value)
+
+    def deinit(self) -> None:
+        self._duty = 0
+
+
+class SoftI2C(object):
+    def __init__(self, scl: Pin=None, sda: Pin=None, freq: int=400000, timeout: int=50000) -> None:
+        """
+        Initialize SoftI2C class, the simulated world answers for the devices on the bus.
+
+        :param scl: pin for serial clock
+        :param sda: pin for serial data
+        :param freq: frequency of the bus in Hz
+
+        :return: None
+        """
+        self.scl = scl
+        self.sda = sda
+        self.freq = freq
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def scan(self) -> list:
+        return list(world.i2c_devices())
+
+    def writeto_mem(self, addr: int, memaddr: int, buf) -> None:
+        world.i2c_write(addr, memaddr, bytes(buf))
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf) -> None:
+        data = world.i2c_read(addr, memaddr, len(buf))
+        for i in range(len(buf)):
+            buf[i] = data[i]
+
+    def readfrom_mem(self, addr: int, memaddr: int, nbytes: int) -> bytes:
+        return world.i2c_read(addr, memaddr, nbytes)
+
+
+class I2C(SoftI2C):
+    def __init__(self, id: int=0, scl: Pin=None, sda: Pin=None, freq: int=400000, timeout: int=50000) -> None:
+        super().__init__(scl, sda, freq, timeout)
+        self.id = id
+
+
+class Timer(object):
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id: int=-1, mode: int=PERIODIC, period: int=-1, freq: int=-1, callback=None) -> None:
+        """
+        Initialize Timer class, the callback is run from the simulated world's clock.
+
+        :param mode: Timer.ONE_SHOT or Timer.PERIODIC
+        :param period: period in milliseconds
+        :param freq: frequency in Hz, used if period is not given
+        :param callback: function to call with the timer
+
+        :return: None
+        """
+        self.active = False
+        self.generation = 0 # Increased on every init, so callbacks scheduled before are dropped
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, mode: int=PERIODIC, period: int=-1, freq: int=-1, callback=None) -> None:
+        self.deinit()
+        self.mode = mode
+        self.period_us = period * 1000 if period > 0 else 1000000 // freq
+        self.callback = callback
+        self.active = True
+        self.generation += 1
+        self._schedule()
+
+    def _schedule(self) -> None:
+        generation = self.generation
+        world.schedule(world.now_us + self.period_us, lambda: self._fire(generation))
+
+    def _fire(self, generation: int) -> None:
+        if not self.active or generation != self.generation:
+            return
+        if self.mode == Timer.PERIODIC:
+            self._schedule()
+        else:
+            self.active = False
+        self.callback(self)
+
+    def deinit(self) -> None:
+        self.active = False
+
+
+def freq(value: int=None) -> int:
+    return 125000000
+
+
+def reset() -> None:
+    raise SystemExit("machine.reset() called")
@@ -0,0 +1,132 @@
+"""Mazes for the simulator."""
+import random
+
+from mazesolver.maze import Maze, NORTH, EAST, SOUTH, WEST
+
+
+def get_closed_maze(width: int, height: int, side_length: float) -> Maze:
+    """
+    Get a maze where every wall is known and present.
+
+    :param width: how many squares the maze has horizontally
+    :param height: how many squares the maze has vertically
+    :param side_length: length of a square in centimeters
+
+    :return: maze with every wall set
+    """
+    maze = Maze(width, height, side_length)
+    for y in range(height):
+        for x in range(width):
+            for direction in (NORTH, EAST, SOUTH, WEST):
+                maze.set_wall(x, y, direction)
+    return maze
+
+
+def maze_from_text(text: str, side_length: float) -> Maze:
+    """
+    Read a maze drawn with text, for example:
+
+        +---+---+
+        |       |
+        +   +---+
+        |       |
+        +---+---+
+
+    :param text: drawing of the maze, a wall is "---" or "|" and an opening is whitespace
+    :param side_length: length of a square in centimeters
+
+    :return: maze with every wall known
+    """
+    lines = [line for line in text.strip("\n").splitlines() if line.strip()]
+    width = (len(lines[0].rstrip()) - 1) // 4
+    height = (len(lines) - 1) // 2
+    maze = Maze(width, height, side_length)
+    for y in range(height):
+        top = lines[2 * y].ljust(4 * width + 1)
+        middle = lines[2 * y + 1].ljust(4 * width + 1)
+        bottom = lines[2 * y + 2].ljust(4 * width + 1)
+        for x in range(width):
+            maze.set_wall(x, y, NORTH, top[4 * x + 2] == '-')
+            maze.set_wall(x, y, WEST, middle[4 * x] == '|')
+            maze.set_wall(x, y, SOUTH, bottom[4 * x + 2] == '-')
+            maze.set_wall(x, y, EAST, middle[4 * x + 4] == '|')
+    return maze
+
+
+def maze_to_text(maze: Maze) -> str:
+    """
+    Draw a maze with text in the format maze_from_text reads.
+
+    :param maze: maze to draw
+
+    :return: drawing of the maze
+    """
+    lines = []
+    for y in range(maze.height):
+        lines.append("+" + "".join("---+" if maze.has_wall(x, y, NORTH) else "   +" for x in range(maze.width)))
+        lines.append("|" if maze.has_wall(0, y, WEST) else " ")
+        for x in range(maze.width):
+            lines[-1] += "   " + ("|" if maze.has_wall(x, y, EAST) else " ")
+    lines.append("+" + "".join("---+" if maze.has_wall(x, maze.height - 1, SOUTH) else "   +" for x in range(maze.width)))
+    return "\n".join(lines)
+
+
+def generate_maze(width: int, height: int, side_length: float, seed: int=0, loop_fraction: float=0) -> Maze:
+    """
+    Generate a maze with the middle squares opened up into a single goal area like in a competition maze.
+
+    Without loops the maze is perfect, there is exactly one path between any two squares.
+    Removing some of the remaining inner walls makes it imperfect, with loops and several paths to the center.
+
+    :param width: how many squares the maze has horizontally
+    :param height: how many squares the maze has vertically
+    :param side_length: length of a square in centimeters
+    :param seed: seed of the random generator
+    :param loop_fraction: fraction of the inner walls left by the perfect maze to remove (0 to 1)
+
+    :return: generated maze with every wall known
+    """
+    rng = random.Random(seed)
+    maze = get_closed_maze(width, height, side_length)
+
+    # Randomized depth first search
+    visited = bytearray(width * height)
+    stack = [(0, height - 1)]
+    visited[(height - 1) * width] = 1
+    while stack:
+        x, y = stack[-1]
+        directions = []
+        for direction in (NORTH, EAST, SOUTH, WEST):
+            nx, ny = maze.get_neighbour(x, y, direction)
+            if 0 <= nx < width and 0 <= ny < height and not visited[ny * width + nx]:
+                directions.append(direction)
+        if not directions:
+            stack.pop()
+            continue
+        direction = rng.choice(directions)
+        nx, ny = maze.get_neighbour(x, y, direction)
+        maze.set_wall(x, y, direction, False)
+        visited[ny * width + nx] = 1
+        stack.append((nx, ny))
+
+    if loop_fraction > 0:
+        inner_walls = []
+        for y in range(height):
+            for x in range(width):
+                if x + 1 < width and maze.has_wall(x, y, EAST):
+                    inner_walls.append((x, y, EAST))
+                if y + 1 < height and maze.has_wall(x, y, SOUTH):
+                    inner_walls.append((x, y, SOUTH))
+        for x, y, direction in rng.sample(inner_walls, int(len(inner_walls) * loop_fraction)):
+            maze.set_wall(x, y, direction, False)
+
+    # Open up the middle squares, keeping the paths into them
+    middle_x = range((width - 1) // 2, width // 2 + 1)
+    middle_y = range((height - 1) // 2, height // 2 + 1)
+    for y in middle_y:
+        for x in middle_x:
+            if x + 1 in middle_x:
+                maze.set_wall(x, y, EAST, False)
+            if y + 1 in middle_y:
+                maze.set_wall(x, y, SOUTH, False)
+    return maze
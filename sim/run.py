@@ -0,0 +1,104 @@
+"""Map and solve a generated maze in the simulator, run from the repository root with python -m sim.run"""
+import sys
+import time
+import argparse
+
+import sim
+from sim.world import SimulatedWorld
+from sim.mazes import generate_maze, maze_from_text, maze_to_text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--maze", help="file with a maze drawn as text, a maze is generated if not given")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated maze and the sensor noise")
+    parser.add_argument("--strategy", choices=("flood", "dfs", "frontier"), default="flood", help="how to map the maze")
+    parser.add_argument("--speed", type=int, default=30, help="exploration speed (1 to 100)")
+    parser.add_argument("--gyro", action="store_true", help="give the robot a gyro sensor, so it turns in closed loop")
+    parser.add_argument("--show", action="store_true", help="print the real and the mapped maze")
+    parser.add_argument("--async", dest="run_async", action="store_true",
+                        help="run the asyncio runtime main.py runs, with its sensing tasks, instead of the blocking code (flood strategy only)")
+    parser.add_argument("--profile", action="store_true", help="time the hot paths in simulated time, the path computations on the host processor, and print a report after mapping and solving")
+    args = parser.parse_args()
+
+    sim.install()
+    from mazesolver.maze import Maze
+    from constants import LABYRINTH_SQUARES_HORIZONTAL, LABYRINTH_SQUARES_VERTICAL, LABYRINTH_SQUARE_LENGTH_CM
+    if args.maze:
+        with open(args.maze) as file:
+            real_maze = maze_from_text(file.read(), LABYRINTH_SQUARE_LENGTH_CM)
+    else:
+        real_maze = generate_maze(LABYRINTH_SQUARES_HORIZONTAL, LABYRINTH_SQUARES_VERTICAL, LABYRINTH_SQUARE_LENGTH_CM, args.seed)
+    world = SimulatedWorld(real_maze, 0, real_maze.height - 1, 0, args.seed)
+    sim.install(world)
+
+    from lib.hardware import Hardware
+    from mazesolver.mazemapper import MazeMapper
+    from robot.motion import MotionController
+    from constants import MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, \
+                          MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED
+
+    hardware = Hardware()
+    robot = hardware.get_robot()
+    profiler = None
+    if args.profile:
+        from lib.profiler import Profiler, profile_hot_paths
+        profiler = Profiler()
+        profile_hot_paths(profiler)
+    if args.gyro:
+        robot.gyro = hardware.get_gyro(None)
+        robot.gyro.reset_angle(0)
+    maze = Maze(real_maze.width, real_maze.height, LABYRINTH_SQUARE_LENGTH_CM)
+    maze_mapper = MazeMapper(robot, maze, args.speed)
+    motion = MotionController(robot, MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED)
+
+    start_time = time.perf_counter()
+    if args.run_async:
+        from lib.runtime import Runtime
+        mapping_button, solution_button = hardware.get_buttons()
+        runtime = Runtime(robot, maze_mapper, motion, mapping_button, solution_button)
+
+        async def map_maze() -> float:
+            runtime.start_sensing()
+            return await runtime.map_maze()
+
+        estimated_time = sim.run_async(map_maze())
+    elif args.strategy == "flood":
+        if not maze_mapper.map_maze_flood_fill(maze_mapper.start_x, maze_mapper.start_y, 0):
+            print("No known path back to the start from square {}".format(maze_mapper.position[:2]))
+    elif args.strategy == "dfs":
+        maze_mapper.map_maze_dfs(maze_mapper.start_x, maze_mapper.start_y, 0)
+    elif not maze_mapper.map_maze_frontier(maze_mapper.start_x, maze_mapper.start_y, 0):
+        print("No known path back to the start")
+    mapping_time_us = world.now_us
+    print("Mapping: {:.1f} s simulated, {:.1f} cm driven, {} stops, {} collisions".format(
+        mapping_time_us / 1000000, world.distance_cm, world.stops, world.collisions))
+    if profiler is not None:
+        profiler.report()
+        profiler.reset()
+
+    distance, stops, collisions = world.distance_cm, world.stops, world.collisions
+    if args.run_async:
+        async def run_solution() -> None:
+            runtime.start_sensing()
+            await runtime.run_solution()
+
+        sim.run_async(run_solution())
+    else:
+        plan, estimated_time = maze_mapper.get_maze_solver().find_and_construct_speed_run_plan()
+        motion.execute(plan)
+    print("Solution: {:.1f} s simulated ({:.1f} s estimated), {:.1f} cm driven, {} stops, {} collisions".format(
+        (world.now_us - mapping_time_us) / 1000000, estimated_time, world.distance_cm - distance,
+        world.stops - stops, world.collisions - collisions))
+    if profiler is not None:
+        profiler.report()
+    print("Simulated {:.1f} s in {:.1f} s".format(world.now_us / 1000000, time.perf_counter() - start_time))
+
+    if args.show:
+        print(maze_to_text(real_maze))
+        print(maze_to_text(maze))
+    robot.ranger.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""Kinematic simulation of the robot driving in a maze."""
+import math
+import time
+import heapq
+import random
+
+from sim import machine
+from mazesolver.maze import Maze, NORTH, EAST, SOUTH, WEST
+
+HMC5883L_ADDRESS = 0x1e
+HMC5883L_GAINS = (0.73, 0.92, 1.22, 1.52, 2.27, 2.56, 3.03, 4.35) # Gain of every value of configuration register B >> 5
+ECHO_DELAY_US = 450 # Time between the trigger pulse and the start of the echo pulse of a HC-SR04
+NO_ECHO_TIME_US = 38000 # Length of the echo pulse of a HC-SR04 when nothing reflected the ping
+STOPPED_VELOCITY_CMPS = 1 # Robot counts as standing still when both wheels are slower than this
+CONTACT_GAP_US = 100000 # Touching a wall again after this long without touching it counts as a new collision
+MAGNETOMETER_DECLINATION_RAD = math.radians(9 + 73 / 60) # Declination the magnetometer driver adds by default
+
+
+class SimulatedWorld(object):
+    def __init__(self, maze: Maze, start_x: int, start_y: int, start_angle: int=0, seed: int=0,
+                 step_us: int=1000, tick_cost_us: int=5, track_width_cm: float=8.29, right_motor_offset: float=1,
+                 motor_time_constant_s: float=0.03, motor_deadband: float=0, ultrasonic_noise_cm: float=0.3, max_range_cm: float=400,
+                 magnetic_field: float=400, magnetic_offset: float=0, magnetometer_distortion: tuple=None,
+                 corner_radius_cm: float=2.5) -> None:
+        """
+        Initialize SimulatedWorld class.
+
+        The robot is a differential drive whose wheel velocities follow the motor duty cycles,
+        at 50% duty above the deadband a wheel moves ROBOT_SPEED_CMPS centimeters per second.
+        Ultrasonic echoes are timed from ray casts against the walls of the maze
+        and the magnetometer answers with the field rotated by the robot's heading.
+
+        :param maze: maze the robot drives in, its walls are the real walls
+        :param start_x: x coordinate of the square the robot starts in the center of
+        :param start_y: y coordinate of the square the robot starts in the center of
+        :param start_angle: angle the robot starts at (0 is north, clockwise)
+        :param seed: seed of the sensor noise
+        :param step_us: microseconds between two steps of the motion integration
+        :param tick_cost_us: microseconds reading ticks_ms or ticks_us takes, so busy loops advance time
+        :param track_width_cm: distance between the wheels, by default the timed 90 degree turns turn exactly 90 degrees
+        :param right_motor_offset: percentage of duty the right motor loses compared to the left one
+        :param motor_time_constant_s: time constant of the wheels reaching the velocity of their duty cycle
+        :param motor_deadband: percentage of duty the motors do not move at
+        :param ultrasonic_noise_cm: standard deviation of the ultrasonic distance noise
+        :param max_range_cm: walls further than this give no echo
+        :param magnetic_field: strength of the horizontal magnetic field after calibration
+        :param magnetic_offset: heading of the magnetometer when the robot faces north in degrees
+        :param magnetometer_distortion: hard and soft iron distortion (x offset, y offset, xx, xy, yy) turning the field
+                                        into readings, None for the distortion the driver's default calibration removes
+        :param corner_radius_cm: radius of the robot's rounded corners, with square corners it could not turn in place in a square
+
+        :return: None
+        """
+        self.maze = maze
+        self.random = random.Random(seed)
+        self.step_us = step_us
+        self.tick_cost_us = tick_cost_us
+        self.track_width_cm = track_width_cm
+        self.right_motor_offset = right_motor_offset
+        self.motor_time_constant_s = motor_time_constant_s
+        self.motor_deadband = motor_deadband
+        self.corner_radius_cm = corner_radius_cm
+        self.ultrasonic_noise_cm = ultrasonic_noise_cm
+        self.max_range_cm = max_range_cm
+        self.magnetic_field = magnetic_field
+        self.magnetic_offset = magnetic_offset
+        self.magnetometer_distortion = magnetometer_distortion
+
+        # Pose, x grows to the east and y to the south in centimeters
+        side = maze.side_length
+        self.x = (start_x + 0.5) * side
+        self.y = (start_y + 0.5) * side
+        self.angle = float(start_angle)
+        self.left_velocity = 0.0
+        self.right_velocity = 0.0
+
+        self.now_us = 0
+        self.events = [] # Heap of (time_us, sequence, callback)
+        self.event_sequence = 0
+        self.dispatching = False
+
+        # Statistics
+        self.distance_cm = 0.0 # Distance driven by the center of the robot
+        self.rotation_deg = 0.0 # Total rotation in any direction
+        self.stops = 0 # How many times the robot came to a standstill
+        self.collisions = 0 # How many times the robot drove into a wall
+        self.cpu_time_s = 0.0 # Processor time spent simulating, not running the robot's code
+        self.moving = False
+        self.last_contact_us = None # Simulated time the robot last touched a wall
+
+        # Hardware, bound by sim.install once the constants exist
+        self.motor_pins = None
+        self.sensors = {} # Trigger pin id -> (echo pin id, mounting angle, forward offset, side offset)
+        self.registers = {0x00: 0x10, 0x01: 0x20, 0x02: 0x01}
+        self.magnetometer_gain = 1.22
+
+    def bind(self, constants, magnetometer) -> None:
+        """
+        Connect the simulated world to the hardware described in the constants.
+
+        :param constants: constants module of the robot
+        :param magnetometer: magnetometer driver class, its default calibration is undone if the world has no distortion
+
+        :return: None
+        """
+        self.motor_pins = (constants.LEFT_MOTOR_ENABLE_PIN, constants.LEFT_MOTOR_PHASE_PIN,
+                           constants.RIGHT_MOTOR_ENABLE_PIN, constants.RIGHT_MOTOR_PHASE_PIN)
+        self.max_duty = constants.MAX_U16_INT
+        self.speed_per_percent = constants.ROBOT_SPEED_CMPS / 50
+        self.sound_speed_cmps = constants.SOUND_SPEED_CMPS
+        self.wall_thickness_cm = constants.LABYRINTH_WALL_THICKNESS_CM
+        width = constants.ROBOT_WIDTH_CM
+        length = constants.ROBOT_LENGTH_CM
+        self.robot_length_cm = length
+        self.robot_width_cm = width
+        self.sensors = {
+            constants.LEFT_ULTRASONIC_TRIGGER_PIN: (constants.LEFT_ULTRASONIC_ECHO_PIN, -90, 0, -width / 2),
+            constants.FRONT_ULTRASONIC_TRIGGER_PIN: (constants.FRONT_ULTRASONIC_ECHO_PIN, 0, length / 2, 0),
+            constants.RIGHT_ULTRASONIC_TRIGGER_PIN: (constants.RIGHT_ULTRASONIC_ECHO_PIN, 90, 0, width / 2),
+        }
+        if self.magnetometer_distortion is None:
+            # Inverse of the soft iron matrix, the offsets stay the same
+            x_offset, y_offset, xx, xy, yy = magnetometer.default_calibration
+            det = xx * yy - xy * xy
+            self.magnetometer_distortion = (x_offset, y_offset, yy / det, -xy / det, xx / det)
+
+    # Clock
+
+    def schedule(self, time_us: int, callback) -> None:
+        """
+        Call a function at a point in simulated time.
+
+        :param time_us: simulated time in microseconds
+        :param callback: function without arguments
+
+        :return: None
+        """
+        self.event_sequence += 1
+        heapq.heappush(self.events, (time_us, self.event_sequence, callback))
+
+    def advance(self, us: int) -> None:
+        """
+        Let simulated time pass, moving the robot and running the events that fall in the time.
+
+        :param us: microseconds to pass
+
+        :return: None
+        """
+        if self.dispatching: # Interrupts and timers run to completion, time passing in them does not preempt them
+            self.now_us += us
+            return
+
+        cpu_start = time.process_time()
+        target = self.now_us + us
+        events = self.events
+        while events and events[0][0] <= target:
+            event_time, _, callback = heapq.heappop(events)
+            if event_time > self.now_us:
+                self._move(event_time - self.now_us)
+                self.now_us = event_time
+            self.cpu_time_s += time.process_time() - cpu_start
+            self.dispatching = True
+            try:
+                callback() # Interrupt handlers are robot code
+            finally:
+                self.dispatching = False
+            cpu_start = time.process_time()
+
+        if target > self.now_us:
+            self._move(target - self.now_us)
+            self.now_us = target
+        self.cpu_time_s += time.process_time() - cpu_start
+
+    def ticks_us(self) -> int:
+        self.advance(self.tick_cost_us)
+        return self.now_us
+
+    def ticks_ms(self) -> int:
+        self.advance(self.tick_cost_us)
+        return self.now_us // 1000
+
+    # Motion
+
+    def _wheel_velocity(self, enable_pin: int, phase_pin: int, offset: float) -> float:
+        pwm = machine.pwms.get(enable_pin)
+        if pwm is None:
+            return 0.0
+        duty = min(pwm.duty_u16(), self.max_duty) # The duty cycle of a PWM is at most 100%
+        velocity = max(0.0, duty * 100 / self.max_duty - offset) * self.speed_per_percent
+        return -velocity if machine.pins[phase_pin].value() else velocity
+
+    def _move(self, us: int) -> None:
+        if self.motor_pins is None:
+            return
+        left_enable, left_phase, right_enable, right_phase = self.motor_pins
+        left_target = self._wheel_velocity(left_enable, left_phase, self.motor_deadband)
+        right_target = self._wheel_velocity(right_enable, right_phase, self.motor_deadband + self.right_motor_offset)
+
+        while us > 0:
+            if left_target == self.left_velocity == 0 and right_target == self.right_velocity == 0:
+                return
+
+            dt_us = min(us, self.step_us)
+            us -= dt_us
+            dt = dt_us / 1000000
+
+            if self.motor_time_constant_s > 0:
+                blend = min(1.0, dt / self.motor_time_constant_s)
+            else:
+                blend = 1.0
+            self.left_velocity += (left_target - self.left_velocity) * blend
+            self.right_velocity += (right_target - self.right_velocity) * blend
+            if abs(self.left_velocity - left_target) < 0.01:
+                self.left_velocity = left_target
+            if abs(self.right_velocity - right_target) < 0.01:
+                self.right_velocity = right_target
+
+            moving = abs(self.left_velocity) > STOPPED_VELOCITY_CMPS or abs(self.right_velocity) > STOPPED_VELOCITY_CMPS
+            if self.moving and not moving:
+                self.stops += 1
+            self.moving = moving
+
+            velocity = (self.left_velocity + self.right_velocity) / 2
+            rotation = math.degrees((self.left_velocity - self.right_velocity) / self.track_width_cm * dt)
+            angle = (self.angle + rotation) % 360
+            radians = math.radians(angle)
+            x = self.x + velocity * dt * math.sin(radians)
+            y = self.y - velocity * dt * math.cos(radians)
+            # The robot moves as far as the walls and posts let it, turning and sliding along them
+            if not self._is_free(x, y, angle):
+                x, y, angle = self._slide(x, y, angle)
+                # Touches within a short time of each other are the same collision
+                if self.last_contact_us is None or self.now_us - self.last_contact_us > CONTACT_GAP_US:
+                    self.collisions += 1
+                self.last_contact_us = self.now_us
+
+            if angle != self.angle:
+                self.rotation_deg += abs(rotation)
+            self.distance_cm += math.hypot(x - self.x, y - self.y)
+            self.x, self.y, self.angle = x, y, angle
+
+    def _slide(self, x: float, y: float, angle: float) -> tuple:
+        # A wall the robot runs into pushes it back as far as its corners moved into it, the wheels slip along the wall,
+        # else it only turns or only moves as far as the wall lets it
+        reach = math.hypot(self.robot_length_cm, self.robot_width_cm) / 2
+        push = math.hypot(x - self.x, y - self.y) + reach * math.radians(abs((angle - self.angle + 180) % 360 - 180))
+        for push_x, push_y in ((push, 0), (-push, 0), (0, push), (0, -push)):
+            if self._is_free(x + push_x, y + push_y, angle):
+                return x + push_x, y + push_y, angle
+        if self._is_free(self.x, self.y, angle):
+            return self.x, self.y, angle
+        if self._is_free(x, y, self.angle):
+            return x, y, self.angle
+        return self.x, self.y, self.angle
+
+    def _is_free(self, x: float, y: float, angle: float) -> bool:
+        """
+        Check whether the robot fits at a pose without overlapping a wall or a post.
+
+        Walls are the real walls of the maze with the wall thickness and there is a post at every corner of the squares.
+        The robot is a rectangle with rounded corners, none of its four corners may overlap a wall or a post
+        and no corner of a post may be inside it.
+
+        :param x: x coordinate of the center of the robot in centimeters
+        :param y: y coordinate of the center of the robot in centimeters
+        :param angle: heading of the robot (0 is north, clockwise)
+
+        :return: True if the robot touches nothing at the pose
+        """
+        radians = math.radians(angle)
+        sin, cos = math.sin(radians), math.cos(radians)
+        radius = self.corner_radius_cm
+        half_length, half_width = self.robot_length_cm / 2, self.robot_width_cm / 2
+        inner_length, inner_width = half_length - radius, half_width - radius # Centers of the rounded corners
+        for forward, sideways in ((inner_length, inner_width), (inner_length, -inner_width),
+                                  (-inner_length, inner_width), (-inner_length, -inner_width)):
+            if self._near_wall(x + forward * sin + sideways * cos, y - forward * cos + sideways * sin, radius):
+                return False
+
+        side = self.maze.side_length
+        half_thickness = self.wall_thickness_cm / 2
+        reach = math.hypot(half_length, half_width) + half_thickness
+        for post_x in range(max(0, math.ceil((x - reach) / side)), min(self.maze.width, math.floor((x + reach) / side)) + 1):
+            for post_y in range(max(0, math.ceil((y - reach) / side)), min(self.maze.height, math.floor((y + reach) / side)) + 1):
+                for corner_x in (post_x * side - half_thickness, post_x * side + half_thickness):
+                    for corner_y in (post_y * side - half_thickness, post_y * side + half_thickness):
+                        # Corner of the post in the robot's frame
+                        forward = abs((corner_x - x) * sin - (corner_y - y) * cos)
+                        sideways = abs((corner_x - x) * cos + (corner_y - y) * sin)
+                        if forward < half_length and sideways < half_width and \
+                                (forward < inner_length or sideways < inner_width or
+                                 math.hypot(forward - inner_length, sideways - inner_width) < radius):
+                            return False
+        return True
+
+    def _near_wall(self, x: float, y: float, distance: float) -> bool:
+        maze = self.maze
+        side = maze.side_length
+        reach = self.wall_thickness_cm / 2 + distance
+        if not (reach < x < maze.width * side - reach and reach < y < maze.height * side - reach):
+            return True # In or beyond the outer wall
+
+        line_x, line_y = round(x / side), round(y / side) # Nearest grid lines
+        near_x, near_y = abs(x - line_x * side) < reach, abs(y - line_y * side) < reach
+        if near_x and near_y: # Post
+            return True
+        if near_x: # Next to the line between two squares beside each other
+            return maze.has_wall(line_x, int(y // side), WEST)
+        if near_y: # Next to the line between two squares above each other
+            return maze.has_wall(int(x // side), line_y, NORTH)
+        return False
+
+    # Sensors
+
+    def cast_ray(self, x: float, y: float, angle: float) -> float:
+        """
+        Get the distance from a point to the first wall in a direction.
+
+        :param x: x coordinate in centimeters
+        :param y: y coordinate in centimeters
+        :param angle: direction of the ray (0 is north, clockwise)
+
+        :return: distance to the surface of the wall in centimeters
+        """
+        maze = self.maze
+        side = maze.side_length
+        radians = math.radians(angle)
+        dx, dy = math.sin(radians), -math.cos(radians)
+        square_x = min(max(int(x // side), 0), maze.width - 1)
+        square_y = min(max(int(y // side), 0), maze.height - 1)
+
+        distance = 0.0
+        while True:
+            if dx > 1e-9:
+                tx = ((square_x + 1) * side - x) / dx
+            elif dx < -1e-9:
+                tx = (square_x * side - x) / dx
+            else:
+                tx = math.inf
+            if dy > 1e-9:
+                ty = ((square_y + 1) * side - y) / dy
+            elif dy < -1e-9:
+                ty = (square_y * side - y) / dy
+            else:
+                ty = math.inf
+
+            if tx < ty:
+                t, direction, normal = tx, EAST if dx > 0 else WEST, abs(dx)
+            else:
+                t, direction, normal = ty, SOUTH if dy > 0 else NORTH, abs(dy)
+            t = max(t, 0.0)
+            distance += t
+            if maze.has_wall(square_x, square_y, direction):
+                return max(0.0, distance - self.wall_thickness_cm / 2 / normal)
+
+            x += dx * t
+            y += dy * t
+            square_x, square_y = maze.get_neighbour(square_x, square_y, direction)
+            if not (0 <= square_x < maze.width and 0 <= square_y < maze.height):
+                return distance
+
+    def measure(self, forward: float, sideways: float, mounting_angle: float) -> float:
+        """
+        Get the distance a sensor mounted on the robot sees.
+
+        :param forward: how far ahead of the robot's center the sensor is in centimeters
+        :param sideways: how far right of the robot's center the sensor is in centimeters
+        :param mounting_angle: angle of the sensor relative to the robot's heading
+
+        :return: distance to the wall in centimeters
+        """
+        radians = math.radians(self.angle)
+        sin, cos = math.sin(radians), math.cos(radians)
+        x = self.x + forward * sin + sideways * cos
+        y = self.y - forward * cos + sideways * sin
+        return self.cast_ray(x, y, self.angle + mounting_angle)
+
+    def on_pin_change(self, pin) -> None:
+        """
+        React to the robot's code changing an output pin.
+
+        :param pin: pin that changed
+
+        :return: None
+        """
+        sensor = self.sensors.get(pin.id)
+        if sensor is None or pin.value() == 1:
+            return
+        # Falling edge of a trigger pulse, the sensor answers with an echo pulse
+        echo_pin_id, mounting_angle, forward, sideways = sensor
+        echo_pin = machine.pins[echo_pin_id]
+        if echo_pin.value() == 1: # Still answering the previous ping
+            return
+
+        distance = self.measure(forward, sideways, mounting_angle)
+        distance += self.random.gauss(0, self.ultrasonic_noise_cm)
+        if distance > self.max_range_cm:
+            echo_time = NO_ECHO_TIME_US
+        else:
+            echo_time = int(max(0.0, distance) * 2 / self.sound_speed_cmps * 1000000)
+
+        rise_time = self.now_us + ECHO_DELAY_US
+        self.schedule(rise_time, lambda: echo_pin.drive(1))
+        self.schedule(rise_time + echo_time, lambda: echo_pin.drive(0))
+
+    # I2C
+
+    def i2c_devices(self) -> tuple:
+        return (HMC5883L_ADDRESS,)
+
+    def i2c_write(self, addr: int, memaddr: int, data: bytes) -> None:
+        if addr != HMC5883L_ADDRESS:
+            raise OSError(19) # ENODEV
+        for i in range(len(data)):
+            self.registers[memaddr + i] = data[i]
+        self.magnetometer_gain = HMC5883L_GAINS[self.registers[0x01] >> 5]
+
+    def i2c_read(self, addr: int, memaddr: int, nbytes: int) -> bytes:
+        if addr != HMC5883L_ADDRESS:
+            raise OSError(19) # ENODEV
+        x_offset, y_offset, xx, xy, yy = self.magnetometer_distortion
+        # Field that gives the robot's heading once the driver removes the distortion and adds the declination
+        field_angle = math.radians(self.angle + self.magnetic_offset) - MAGNETOMETER_DECLINATION_RAD
+        field_x = self.magnetic_field * math.cos(field_angle)
+        field_y = self.magnetic_field * math.sin(field_angle)
+        x = (xx * field_x + xy * field_y + x_offset) / self.magnetometer_gain
+        y = (xy * field_x + yy * field_y + y_offset) / self.magnetometer_gain
+        z = -self.magnetic_field / self.magnetometer_gain
+
+        registers = self.registers
+        for offset, value in ((0x03, x), (0x05, z), (0x07, y)): # Data registers are X, Z, Y, big endian
+            value = min(max(int(round(value)), -2048), 2047) & 0xFFFF
+            registers[offset] = value >> 8
+            registers[offset + 1] = value & 0xFF
+        return bytes(registers.get(memaddr + i, 0) for i in range(nbytes))
@@ -0,0 +1,32 @@
+"""Host side tests of the robot's logic, run from the repository root with python -m pytest"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    """
+    Run the robot's code in a simulated world, the time functions are restored after the test.
+
+    The simulated machine module stays installed, like tests/test_motors.py installs it.
+
+    :return: function building a SimulatedWorld of a maze, in the format simulate(maze, seed) -> world
+    """
+    import sim
+    from sim.world import SimulatedWorld
+
+    for name in ("sleep", "sleep_ms", "sleep_us", "ticks_ms", "ticks_us", "ticks_diff", "ticks_add"):
+        monkeypatch.setattr(time, name, getattr(time, name, None), raising=False)
+    sim.install() # The robot's modules can be imported from here on
+
+    def simulate(maze, seed: int=0) -> SimulatedWorld:
+        world = SimulatedWorld(maze, 0, maze.height - 1, 0, seed)
+        sim.install(world)
+        return world
+
+    return simulate
@@ -0,0 +1,90 @@
+from robot.robot import Robot
+from robot.velocity import VelocityModel
+from robot.plan import PLAN_DRIVE, PLAN_TURN, PLAN_RESET_HEADING, INSTRUCTION_LENGTHS, get_drive_distance
+from mazesolver.maze import Maze, EAST, SOUTH
+from mazesolver.bfs import BFSEngine
+from mazesolver.mazesolver import MazeSolver
+
+
+def make_open_maze(width: int, height: int) -> Maze:
+    # Every inner wall known to be open
+    maze = Maze(width, height, 15)
+    for y in range(height):
+        for x in range(width):
+            if x < width - 1:
+                maze.set_wall(x, y, EAST, False)
+            if y < height - 1:
+                maze.set_wall(x, y, SOUTH, False)
+    return maze
+
+
+def assert_connected(maze: Maze, path) -> None:
+    for a, b in zip(path, path[1:]):
+        step = b - a
+        assert step in maze.neighbour_offsets
+        direction = maze.neighbour_offsets.index(step)
+        assert maze.is_open(a % maze.width, a // maze.width, direction)
+
+
+def test_shortest_path_to_the_center():
+    maze = make_open_maze(6, 6)
+    path = BFSEngine(36).search(maze, 0, 5, maze.goal_mask)
+    assert path[0] == 5 * 6
+    assert maze.goal_mask[path[-1]]
+    assert len(path) == 5 # Three squares up and one to the right of the start reach the goal
+    assert_connected(maze, path)
+
+
+def test_path_goes_around_walls():
+    maze = make_open_maze(5, 5)
+    # Wall across the row above the start, open only at its east end
+    for x in range(4):
+        maze.set_wall(x, 3, SOUTH)
+    path = BFSEngine(25).search(maze, 0, 4, maze.goal_mask)
+    assert list(path[:6]) == [20, 21, 22, 23, 24, 19] # Along the wall to its opening
+    assert len(path) == 9 and path[-1] == 12
+    assert_connected(maze, path)
+
+
+def test_unreachable_goal():
+    maze = make_open_maze(4, 4)
+    for x in range(4):
+        maze.set_wall(x, 2, SOUTH)
+    assert BFSEngine(16).search(maze, 0, 3, maze.goal_mask) is None
+
+
+def test_optimistic_search_drives_through_unknown_walls():
+    maze = Maze(4, 4, 15) # Only the outer walls are known
+    engine = BFSEngine(16)
+    assert engine.search(maze, 0, 3, maze.goal_mask) is None
+    path = engine.search(maze, 0, 3, maze.goal_mask, optimistic=True)
+    assert len(path) == 3
+    assert maze.goal_mask[path[-1]]
+
+
+def test_engine_is_reused_for_smaller_mazes():
+    engine = BFSEngine(64)
+    for size in (8, 4, 6):
+        maze = make_open_maze(size, size)
+        path = engine.search(maze, 0, 0, maze.goal_mask)
+        assert maze.goal_mask[path[-1]]
+        assert len(path) == 2 * ((size - 1) // 2) + 1
+
+
+def test_solver_drives_the_shortest_path():
+    robot = Robot.__new__(Robot) # Planning only reads the velocity model
+    robot.velocity_model = VelocityModel((50,), (44,), (44,))
+    maze = make_open_maze(6, 6)
+    plan = MazeSolver(robot, maze, turn_time=0.4).find_and_construct_optimal_path()
+    assert plan[0] == PLAN_RESET_HEADING
+    i, distance, turns = INSTRUCTION_LENGTHS[PLAN_RESET_HEADING], 0, 0
+    while i < len(plan):
+        if plan[i] == PLAN_DRIVE:
+            distance += get_drive_distance(plan, i)
+        else:
+            assert plan[i] == PLAN_TURN
+            turns += 1
+        i += INSTRUCTION_LENGTHS[plan[i]]
+    assert distance == 4 * 15 # The four squares of the shortest path, no stops in between
+    assert turns >= 1
+    assert MazeSolver(robot, Maze(6, 6, 15), turn_time=0.4).find_and_construct_optimal_path() == b""
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from robot.sensors.estimator import DistanceEstimator
+
+
+class Clock(object):
+    # Millisecond clock of MicroPython's time module, advanced by hand
+    def __init__(self) -> None:
+        self.now_ms = 0
+
+    def ticks_ms(self) -> int:
+        return self.now_ms
+
+
+class Sensor(object):
+    # Interrupt driven sensor, every reading comes with the time it was measured
+    def __init__(self) -> None:
+        self.reading = (0, None)
+
+    def get_reading(self) -> tuple:
+        return self.reading
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms, raising=False)
+    monkeypatch.setattr(time, "ticks_diff", lambda a, b: a - b, raising=False)
+    return clock
+
+
+def test_prediction_follows_the_velocity(clock):
+    estimator = DistanceEstimator(Sensor(), 4, 1)
+    assert estimator.correct(50)
+    clock.now_ms = 250
+    estimator.predict(20)
+    assert estimator.get_distance() == 45
+    assert estimator.variance == 2 # The variance grows by the process variance per second
+    assert estimator.correct(46)
+    assert 45 < estimator.get_distance() < 46
+    assert estimator.variance < 1
+
+
+def test_outliers_are_rejected_until_the_wall_really_moved(clock):
+    estimator = DistanceEstimator(Sensor(), 4, 1, gate=3, max_rejections=3)
+    assert estimator.correct(50)
+    assert not estimator.correct(0) # Out of range
+    assert not estimator.correct(80)
+    assert not estimator.correct(80)
+    assert estimator.get_distance() == 50
+    assert estimator.correct(50) # A reading inside the gate ends the rejections
+    assert not estimator.correct(80)
+    assert not estimator.correct(80)
+    assert estimator.correct(80) # Third outlier in a row starts over from it
+    assert estimator.get_distance() == 80
+    assert estimator.variance == 1
+
+
+def test_readings_are_used_once_and_old_estimates_forgotten(clock):
+    sensor = Sensor()
+    estimator = DistanceEstimator(sensor, 4, 1, max_age_ms=300)
+    assert estimator.update(0) == 0 # Nothing measured yet
+    sensor.reading = (50, 10)
+    assert estimator.update(0) == 50
+    clock.now_ms = 100
+    estimator.update(10)
+    assert estimator.get_distance() == 49 # The reading was used already, only the prediction moves
+    clock.now_ms = 500
+    sensor.reading = (90, 480) # Too far off for the gate, but the estimate is too old to keep
+    assert estimator.update(0) == 90
+    estimator.reset()
+    assert estimator.get_distance() == 0
@@ -0,0 +1,125 @@
+import math
+import struct
+import sys
+
+from sim import machine
+sys.modules.setdefault("machine", machine) # The gyro imports the Pico's machine module, the simulator's stands in for it
+sys.modules.setdefault("ustruct", struct)
+
+from lib.hmc5883l import atan2_tenths
+from lib.storage import save_floats
+from robot.sensors.gyro import GyroSensor, fit_ellipse, save_gyro_calibration, load_gyro_calibration
+from robot.sensors.gyro import GYRO_CALIBRATION_MAGIC, GYRO_CALIBRATION_VERSION
+
+
+class Magnetometer(object):
+    # HMC5883L whose heading is set by hand, every read is a new sample
+    def __init__(self) -> None:
+        self.heading = 0
+        self.sample_count = 0
+
+    def read(self) -> tuple:
+        self.sample_count += 1
+        return 0, 0, 0
+
+    def heading_tenths(self, x, y) -> int:
+        return self.heading % 3600
+
+
+def get_gyro(sensor: Magnetometer) -> GyroSensor:
+    gyro = GyroSensor.__new__(GyroSensor)
+    gyro.sensor = sensor
+    gyro.heading = 0
+    gyro.heading_sample = -1
+    gyro.rotation = 0
+    gyro.offset = 0
+    return gyro
+
+
+def test_atan2_tenths_matches_atan2():
+    for tenths in range(0, 3600, 7):
+        angle = math.radians(tenths / 10)
+        for length in (1, 37.5, 600):
+            x, y = length * math.cos(angle), length * math.sin(angle)
+            error = (atan2_tenths(y, x) - tenths + 1800) % 3600 - 1800
+            assert abs(error) <= 1
+    assert atan2_tenths(0, 0) == 0
+    assert (atan2_tenths(0, 5), atan2_tenths(5, 0), atan2_tenths(0, -5), atan2_tenths(-5, 0)) == (0, 900, 1800, 2700)
+    assert atan2_tenths(-1e-3, 5) == 0 # Just below the x axis rounds up to a full turn, which wraps to 0
+
+
+def test_rotation_keeps_counting_across_north():
+    sensor = Magnetometer()
+    gyro = get_gyro(sensor)
+    sensor.heading = 3500
+    gyro.reset_angle(0)
+    for heading in range(3500, 3600 * 2 + 200, 150): # More than a turn to the right
+        sensor.heading = heading
+        assert gyro.get_unwrapped_angle() == (heading - 3500) / 10
+    assert gyro.get_angle() == (sensor.heading - 3500) % 3600 / 10
+    for heading in range(3600 * 2 + 50, -400, -170): # And back to the left past where it started
+        sensor.heading = heading
+        assert gyro.get_unwrapped_angle() == (heading - 3500) / 10
+    assert gyro.get_unwrapped_angle() < -360 / 10
+    assert gyro.get_heading() == sensor.heading % 3600 / 10
+
+
+def test_reset_angle_sets_the_current_angle():
+    sensor = Magnetometer()
+    gyro = get_gyro(sensor)
+    sensor.heading = 100
+    gyro.reset_angle(-90)
+    assert gyro.get_unwrapped_angle() == -90
+    assert gyro.get_angle() == 270
+    sensor.heading = 3550 # 15 degrees to the left, across north
+    assert gyro.get_unwrapped_angle() == -105
+    assert gyro.get_angle() == 255
+    gyro.reset_angle(720)
+    assert gyro.get_unwrapped_angle() == 720
+    assert gyro.get_angle() == 0
+
+
+def test_a_cached_sample_is_not_counted_twice():
+    sensor = Magnetometer()
+    gyro = get_gyro(sensor)
+    gyro.reset_angle(0)
+    sensor.heading = 300
+    gyro.update()
+    sensor.read = lambda: (0, 0, 0) # Same sample as before, the heading computed from it must not be added again
+    sensor.heading = 600
+    assert gyro.get_unwrapped_angle() == 30
+
+
+def test_fit_ellipse_recovers_the_hard_and_soft_iron():
+    # Readings of a turn in place: a circle squeezed and sheared by soft iron, then moved by hard iron
+    xs, ys = [], []
+    for i in range(60):
+        angle = 2 * math.pi * i / 60
+        x, y = 300 * math.cos(angle), 300 * math.sin(angle)
+        xs.append(1.3 * x + 0.2 * y + 228.75)
+        ys.append(0.2 * x + 0.8 * y - 180.5)
+    x_offset, y_offset, xx, xy, yy = fit_ellipse(xs, ys, 60)
+    assert abs(x_offset - 228.75) < 0.01
+    assert abs(y_offset + 180.5) < 0.01
+    radii = []
+    for x, y in zip(xs, ys):
+        x -= x_offset
+        y -= y_offset
+        radii.append(math.hypot(xx * x + xy * y, xy * x + yy * y))
+    area = 300 * 300 * (1.3 * 0.8 - 0.2 * 0.2)
+    assert max(radii) - min(radii) < 0.01 # A circle, with the area of the ellipse
+    assert abs(radii[0] * radii[0] - area) < 1
+
+
+def test_fit_ellipse_rejects_what_is_no_ellipse():
+    assert fit_ellipse([1, 2, 3, 4], [1, 2, 3, 4], 4) is None # Too few readings
+    assert fit_ellipse([5] * 10, [7] * 10, 10) is None
+    assert fit_ellipse(list(range(10)), list(range(10)), 10) is None # A line
+
+
+def test_calibration_round_trip(tmp_path):
+    path = str(tmp_path / "gyro.bin")
+    save_gyro_calibration(path, (228.75, 180.5, 1, 0, 0.875))
+    assert load_gyro_calibration(path) == (228.75, 180.5, 1, 0, 0.875)
+    save_floats(path, GYRO_CALIBRATION_MAGIC, (GYRO_CALIBRATION_VERSION + 1, 228.75, 180.5, 1, 0, 0.875))
+    assert load_gyro_calibration(path) is None # Another version is not used
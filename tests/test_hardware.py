@@ -0,0 +1,31 @@
+from sim.mazes import generate_maze
+
+
+def test_nothing_is_created_until_it_is_used(simulator):
+    from lib.hardware import Hardware
+    simulator(generate_maze(4, 4, 15, 0))
+    hardware = Hardware()
+    assert hardware.pins == {}
+    assert (hardware.motors, hardware.ultrasonic_sensors, hardware.ranger, hardware.gyro, hardware.buttons, hardware.robot) == \
+           (None,) * 6
+    motors = hardware.get_motors()
+    assert hardware.get_motors() is motors
+    assert hardware.ultrasonic_sensors is None and hardware.robot is None
+    pin_count = len(hardware.pins)
+    assert hardware.get_buttons() is hardware.get_buttons()
+    assert len(hardware.pins) == pin_count + 4
+    robot = hardware.get_robot()
+    assert hardware.get_robot() is robot
+    assert robot.motors is motors # The robot uses the motors created before instead of new ones
+    assert hardware.get_ultrasonic_sensors()[1] is robot.f_us
+    assert hardware.get_ranger() is robot.ranger
+
+
+def test_helpers_share_one_registry(simulator, monkeypatch):
+    from lib import helper
+    simulator(generate_maze(4, 4, 15, 0))
+    monkeypatch.setattr(helper, "hardware", None)
+    hardware = helper.get_hardware()
+    assert helper.get_hardware() is hardware
+    assert hardware.robot is None
+    assert helper.get_robot() is hardware.get_robot()
@@ -0,0 +1,60 @@
+import random
+
+from mazesolver.maze import Maze, DIRECTION_DX, DIRECTION_DY
+
+
+def walk_run_length(maze: Maze, x: int, y: int, direction: int) -> int:
+    # Count the open squares ahead one by one, as the index must
+    length = 0
+    while maze.is_open(x, y, direction):
+        x += DIRECTION_DX[direction]
+        y += DIRECTION_DY[direction]
+        length += 1
+    return length
+
+
+def assert_index_matches(maze: Maze) -> None:
+    for y in range(maze.height):
+        for x in range(maze.width):
+            for direction in range(4):
+                assert maze.get_run_length(x, y, direction) == walk_run_length(maze, x, y, direction), (x, y, direction)
+
+
+def test_runs_of_a_new_maze_are_empty():
+    maze = Maze(5, 4, 15)
+    assert_index_matches(maze)
+    assert maze.get_run_length(2, 2, 0) == 0
+
+
+def test_runs_follow_set_wall_and_clear_walls():
+    rng = random.Random(1)
+    maze = Maze(8, 6, 15)
+    for step in range(400):
+        x, y, direction = rng.randrange(8), rng.randrange(6), rng.randrange(4)
+        if step % 25 == 24:
+            maze.clear_walls(x, y)
+        elif not (0 <= x + DIRECTION_DX[direction] < 8 and 0 <= y + DIRECTION_DY[direction] < 6):
+            continue # Outer walls stay
+        else:
+            maze.set_wall(x, y, direction, rng.random() < 0.3)
+        assert_index_matches(maze)
+
+
+def test_update_index_after_changing_the_squares():
+    rng = random.Random(2)
+    source = Maze(6, 6, 15)
+    for _ in range(100):
+        x, y, direction = rng.randrange(1, 5), rng.randrange(1, 5), rng.randrange(4)
+        source.set_wall(x, y, direction, rng.random() < 0.5)
+    maze = Maze(6, 6, 15)
+    maze.cells[:] = source.cells # As loading a saved map does
+    maze.update_index()
+    assert maze.runs == source.runs
+    assert_index_matches(maze)
+
+
+def test_goal_mask_holds_the_middle_squares():
+    even = Maze(4, 4, 15)
+    assert [i for i in range(16) if even.goal_mask[i]] == [5, 6, 9, 10]
+    odd = Maze(5, 3, 15)
+    assert [i for i in range(15) if odd.goal_mask[i]] == [7]
@@ -0,0 +1,52 @@
+import random
+
+from mazesolver.maze import Maze
+from mazesolver.mazemapper import MazeMapper
+from sim.mazes import generate_maze
+from sim.benchmark import get_shortest_path_length
+
+
+def test_updated_distances_match_a_full_flood():
+    rng = random.Random(4)
+    mapper = MazeMapper(None, Maze(6, 6, 15), 30) # Distances only read the maze
+    full = MazeMapper(None, mapper.maze, 30)
+    start_mask = bytearray(36)
+    start_mask[30] = 1
+    for target_mask in (mapper.goal_mask, start_mask):
+        mapper.flood_distances(target_mask)
+        for _ in range(60):
+            x, y = rng.randrange(6), rng.randrange(6)
+            for direction in range(4):
+                if not mapper.maze.get_outer_walls(x, y) & (1 << direction):
+                    mapper.maze.set_wall(x, y, direction, rng.random() < 0.4)
+            mapper.update_distances(x, y, target_mask)
+            full.flood_distances(target_mask)
+            assert mapper.distances == full.distances
+            assert not any(mapper.flood_queued)
+
+
+def test_flood_fill_proves_the_shortest_path(simulator):
+    from lib.hardware import Hardware
+    for seed in range(4):
+        real_maze = generate_maze(6, 6, 15, seed)
+        world = simulator(real_maze, seed)
+        mapper = MazeMapper(Hardware().get_robot(), Maze(6, 6, 15), 30)
+        assert mapper.map_maze_flood_fill(mapper.start_x, mapper.start_y, 0)
+        assert world.collisions == 0
+        assert mapper.is_shortest_path_proven()
+        assert get_shortest_path_length(mapper.maze, mapper.start_x, mapper.start_y) == get_shortest_path_length(real_maze, 0, 5)
+        assert sum(mapper.visited) < 36 # Stops once no unknown wall could shorten the path
+        assert (int(world.x // 15), int(world.y // 15)) == (mapper.start_x, mapper.start_y)
+
+
+def test_frontier_maps_the_whole_maze(simulator):
+    from lib.hardware import Hardware
+    for seed, loop_fraction in ((0, 0), (1, 0), (3, 0.2), (7, 0.2)):
+        real_maze = generate_maze(6, 6, 15, seed, loop_fraction)
+        world = simulator(real_maze, seed)
+        mapper = MazeMapper(Hardware().get_robot(), Maze(6, 6, 15), 30)
+        assert mapper.map_maze_frontier(mapper.start_x, mapper.start_y, 0)
+        assert world.collisions == 0
+        assert all(mapper.visited)
+        assert mapper.maze == real_maze
+        assert (int(world.x // 15), int(world.y // 15)) == (mapper.start_x, mapper.start_y)
@@ -0,0 +1,74 @@
+from robot.robot import Robot
+from robot.velocity import VelocityModel
+from robot.motion import MotionController, TrapezoidalProfile
+from robot.plan import PlanBuilder
+
+
+class Gyro(object):
+    # Angle of the gyro sensor without the sensor
+    def __init__(self, angle: float) -> None:
+        self.angle = angle
+
+    def get_unwrapped_angle(self) -> float:
+        return self.angle
+
+    def reset_angle(self, angle: float) -> None:
+        self.angle = angle
+
+
+def make_controller() -> MotionController:
+    # Converting velocities only reads the robot's velocity model and length
+    robot = Robot.__new__(Robot)
+    robot.velocity_model = VelocityModel((50,), (44,), (44,))
+    robot.length = 11.5
+    robot.gyro = None
+    return MotionController(robot, 60, 120, 120, 15)
+
+
+def test_velocity_to_speed_keeps_the_direction():
+    controller = make_controller()
+    assert controller.velocity_to_speed(44) == 50
+    assert controller.velocity_to_speed(-44) == -50
+    assert controller.velocity_to_speed(1) == 15
+    assert controller.velocity_to_speed(-1) == -15
+    assert controller.velocity_to_speed(0) == 15 # The end of a profile still moves
+    assert controller.velocity_to_speed(1000) == 100
+    assert controller.velocity_to_speed(-1000) == -100
+
+
+def test_profile_covers_its_distance():
+    profile = TrapezoidalProfile(45, 60, 120, 120)
+    steps = 10000
+    dt = profile.duration / steps
+    distance = sum(profile.velocity_at((k + 0.5) * dt) * dt for k in range(steps))
+    assert abs(distance - 45) < 0.01
+    assert profile.velocity_at(0) == 0
+    assert profile.velocity_at(profile.duration) < 1e-6
+
+
+def test_reset_heading_keeps_the_offset_from_the_grid():
+    controller = make_controller()
+    controller.reset_heading(0) # Nothing to reset without a gyro sensor
+    controller.robot.gyro = Gyro(722.5)
+    controller.reset_heading(90)
+    assert controller.robot.gyro.angle == 92.5
+    controller.robot.gyro = Gyro(-3)
+    controller.reset_heading(180)
+    assert controller.robot.gyro.angle == 177
+
+
+def test_consecutive_drives_are_one_profile():
+    controller = make_controller()
+    plan = PlanBuilder(64)
+    plan.drive(30, 50)
+    plan.drive(15, 80) # Driven at the speed of the first drive
+    plan.drive(15, -50)
+    plan.turn("left")
+    plan.drive(30, 50)
+    plan.arc(90, 7.5, 40)
+    plan = bytes(plan.get_plan())
+    profile, i = controller.get_drive_profile(plan, 0)
+    assert (profile.distance, i) == (45, 8) # The drive backwards is not merged
+    assert profile.peak_velocity <= 44 and profile.end_velocity == 0
+    profile, i = controller.get_drive_profile(plan, 14)
+    assert i == 18 and profile.end_velocity > 0 # Slows down to the arc's velocity instead of stopping
@@ -0,0 +1,38 @@
+import sys
+
+from sim import machine
+sys.modules.setdefault("machine", machine) # The driver imports the Pico's machine module, the simulator's stands in for it
+
+from robot.motors.DualMotorDriverCarriers import get_duty_table, get_table_speed
+from constants import MAX_U16_INT
+
+
+def duty_percent(table, speed: int) -> float:
+    return table[100 + speed] * 100 / MAX_U16_INT
+
+
+def test_duty_table_adds_the_deadband():
+    table = get_duty_table((10, 0.8, 0.9))
+    assert table[100] == 0 # Stopped motors get no duty
+    assert abs(duty_percent(table, 1) - 10.8) < 0.01
+    assert abs(duty_percent(table, 50) - 50) < 0.01
+    assert abs(duty_percent(table, -50) - 55) < 0.01
+    assert table[200] == int(0.9 * MAX_U16_INT)
+
+
+def test_duty_table_is_limited_to_full_duty():
+    table = get_duty_table((5, 1.2, 1))
+    assert table[200] == MAX_U16_INT
+    assert table[100 + 80] == MAX_U16_INT
+    assert all(table[100 + speed] <= table[101 + speed] for speed in range(100))
+
+
+def test_table_speed_rounds_the_duty():
+    # 2.4 + 10 rounds to 12 percent of duty, 2 percent of speed
+    assert get_table_speed(2.4, 10) == 2
+    assert get_table_speed(2.6, 10) == 3
+    assert get_table_speed(-2.6, 10) == -3
+    assert get_table_speed(0.4, 0) == 0
+    assert get_table_speed(0, 10) == 0
+    assert get_table_speed(150, 10) == 100
+    assert get_table_speed(-150, 10) == -100
@@ -0,0 +1,57 @@
+from robot.plan import PlanBuilder, PLAN_DRIVE, PLAN_TURN, PLAN_RESET_HEADING, PLAN_ARC, \
+                       INSTRUCTION_LENGTHS, TURN_DIRECTIONS, get_drive_distance, get_drive_speed, get_arc_angle, get_arc_radius, \
+                       get_arc_speed, get_heading_angle
+
+
+def decode(plan) -> list:
+    instructions = []
+    i = 0
+    while i < len(plan):
+        opcode = plan[i]
+        if opcode == PLAN_DRIVE:
+            instructions.append((opcode, get_drive_distance(plan, i), get_drive_speed(plan, i)))
+        elif opcode == PLAN_TURN:
+            instructions.append((opcode, TURN_DIRECTIONS[plan[i + 1]]))
+        elif opcode == PLAN_ARC:
+            instructions.append((opcode, get_arc_angle(plan, i), get_arc_radius(plan, i), get_arc_speed(plan, i)))
+        else:
+            assert opcode == PLAN_RESET_HEADING
+            instructions.append((opcode, get_heading_angle(plan, i)))
+        i += INSTRUCTION_LENGTHS[opcode]
+    assert i == len(plan)
+    return instructions
+
+
+def test_plan_round_trip():
+    builder = PlanBuilder(64)
+    builder.reset_heading(270)
+    builder.drive(45, 70)
+    builder.turn("left")
+    builder.drive(6553.5, -100)
+    builder.arc(-90, 7.5, 40)
+    builder.arc(127, 25.5, 100)
+    builder.turn("right")
+    builder.drive(0.04, 1)
+    assert decode(builder.get_plan()) == [
+        (PLAN_RESET_HEADING, 270),
+        (PLAN_DRIVE, 45, 70),
+        (PLAN_TURN, "left"),
+        (PLAN_DRIVE, 6553.5, -100),
+        (PLAN_ARC, -90, 7.5, 40),
+        (PLAN_ARC, 127, 25.5, 100),
+        (PLAN_TURN, "right"),
+        (PLAN_DRIVE, 0, 1), # Distances are kept in millimeters
+    ]
+
+
+def test_clear_reuses_the_buffer():
+    builder = PlanBuilder(8)
+    builder.drive(30, 50)
+    builder.turn("right")
+    first = bytes(builder.get_plan())
+    builder.clear()
+    assert len(builder.get_plan()) == 0
+    builder.drive(30, 50)
+    builder.turn("right")
+    assert bytes(builder.get_plan()) == first
+    assert builder.get_plan().obj is builder.buffer
@@ -0,0 +1,57 @@
+from mazesolver.maze import Maze, EAST, SOUTH
+from mazesolver.planner import TimeOptimalPlanner
+
+
+def make_open_maze(width: int, height: int) -> Maze:
+    # Every inner wall known to be open
+    maze = Maze(width, height, 15)
+    for y in range(height):
+        for x in range(width):
+            if x < width - 1:
+                maze.set_wall(x, y, EAST, False)
+            if y < height - 1:
+                maze.set_wall(x, y, SOUTH, False)
+    return maze
+
+
+def count_turns(path, width: int, start_angle: int) -> int:
+    directions = [start_angle // 90] + [(-width, 1, width, -1).index(b - a) for a, b in zip(path, path[1:])]
+    return sum(min((b - a) % 4, (a - b) % 4) for a, b in zip(directions, directions[1:]))
+
+
+def test_fastest_path_turns_once():
+    maze = make_open_maze(7, 7)
+    planner = TimeOptimalPlanner(49, 0.25, 0.4, 0.3)
+    path, time = planner.search(maze, 0, 0, 90, maze.goal_mask)
+    assert path[0] == 0 and path[-1] == 3 * 7 + 3
+    assert len(path) == 7
+    assert count_turns(path, 7, 90) == 1
+    # Six squares, one turn and the two straights around it
+    assert abs(time - (6 * 0.25 + 0.4 + 2 * 0.3)) < 1e-6
+
+
+def test_turning_around_at_the_start_is_paid_for():
+    maze = make_open_maze(7, 7)
+    planner = TimeOptimalPlanner(49, 0.25, 0.4)
+    _, facing_time = planner.search(maze, 3, 6, 0, maze.goal_mask)
+    _, backwards_time = planner.search(maze, 3, 6, 180, maze.goal_mask)
+    assert abs(facing_time - 3 * 0.25) < 1e-6
+    assert abs(backwards_time - facing_time - 2 * 0.4) < 1e-6
+
+
+def test_longer_straight_path_beats_a_winding_one():
+    # The open corridor is 2 squares longer than the zigzag through the middle, each of whose turns costs a second
+    maze = Maze(3, 3, 15)
+    for x, y, direction in ((0, 0, EAST), (1, 0, EAST), (2, 0, SOUTH), (2, 1, SOUTH), (0, 2, EAST), (1, 2, EAST),
+                            (0, 0, SOUTH), (0, 1, EAST), (1, 1, SOUTH)):
+        maze.set_wall(x, y, direction, False)
+    maze.goal_mask[:] = bytes(9)
+    maze.goal_mask[2 * 3 + 1] = 1
+    planner = TimeOptimalPlanner(9, 0.25, 1)
+    path, _ = planner.search(maze, 0, 0, 90, maze.goal_mask)
+    assert list(path) == [0, 1, 2, 5, 8, 7]
+
+
+def test_unreachable_goal():
+    maze = Maze(4, 4, 15) # Walls that are not known are not driven through
+    assert TimeOptimalPlanner(16, 0.25, 0.4).search(maze, 0, 0, 0, maze.goal_mask) == (None, 0)
@@ -0,0 +1,58 @@
+import time
+
+from lib.profiler import Probe, Profiler, format_us
+
+
+class Clock(object):
+    # Microsecond clock of MicroPython's time module, advanced by the work it times
+    def __init__(self) -> None:
+        self.now_us = 0
+
+    def ticks_us(self) -> int:
+        return self.now_us
+
+
+class Worker(object):
+    def __init__(self, clock: Clock) -> None:
+        self.clock = clock
+
+    def work(self, duration_us: int) -> int:
+        self.clock.now_us += duration_us
+        return duration_us
+
+
+def test_probe_buckets_by_upper_limit():
+    probe = Probe("probe", (100, 1000))
+    for duration_us in (0, 99, 100, 999, 1000, 50000):
+        probe.add(duration_us)
+    assert list(probe.histogram) == [2, 2, 2] # A duration equal to a limit goes above it
+    assert (probe.count, probe.total_us, probe.max_us) == (6, 52198, 50000)
+    probe.reset()
+    assert list(probe.histogram) == [0, 0, 0]
+    assert (probe.count, probe.total_us, probe.max_us) == (0, 0, 0)
+
+
+def test_wrapped_methods_are_timed_and_put_back(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_us", clock.ticks_us, raising=False)
+    monkeypatch.setattr(time, "ticks_diff", lambda a, b: a - b, raising=False)
+    original = Worker.work
+    profiler = Profiler((100, 1000))
+    probe = profiler.wrap(Worker, "work")
+    worker = Worker(clock)
+    assert worker.work(50) == 50
+    worker.work(500)
+    worker.work(5000)
+    assert probe.name == "Worker.work"
+    assert list(probe.histogram) == [1, 1, 1]
+    assert probe.max_us == 5000
+    profiler.unwrap()
+    assert Worker.work is original
+    worker.work(5000)
+    assert probe.count == 3 # Not counted once unwrapped
+    profiler.reset()
+    assert probe.count == 0
+
+
+def test_format_us():
+    assert [format_us(duration_us) for duration_us in (300, 3000, 1000000, 1500)] == ["300us", "3ms", "1s", "1500us"]
@@ -0,0 +1,101 @@
+import sim
+from sim.mazes import generate_maze
+from robot.robot import Robot
+from robot.velocity import VelocityModel
+
+
+def make_robot(velocity_model: VelocityModel) -> Robot:
+    # get_arc_motion only reads the velocity model, the sensors and motors are left out
+    robot = Robot.__new__(Robot)
+    robot.velocity_model = velocity_model
+    return robot
+
+
+def test_arc_motion_turns_the_outer_wheel_faster():
+    robot = make_robot(VelocityModel((50,), (44,), (44,)))
+    left_speed, right_speed, duration_ms = robot.get_arc_motion(90, 7.5, 40)
+    assert left_speed > right_speed
+    assert duration_ms > 0
+    right_speed, left_speed, _ = robot.get_arc_motion(-90, 7.5, 40)
+    assert (left_speed, right_speed) == robot.get_arc_motion(90, 7.5, 40)[:2]
+
+
+def test_arc_motion_of_wheels_rounded_to_the_same_speed():
+    robot = make_robot(VelocityModel((50,), (44,), (44,)))
+    # The wheels of a wide arc differ by less than a percent of speed
+    left_speed, right_speed, duration_ms = robot.get_arc_motion(90, 2000, 40)
+    assert left_speed > right_speed
+    assert 0 < duration_ms < 60000
+    left_speed, right_speed, duration_ms = robot.get_arc_motion(90, 2000, 100)
+    assert (left_speed, right_speed) == (100, 99)
+
+
+def test_arc_motion_on_a_flat_velocity_table():
+    robot = make_robot(VelocityModel((50, 100), (40, 40), (40, 40)))
+    left_speed, right_speed, duration_ms = robot.get_arc_motion(-45, 1000, 100)
+    model = robot.velocity_model
+    assert model.get_velocity(right_speed) > model.get_velocity(left_speed)
+    assert duration_ms > 0
+
+
+def test_async_drive_is_centered_like_the_blocking_one(simulator):
+    from lib.hardware import Hardware
+    simulator(generate_maze(4, 4, 15, 0))
+    robot = Hardware().get_robot()
+    steps = []
+    steer_centered = robot.steer_centered
+    robot.steer_centered = lambda speed, dt: steps.append(speed) or steer_centered(speed, dt)
+    for centered in (False, True):
+        del steps[:]
+        robot.drive(10, 30, 0, centered=centered)
+        blocking_steps = len(steps)
+        del steps[:]
+        sim.run_async(robot.drive_async(10, 30, 0, centered=centered))
+        assert (blocking_steps > 0, len(steps) > 0) == (centered, centered)
+
+
+class Gyro(object):
+    # Angle of the gyro sensor without the sensor
+    def __init__(self, angle: float) -> None:
+        self.angle = angle
+
+    def get_unwrapped_angle(self) -> float:
+        return self.angle
+
+
+def test_overshoot_is_learned_per_direction():
+    robot = Robot.__new__(Robot) # Learning only reads the gyro sensor and the turn's state
+    robot.turn_offset = [0, 0]
+    robot.turn_timed_out = False
+    for direction, start, target, end in ((1, 0, 90, 96), (0, 90, -90, -6)):
+        robot.gyro = Gyro(end)
+        robot.turn_direction, robot.turn_start_angle, robot.turn_target = direction, start, target
+        robot.finish_turn()
+    assert robot.turn_offset == [3, 3] # Half of the 6 degrees both turns went too far
+    robot.turn_timed_out = True
+    robot.finish_turn()
+    assert robot.turn_offset == [3, 3] # A turn that never got there says nothing about the overshoot
+    robot.turn_timed_out = False
+    robot.gyro = Gyro(-200)
+    robot.finish_turn()
+    assert robot.turn_offset == [45, 3]
+
+
+def test_closed_loop_turns_learn_to_stop_on_the_grid(simulator):
+    from lib.hardware import Hardware
+    world = simulator(generate_maze(4, 4, 15, 0))
+    hardware = Hardware()
+    robot = hardware.get_robot()
+    robot.gyro = hardware.get_gyro(None)
+    robot.gyro.reset_angle(0)
+    heading = 0
+    for direction in ("right", "left"):
+        errors = []
+        for _ in range(5):
+            robot.turn_90_degrees(direction)
+            heading += 90 if direction == "right" else -90
+            errors.append(abs(robot.gyro.get_unwrapped_angle() - heading))
+        assert max(errors) < 6
+        assert sum(errors[1:]) / 4 < errors[0] / 2 # The first turn overshoots, the learned overshoot stops the next ones sooner
+        assert robot.turn_offset[1 if direction == "right" else 0] > 0
+    assert world.collisions == 0
@@ -0,0 +1,69 @@
+from mazesolver.maze import NORTH, EAST
+from mazesolver.speedrun import SpeedRunPlanner
+from robot.plan import PlanBuilder, PLAN_DRIVE, PLAN_TURN, PLAN_RESET_HEADING, PLAN_ARC, INSTRUCTION_LENGTHS, \
+                       get_drive_distance, get_arc_angle, get_arc_radius
+from sim.mazes import get_closed_maze
+from constants import LABYRINTH_WALL_THICKNESS_CM, ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, SPEED_RUN_ARC_RADIUS_CM, \
+                      SPEED_RUN_MIN_CLEARANCE_CM, SPEED_RUN_MIN_SETTLING_DRIVE_CM
+
+# Staircase from the start of an 8x8 maze to its goal, two squares north and two east twice, then one east into the goal
+STAIRCASE = ((0, 7), (0, 6), (0, 5), (1, 5), (2, 5), (2, 4), (2, 3), (3, 3))
+
+
+def plan_path(squares) -> tuple:
+    planner = SpeedRunPlanner(64, 15, LABYRINTH_WALL_THICKNESS_CM, ROBOT_WIDTH_CM, ROBOT_LENGTH_CM, SPEED_RUN_ARC_RADIUS_CM,
+                              SPEED_RUN_MIN_CLEARANCE_CM, SPEED_RUN_MIN_SETTLING_DRIVE_CM)
+    builder = PlanBuilder(256)
+    estimated_time = planner.construct(builder, [y * 8 + x for x, y in squares], 8, 0, 70, 40, 50, 30, 0.5, 0.3)
+    return builder.get_plan(), estimated_time
+
+
+def get_instructions(plan) -> list:
+    instructions = []
+    i = 0
+    while i < len(plan):
+        opcode = plan[i]
+        if opcode == PLAN_DRIVE:
+            instructions.append(("drive", get_drive_distance(plan, i)))
+        elif opcode == PLAN_ARC:
+            instructions.append(("arc", get_arc_angle(plan, i), get_arc_radius(plan, i)))
+        elif opcode == PLAN_TURN:
+            instructions.append(("turn",))
+        else:
+            assert opcode == PLAN_RESET_HEADING
+        i += INSTRUCTION_LENGTHS[opcode]
+    return instructions
+
+
+def test_staircase_is_driven_with_arcs():
+    plan, estimated_time = plan_path(STAIRCASE)
+    assert get_instructions(plan) == [
+        ("drive", 22.5), ("arc", 90, 7.5), ("drive", 15), ("arc", -90, 7.5), ("drive", 22.5), ("turn",), ("drive", 15)
+    ] # The last corner is too close to the goal to settle after an arc, it is turned in place
+    pivot_time = 105 / 50 + 3 * (0.5 + 0.3) + 0.3
+    assert 0 < estimated_time < pivot_time
+
+
+def test_corners_without_room_to_settle_are_turned_in_place():
+    # A staircase of single squares has no straight long enough around any of its corners
+    assert plan_path(((0, 7), (0, 6), (1, 6), (1, 5), (2, 5), (2, 4)))[1] is None
+    assert plan_path(((0, 7), (0, 6), (0, 5), (0, 4)))[1] is None # No corner at all
+
+
+def test_solver_drives_the_staircase_without_touching_a_wall(simulator):
+    from lib.hardware import Hardware
+    from mazesolver.mazemapper import MazeMapper
+    from robot.motion import MotionController
+    from constants import MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2, MOTION_MIN_SPEED
+    maze = get_closed_maze(8, 8, 15)
+    for (x, y), (next_x, next_y) in zip(STAIRCASE, STAIRCASE[1:]):
+        maze.set_wall(x, y, NORTH if next_y < y else EAST, False)
+    world = simulator(maze)
+    robot = Hardware().get_robot() # Arcs are timed without a gyro sensor
+    plan, estimated_time = MazeMapper(robot, maze, 30).get_maze_solver().find_and_construct_speed_run_plan()
+    assert [instruction[0] for instruction in get_instructions(plan)].count("arc") == 2
+    MotionController(robot, MOTION_MAX_VELOCITY_CMPS, MOTION_ACCELERATION_CMPS2, MOTION_DECELERATION_CMPS2,
+                     MOTION_MIN_SPEED).execute(plan)
+    assert world.collisions == 0
+    assert (int(world.x // 15), int(world.y // 15)) == (3, 3)
+    assert abs(world.now_us / 1000000 - estimated_time) < 0.1 * estimated_time
@@ -0,0 +1,40 @@
+from lib.storage import save_floats, load_floats, write_checked_file, read_checked_file
+
+
+def test_floats_round_trip(tmp_path):
+    path = str(tmp_path / "calibration.bin")
+    save_floats(path, b"TEST", (1.5, -0.25, 1000))
+    assert load_floats(path, b"TEST", 3) == (1.5, -0.25, 1000)
+
+
+def test_floats_of_another_kind_are_not_loaded(tmp_path):
+    path = str(tmp_path / "calibration.bin")
+    save_floats(path, b"TEST", (1.5, -0.25, 1000))
+    assert load_floats(path, b"ELSE", 3) is None
+    assert load_floats(path, b"TEST", 2) is None
+    assert load_floats(str(tmp_path / "missing.bin"), b"TEST", 3) is None
+
+
+def test_corrupted_file_is_not_loaded(tmp_path):
+    path = str(tmp_path / "map.bin")
+    write_checked_file(path, b"header", bytearray(range(32)), memoryview(b"plan"))
+    assert read_checked_file(path) == b"header" + bytes(range(32)) + b"plan"
+    with open(path, "rb") as file:
+        data = bytearray(file.read())
+    for i in (0, 20, len(data) - 1): # In the data and in the CRC
+        corrupted = bytearray(data)
+        corrupted[i] ^= 0x04
+        with open(path, "wb") as file:
+            file.write(corrupted)
+        assert read_checked_file(path) is None
+    with open(path, "wb") as file:
+        file.write(data[:3]) # Shorter than a CRC
+    assert read_checked_file(path) is None
+
+
+def test_saving_replaces_the_old_file(tmp_path):
+    path = str(tmp_path / "calibration.bin")
+    save_floats(path, b"TEST", (1,))
+    save_floats(path, b"TEST", (2,))
+    assert load_floats(path, b"TEST", 1) == (2,)
+    assert [p.name for p in tmp_path.iterdir()] == ["calibration.bin"] # No temporary file is left
@@ -0,0 +1,67 @@
+import struct
+
+from lib.telemetry import Telemetry, load_telemetry, TELEMETRY_RECORD, TELEMETRY_RECORD_SIZE
+
+
+def get_times(telemetry: Telemetry) -> list:
+    times = []
+    for part in telemetry.get_parts():
+        for offset in range(0, len(part), TELEMETRY_RECORD_SIZE):
+            times.append(struct.unpack_from(TELEMETRY_RECORD, part, offset)[0])
+    return times
+
+
+def record(telemetry: Telemetry, timestamp: int) -> None:
+    telemetry.record(timestamp, 10.5, 20.25, 30, 90.5, -50, 50, 2, 3, 270)
+
+
+def test_records_wrap_around_oldest_first():
+    telemetry = Telemetry(4)
+    assert get_times(telemetry) == []
+    for timestamp in range(3):
+        record(telemetry, timestamp)
+    assert get_times(telemetry) == [0, 1, 2]
+    record(telemetry, 3)
+    assert get_times(telemetry) == [0, 1, 2, 3] # Full, the buffer ends exactly where it starts
+    for timestamp in range(4, 11):
+        record(telemetry, timestamp)
+    assert get_times(telemetry) == [7, 8, 9, 10]
+    assert telemetry.count == 4
+    telemetry.clear()
+    assert get_times(telemetry) == []
+
+
+def test_record_fields():
+    telemetry = Telemetry(1)
+    telemetry.record(-1, 10.5, 20.25, 30, 90.5, -50, 50, 2, 3, 270) # ticks_ms wraps around, only 32 bits are kept
+    assert struct.unpack_from(TELEMETRY_RECORD, telemetry.buffer) == (0xFFFFFFFF, 10.5, 20.25, 30, 90.5, -50, 50, 2, 3, 3)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "telemetry.bin")
+    telemetry = Telemetry(5)
+    for timestamp in range(8): # Wrapped around, saved oldest first
+        record(telemetry, timestamp)
+    telemetry.save(path)
+    loaded = load_telemetry(path)
+    assert loaded.count == 5
+    assert get_times(loaded) == [3, 4, 5, 6, 7]
+    record(loaded, 8) # Loaded records are a full buffer, recording goes on from the oldest
+    assert get_times(loaded) == [4, 5, 6, 7, 8]
+
+    Telemetry(3).save(path)
+    assert get_times(load_telemetry(path)) == []
+
+
+def test_corrupted_telemetry_is_not_loaded(tmp_path):
+    path = str(tmp_path / "telemetry.bin")
+    telemetry = Telemetry(2)
+    record(telemetry, 1)
+    telemetry.save(path)
+    with open(path, "rb") as file:
+        data = bytearray(file.read())
+    data[8] ^= 0x01
+    with open(path, "wb") as file:
+        file.write(data)
+    assert load_telemetry(path) is None
+    assert load_telemetry(str(tmp_path / "missing.bin")) is None
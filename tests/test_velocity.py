@@ -0,0 +1,70 @@
+import math
+
+from lib.storage import save_floats
+from robot.velocity import VelocityModel, get_velocity_table, fit_run, save_velocity_model, load_velocity_model
+from robot.velocity import VELOCITY_MODEL_MAGIC, VELOCITY_MODEL_VERSION
+
+
+def test_single_measurement_is_proportional():
+    table = get_velocity_table((50,), (44,))
+    assert table[0] == 0
+    assert abs(table[50] - 44) < 1e-4
+    assert abs(table[25] - 22) < 1e-4
+    assert abs(table[100] - 88) < 1e-4
+
+
+def test_table_interpolates_and_extrapolates_the_deadband():
+    table = get_velocity_table((20, 50, 90), (5, 35, 55))
+    assert abs(table[20] - 5) < 1e-4
+    assert abs(table[35] - 20) < 1e-4 # Halfway between the two slowest
+    assert abs(table[70] - 45) < 1e-4
+    assert abs(table[100] - 60) < 1e-4 # Line through the two fastest
+    # Line through the two slowest crosses 0 at speed 15, the deadband
+    assert all(table[speed] == 0 for speed in range(16))
+    assert all(table[speed] <= table[speed + 1] for speed in range(100))
+
+
+def test_get_speed_inverts_get_velocity():
+    model = VelocityModel((20, 50, 90), (5, 35, 55), (4, 30, 50))
+    for speed in (16, 20, 37, 50, 73, 100):
+        assert model.get_speed(model.get_velocity(speed)) == speed
+        assert model.get_speed(model.get_velocity(-speed)) == -speed
+    assert model.get_speed(0) == 0
+    assert model.get_speed(1000) == 100
+    assert model.get_speed(-1000) == -100
+    assert model.get_speed(0.01) == 16 # Never a speed in the deadband
+
+
+def test_fit_run_finds_velocity_and_time_constant():
+    velocity, time_constant, start = 40, 0.05, 100
+    for direction in (1, -1):
+        times = [i * 0.02 for i in range(60)]
+        # First order response of the motors started at time 0
+        distances = [start - direction * velocity * (t - time_constant * (1 - math.exp(-t / time_constant))) for t in times]
+        fitted_velocity, fitted_time_constant, line = fit_run(times, distances, len(times), start, direction)
+        assert abs(fitted_velocity - velocity) < 0.01
+        assert abs(fitted_time_constant - time_constant) < 0.001
+
+
+def test_fit_run_of_a_robot_that_does_not_move():
+    times = [i * 0.02 for i in range(10)]
+    assert fit_run(times, [50] * 10, 10, 50, 1)[:2] == (0, 0)
+    assert fit_run(times, [50], 1, 50, 1) is None
+
+
+def test_velocity_model_round_trip(tmp_path):
+    path = str(tmp_path / "velocity.bin")
+    save_velocity_model(path, VelocityModel((20, 50, 90), (5, 35, 55), (4, 30, 50), 0.0625, 0.125))
+    model = load_velocity_model(path, (20, 50, 90))
+    assert (model.forward_velocities, model.reverse_velocities) == ((5, 35, 55), (4, 30, 50))
+    assert (model.time_constant, model.braking_time) == (0.0625, 0.125)
+    assert model.get_velocity(-50) == -30
+
+
+def test_velocity_model_of_other_speeds_or_version_is_not_loaded(tmp_path):
+    path = str(tmp_path / "velocity.bin")
+    save_velocity_model(path, VelocityModel((20, 50, 90), (5, 35, 55), (4, 30, 50)))
+    assert load_velocity_model(path, (20, 60, 90)) is None
+    assert load_velocity_model(path, (50,)) is None
+    save_floats(path, VELOCITY_MODEL_MAGIC, (VELOCITY_MODEL_VERSION + 1, 20, 50, 90, 0, 0, 5, 35, 55, 4, 30, 50))
+    assert load_velocity_model(path, (20, 50, 90)) is None